@@ -1,176 +1,464 @@
 # api/app.py
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 from typing import Optional, List, Dict
+from collections import OrderedDict
 from pathlib import Path
-import os, json, uuid, threading
+import os, sys, json, uuid, threading, time
 from threading import Event   # ✅ necesario para manejar los waiters
 
-# ===== rutas del proyecto =====
-try:
-    from src.utils.config_rutas import reports_dir
-except ModuleNotFoundError:
-    import sys
-    sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
-    from utils.config_rutas import reports_dir
-
-# ===== helpers de logging =====
-try:
-    from src.utils.loggers import append_result, append_alert
-except ModuleNotFoundError:
-    import sys
-    sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
-    from utils.loggers import append_result, append_alert
+# ===== utilidades compartidas (src/utils) =====
+# Un solo ajuste de sys.path (uvicorn lanzado desde api/); los módulos de
+# src/utils no importan pandas/sklearn/confluent_kafka al cargarse, así que
+# importar la API cuesta lo mismo que FastAPI (arranques en frío del autoscaling).
+_ROOT = Path(__file__).resolve().parents[1]
+if (_ROOT / "src" / "utils" / "settings.py").exists() and str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))   # raíz del repo: src/utils es la única copia de las utilidades
+from src.utils.settings import Settings
+from src.utils.loggers import append_result, append_alert
+from src.utils.alert_system import simple_urgency                  # compartidas con batch_score
+from src.utils.instrumentation import (E2E_SECONDS, STAGE_SECONDS, QUEUE_DEPTH, MESSAGES,
+                                       Stopwatch, render_prometheus, CONTENT_TYPE)
+from src.utils.log_setup import setup_logging, EventSampler
+from src.utils.kafka_utils import producer_conf, consumer_conf, routing_key, parse_partitions
+from src.utils.aspects import NOT_MENTIONED                          # marca del prefiltro de ABSA
+from src.utils.admission import AdmissionController, Rejected        # control de admisión (AIMD)
+from src.utils.text_normalize import normalize_text, NearDupIndex    # normalización + casi-duplicados
+from src.utils.readiness import HeartbeatMonitor, CONTROL_TOPIC, HEARTBEAT_S
+from src.utils.shadow import ShadowTracker                          # modo shadow / A-B
 
 # ===== Kafka =====
-from confluent_kafka import Producer, Consumer
-from confluent_kafka.admin import AdminClient, NewTopic
-
-KAFKA_BROKERS = os.getenv("KAFKA_BROKERS", "kafka:9092")
+# confluent_kafka se importa en el primer uso (startup / primer enqueue), no al importar la API
+SETTINGS = Settings.from_env()
+KAFKA_BROKERS = SETTINGS.kafka_brokers
 TOPIC_SENT_IN  = os.getenv("TOPIC_SENT_IN",  "ml.sentiment.in")
 TOPIC_SENT_OUT = os.getenv("TOPIC_SENT_OUT", "ml.sentiment.out")
 TOPIC_ABSA_IN  = os.getenv("TOPIC_ABSA_IN",  "ml.absa.in")
 TOPIC_ABSA_OUT = os.getenv("TOPIC_ABSA_OUT", "ml.absa.out")
+TOPIC_FEATURES = os.getenv("TOPIC_FEATURES", "ml.features")   # salida del featurizador (TOPIC_SENT_IN=ml.features.in)
 GROUP_ID = os.getenv("GROUP_ID", "integration-api-v1")
+# "6" = 6 particiones por tópico; "3,ml.absa.in=12" = 3 salvo ml.absa.in
+TOPIC_PARTITIONS = os.getenv("TOPIC_PARTITIONS", "1")
+RESULT_TIMEOUT_S = float(os.getenv("RESULT_TIMEOUT_S", "10"))
+# /ready exige un heartbeat reciente y "ready" de cada uno de estos servicios
+READY_SERVICES = [s.strip() for s in os.getenv("READY_SERVICES", "sentiment").split(",") if s.strip()]
+READY_TIMEOUT_S = float(os.getenv("READY_TIMEOUT_S", "2"))
+TOPICS = [TOPIC_SENT_IN, TOPIC_SENT_OUT, TOPIC_ABSA_IN, TOPIC_ABSA_OUT, TOPIC_FEATURES, CONTROL_TOPIC]
+# modo shadow: SHADOW_TOPIC_IN vacío = desactivado; la salida del candidato nunca se sirve
+SHADOW_TOPIC_IN  = os.getenv("SHADOW_TOPIC_IN", "")
+SHADOW_TOPIC_OUT = os.getenv("SHADOW_TOPIC_OUT", "ml.sentiment.shadow.out")
+if SHADOW_TOPIC_IN:
+    TOPICS += [SHADOW_TOPIC_IN, SHADOW_TOPIC_OUT]
+# ventana de casi-duplicados (0 = desactivado) y distancia de Hamming máxima del SimHash
+DEDUP_WINDOW = int(os.getenv("DEDUP_WINDOW", "10000"))
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "0"))   # 0 = sólo exactos (ver text_normalize)
+DEDUP_TTL_S = float(os.getenv("DEDUP_TTL_S", "600"))              # la caché se vacía como mucho cada TTL (0 = nunca)
 
 # ===== App =====
 app = FastAPI(title="Sentiment API (Kafka)", version="1.0.0")
 
-RESULTS_CSV = reports_dir / "results_log.csv"
-ALERTS_CSV  = reports_dir / "alerts_log.csv"
-reports_dir.mkdir(parents=True, exist_ok=True)
+RESULTS_CSV = SETTINGS.reports_dir / "results_log.csv"   # REPORTS_DIR; append_result crea la carpeta
+ALERTS_CSV  = SETTINGS.reports_dir / "alerts_log.csv"
 
 # ===== modelos =====
 class Item(BaseModel):
     text: str
+    product_id: Optional[str] = None    # key de partición (ver ROUTING_KEY)
+    customer_id: Optional[str] = None
 
 # ===== caches =====
 RESULTS: Dict[str, Dict] = {}
+HEARTBEATS: Optional[HeartbeatMonitor] = None
+
+class _Shared:
+    """Resultado del primer texto de un grupo de casi-duplicados."""
+    __slots__ = ("done", "evt")
+    def __init__(self):
+        self.done, self.evt = Event(), None
+
+DEDUP = NearDupIndex(DEDUP_WINDOW, DEDUP_MAX_DISTANCE) if DEDUP_WINDOW > 0 else None
+SHARED: "OrderedDict[str, _Shared]" = OrderedDict()
+# un solo lock para todo el estado de duplicados (versión vigente, índice + SHARED):
+# lo tocan el consumer (resultados) y los hilos de /predict
+_DEDUP_LOCK = threading.RLock()
+_ADMIN = None                     # AdminClient de /ready (se crea en la primera llamada)
 PENDING_TEXT: Dict[str, str] = {}
 WAITERS: Dict[str, Event] = {}   # ✅ aquí guardamos los eventos de espera
+# tópico de salida que resuelve cada cid si no es TOPIC_SENT_OUT (p.ej. el benchmark de ABSA)
+RESULT_TOPIC: Dict[str, str] = {}
 
-# ===== helpers =====
-def simple_urgency(text: str, sentiment: str) -> str:
-    t = (text or "").lower()
-    if sentiment == "negative" and any(k in t for k in {"broken","refund","late","missing","defect"}):
-        return "high"
-    return "low"
+# ===== métricas / logs =====
+SERVICE = "api"
+log = setup_logging(SERVICE)
+ST_PRODUCE     = STAGE_SECONDS.labels(SERVICE, "produce")
+ST_DESERIALIZE = STAGE_SECONDS.labels(SERVICE, "deserialize")
+ST_STORE       = STAGE_SECONDS.labels(SERVICE, "store")
+E2E = {t: E2E_SECONDS.labels(t) for t in (TOPIC_SENT_OUT, TOPIC_ABSA_OUT)}
+MSG_OK, MSG_ERR = MESSAGES.labels(SERVICE, "ok"), MESSAGES.labels(SERVICE, "error")
+MSG_DEDUP = MESSAGES.labels(SERVICE, "dedup_hit")
+QUEUE_DEPTH.labels(SERVICE, "pending_text").set_function(lambda: len(PENDING_TEXT))
+QUEUE_DEPTH.labels(SERVICE, "waiters").set_function(lambda: len(WAITERS))
+QUEUE_DEPTH.labels(SERVICE, "results").set_function(lambda: len(RESULTS))
+ADMISSION = AdmissionController.from_env(SERVICE)
 
+# ===== helpers =====
 def infer_aspects_keywords(text: str) -> str:
     tags = []
-    t = (text or "").lower()
+    t = normalize_text(text)
     if "price" in t or "$" in t: tags.append("precio")
     if "quality" in t or "defect" in t or "broken" in t: tags.append("calidad")
     if "shipping" in t or "delivery" in t or "late" in t: tags.append("envío")
     return "|".join(tags)
 
-# ===== Kafka producer =====
-producer = Producer({"bootstrap.servers": KAFKA_BROKERS})
+# ===== Kafka producer (perezoso: el import de la API no toca confluent_kafka ni el broker) =====
+_PRODUCER = None
+_PRODUCER_LOCK = threading.Lock()
 
-def enqueue(topic: str, payload: dict) -> str:
-    cid = str(uuid.uuid4())
-    evt = {"correlation_id": cid, "payload": payload, "meta": {"source": "integration-api"}}
-    producer.produce(topic, json.dumps(evt).encode("utf-8"), key=cid)
+def get_producer():
+    global _PRODUCER
+    if _PRODUCER is None:
+        with _PRODUCER_LOCK:
+            if _PRODUCER is None:
+                from confluent_kafka import Producer
+                _PRODUCER = Producer(producer_conf(KAFKA_BROKERS))
+    return _PRODUCER
+
+QUEUE_DEPTH.labels(SERVICE, "producer").set_function(lambda: len(_PRODUCER) if _PRODUCER is not None else 0)
+
+# producer propio del espejo: sin flush() por mensaje, así el flush() de enqueue()
+# nunca espera a las peticiones replicadas al candidato
+_SHADOW_PRODUCER = None
+
+def _shadow_produce(topic: str, value: bytes, key: Optional[str] = None):
+    global _SHADOW_PRODUCER
+    if _SHADOW_PRODUCER is None:
+        with _PRODUCER_LOCK:
+            if _SHADOW_PRODUCER is None:
+                from confluent_kafka import Producer
+                _SHADOW_PRODUCER = Producer(producer_conf(KAFKA_BROKERS))
+    _SHADOW_PRODUCER.produce(topic, value, key=key)
+    _SHADOW_PRODUCER.poll(0)      # callbacks de entrega, sin bloquear
+
+SHADOW = ShadowTracker.from_env(_shadow_produce, SETTINGS.eval_dir, service=SERVICE)
+
+def enqueue(topic: str, payload: dict, cid: Optional[str] = None) -> str:
+    cid = cid or str(uuid.uuid4())
+    evt = {"correlation_id": cid, "payload": payload,
+           "meta": {"source": "integration-api", "ts_enqueue": time.time()}}
+    sw = Stopwatch()
+    # misma key -> misma partición -> mismo worker y orden garantizado
+    producer = get_producer()
+    producer.produce(topic, json.dumps(evt).encode("utf-8"), key=routing_key(payload, cid))
     producer.flush()
+    sw.lap(ST_PRODUCE)
     return cid
 
 # ===== asegurador de tópicos =====
-def ensure_topics(bootstrap: str, topics: List[str]):
+def ensure_topics(bootstrap: str, topics: List[str], partitions: Optional[Dict[str, int]] = None):
+    from confluent_kafka.admin import AdminClient, NewTopic, NewPartitions
+    partitions = partitions or {t: 1 for t in topics}
     admin = AdminClient({"bootstrap.servers": bootstrap})
     md = admin.list_topics(timeout=5)
     missing = [t for t in topics if t not in md.topics]
-    if not missing:
-        print("✅ Topics ya existen:", ", ".join(topics))
+    # Kafka sólo permite AUMENTAR particiones (y al hacerlo cambia el reparto de keys)
+    grow = [t for t in topics if t in md.topics and len(md.topics[t].partitions) < partitions[t]]
+    if not missing and not grow:
+        log.info("✅ Topics ya existen", extra={"topics": topics})
         return
-    new = [NewTopic(t, num_partitions=1, replication_factor=1) for t in missing]
-    fs = admin.create_topics(new)
+    fs = {}
+    if missing:
+        fs.update(admin.create_topics([NewTopic(t, num_partitions=partitions[t], replication_factor=1) for t in missing]))
+    if grow:
+        fs.update(admin.create_partitions([NewPartitions(t, partitions[t]) for t in grow]))
     for t, f in fs.items():
         try:
             f.result()
-            print(f"🆕 Topic creado: {t}")
+            log.info("🆕 Topic creado" if t in missing else "➕ Particiones añadidas",
+                     extra={"topic": t, "partitions": partitions[t]})
         except Exception as e:
-            print(f"⚠️ No se pudo crear {t}: {e}")
+            log.warning("⚠️ No se pudo crear topic", extra={"topic": t, "err": str(e)})
+
+# ===== registro de resultados (CSV + alertas) =====
+def store_result(text: str, evt: dict):
+    res = evt.get("result", {})
+    sentiment = str(res.get("prediction", "neutral"))
+    urg = simple_urgency(text, sentiment)
+
+    aspects_val = res if isinstance(res, dict) and "prediction" not in res else infer_aspects_keywords(text)
+    aspects_str = ("|".join(f"{k}:{v}" for k, v in aspects_val.items() if v != NOT_MENTIONED)
+                   if isinstance(aspects_val, dict) else aspects_val)
+
+    append_result(RESULTS_CSV, text, sentiment, urg, aspects_str)
+    if sentiment == "negative" and urg == "high":
+        append_alert(ALERTS_CSV, "negativo/alto", sentiment, urg, "umbral auto", aspects_str)
+
+# ===== casi-duplicados: se responde con el resultado del primero =====
+_DEDUP_VERSION: Optional[str] = None      # versión del modelo de sentimiento de los resultados cacheados
+_DEDUP_LOADED_AT = 0.0                    # model_loaded_at de esa versión (lo estampa el worker)
+_DEDUP_SEEN: set = set()                  # versiones ya vistas (eventos sin model_loaded_at)
+_DEDUP_SINCE = time.time()
+
+def _newer_version(model_version: Optional[str], loaded_at: Optional[float]) -> bool:
+    """¿Reemplaza a la versión vigente? Durante un rolling reload los workers alternan
+    versiones: sólo cuenta la cargada después (o, sin model_loaded_at, la nunca vista)."""
+    if model_version is None or model_version == _DEDUP_VERSION:
+        return False
+    if loaded_at is not None:
+        return loaded_at > _DEDUP_LOADED_AT
+    return model_version not in _DEDUP_SEEN
+
+def _dedup_check(model_version: Optional[str] = None, loaded_at: Optional[float] = None) -> None:
+    """Vacía índice y resultados compartidos si llega una versión más nueva del modelo o venció DEDUP_TTL_S."""
+    global _DEDUP_VERSION, _DEDUP_LOADED_AT, _DEDUP_SINCE
+    if DEDUP is None:
+        return
+    with _DEDUP_LOCK:
+        now = time.time()
+        changed = _newer_version(model_version, loaded_at)
+        if model_version is not None:
+            _DEDUP_SEEN.add(model_version)
+        if changed:
+            stale, _DEDUP_VERSION = _DEDUP_VERSION is not None, model_version
+            _DEDUP_LOADED_AT = loaded_at if loaded_at is not None else _DEDUP_LOADED_AT
+        else:
+            stale = DEDUP_TTL_S > 0 and now - _DEDUP_SINCE > DEDUP_TTL_S
+        if not stale:
+            return
+        _DEDUP_SINCE = now
+        DEDUP.clear()
+        SHARED.clear()
+    log.info("🧹 caché de duplicados vaciada",
+             extra={"reason": "model_version" if changed else "ttl", "model_version": _DEDUP_VERSION})
+
+def _dedup_lookup(cid: str, text: str):
+    """(cid del primero o None, su _Shared) de forma atómica respecto a _dedup_check()."""
+    with _DEDUP_LOCK:
+        first = DEDUP.lookup_or_add(cid, text)
+        return first, (_shared_register(cid) if first is None else SHARED.get(first))
+
+def _shared_result(shared: "_Shared", evt: dict) -> None:
+    """Fija el resultado del grupo sólo si es de la versión vigente (nunca uno del modelo anterior)."""
+    with _DEDUP_LOCK:
+        if not shared.evt and evt.get("model_version") in (None, _DEDUP_VERSION):
+            shared.evt = evt
+
+def _shared_register(cid: str) -> _Shared:
+    sh = _Shared()
+    with _DEDUP_LOCK:
+        SHARED[cid] = sh
+        while len(SHARED) > DEDUP_WINDOW:      # misma ventana que el índice
+            SHARED.popitem(last=False)
+    return sh
+
+def _from_first(cid: str, first: str, evt: dict, text: str, payload: dict) -> dict:
+    MSG_DEDUP.inc()
+    out = {**evt, "correlation_id": cid, "dedup_of": first}
+    store_result(text, out)
+    # también a TOPIC_SENT_OUT con el cid nuevo (texto + resultado en un evento), así
+    # el sink y RESULTS_DB la cuentan como cualquier otra reseña; sin flush(): no
+    # frena la respuesta del duplicado
+    now = time.time()
+    reused = {k: v for k, v in evt.items() if k not in ("ts_enqueue", "meta", "payload")}
+    reused.update(correlation_id=cid, payload=payload, ts=now,
+                  meta={"source": "integration-api", "ts_enqueue": now, "dedup_of": first})
+    try:
+        producer = get_producer()
+        producer.produce(TOPIC_SENT_OUT, json.dumps(reused).encode("utf-8"), key=routing_key(payload, cid))
+        producer.poll(0)
+    except Exception as e:
+        log.warning("no se pudo publicar el resultado reutilizado", extra={"cid": cid, "err": repr(e)})
+    return out
 
 # ===== consumer en background =====
+def handle_result(topic: str, evt: dict, sw: Optional[Stopwatch] = None) -> bool:
+    """Procesa un resultado de `topic`; True si resolvió una petición de esta API."""
+    cid = evt.get("correlation_id")
+    if not cid:
+        return False
+    if (evt.get("meta") or {}).get("dedup_of"):  # publicado por _from_first: ya se registró y respondió
+        return False
+    if SHADOW is not None:
+        SHADOW.maybe_flush()                     # metrics.json cada SHADOW_FLUSH_S
+        if topic == SHADOW_TOPIC_OUT:            # candidato: sólo se compara
+            SHADOW.record_candidate(evt)
+            return False
+    ts_enqueue = evt.get("ts_enqueue")
+    if ts_enqueue and topic in E2E:
+        E2E[topic].observe(max(time.time() - ts_enqueue, 0.0))
+    # cada petición se resuelve con UN tópico: con el featurizador, sentimiento y
+    # ABSA publican el mismo cid y el de ABSA no debe despertar a /predict
+    if topic != RESULT_TOPIC.get(cid, TOPIC_SENT_OUT):
+        return False
+    if SHADOW is not None:
+        SHADOW.record_primary(evt)
+    if topic == TOPIC_SENT_OUT:
+        # recarga en caliente: no servir resultados del modelo anterior
+        _dedup_check(evt.get("model_version"), evt.get("model_loaded_at"))
+
+    text = PENDING_TEXT.pop(cid, None)
+    if text:
+        store_result(text, evt)
+        if sw: sw.lap(ST_STORE)
+
+    # 🔔 Despierta a quien esté esperando este cid; sin waiter (timeout) no se
+    # guarda en RESULTS: nadie lo recogería
+    waiter = WAITERS.pop(cid, None)
+    if waiter:
+        RESULTS[cid] = evt
+        waiter.set()
+    return text is not None or waiter is not None
+
 def bg_consume():
-    cons = Consumer({
-        "bootstrap.servers": KAFKA_BROKERS,
-        "group.id": GROUP_ID,
-        "auto.offset.reset": "earliest",
-        "enable.auto.commit": True,
-    })
+    from confluent_kafka import Consumer
+    cons = Consumer(consumer_conf(KAFKA_BROKERS, GROUP_ID))
     topics = [TOPIC_SENT_OUT]
     if TOPIC_ABSA_OUT:
         topics.append(TOPIC_ABSA_OUT)
+    if SHADOW is not None:
+        topics.append(SHADOW_TOPIC_OUT)
     cons.subscribe(topics)
-    print(f"🔊 Listening results on: {', '.join(topics)}")
+    log.info("🔊 Listening results", extra={"topics": topics})
+    per_msg = EventSampler(log)                          # eventos por mensaje: muestreados
+    err_log = EventSampler(log, every=1, max_per_sec=5)  # errores: todos, con tope por segundo
     try:
         while True:
             msg = cons.poll(1.0)
             if not msg: continue
             if msg.error():
-                print("KafkaErr:", msg.error()); continue
+                err_log.error("kafka error", err=str(msg.error())); continue
             try:
+                sw = Stopwatch()
                 evt = json.loads(msg.value().decode("utf-8"))
-                cid = evt.get("correlation_id")
-                if not cid: continue
-                RESULTS[cid] = evt
-
-                text = PENDING_TEXT.pop(cid, None)
-                if text:
-                    res = evt.get("result", {})
-                    sentiment = str(res.get("prediction", "neutral"))
-                    urg = simple_urgency(text, sentiment)
-
-                    aspects_val = res if isinstance(res, dict) and "prediction" not in res else infer_aspects_keywords(text)
-                    aspects_str = "|".join(f"{k}:{v}" for k, v in aspects_val.items()) if isinstance(aspects_val, dict) else aspects_val
-
-                    append_result(RESULTS_CSV, text, sentiment, urg, aspects_str)
-                    if sentiment == "negative" and urg == "high":
-                        append_alert(ALERTS_CSV, "negativo/alto", sentiment, urg, "umbral auto", aspects_str)
-
-                # 🔔 Despierta a quien esté esperando este cid
-                waiter = WAITERS.pop(cid, None)
-                if waiter:
-                    waiter.set()
-
-                print("✅ stored:", cid)
+                sw.lap(ST_DESERIALIZE)
+                if handle_result(msg.topic(), evt, sw):
+                    per_msg.info("stored", cid=evt.get("correlation_id"))
+                MSG_OK.inc()
             except Exception as e:
-                print("❌ parse error:", e)
+                MSG_ERR.inc()
+                err_log.error("parse error", err=repr(e))
     finally:
         cons.close()
 
 @app.on_event("startup")
 def _startup():
+    global HEARTBEATS
+    from confluent_kafka import Consumer
+    get_producer()
     # crea los topics antes de arrancar el consumer
-    ensure_topics(KAFKA_BROKERS, [
-        TOPIC_SENT_IN, TOPIC_SENT_OUT,
-        TOPIC_ABSA_IN, TOPIC_ABSA_OUT
-    ])
+    partitions = parse_partitions(TOPIC_PARTITIONS, TOPICS)
+    partitions[CONTROL_TOPIC] = 1
+    ensure_topics(KAFKA_BROKERS, TOPICS, partitions)
     t = threading.Thread(target=bg_consume, daemon=True)
     t.start()
+    # cada instancia ve TODOS los heartbeats: assign() sin grupo ni commits (group.id fijo
+    # sólo porque librdkafka lo exige; no se une al grupo ni guarda offsets)
+    HEARTBEATS = HeartbeatMonitor(Consumer(consumer_conf(
+        KAFKA_BROKERS, f"{GROUP_ID}-control", **{"enable.auto.commit": False, "auto.offset.reset": "latest"}))).start()
 
 # ===== endpoints =====
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {"status": "ok", "admission": ADMISSION.snapshot()}
+
+@app.get("/ready")
+def ready():
+    """Broker accesible, tópicos creados y workers requeridos listos (503 si algo falla)."""
+    global _ADMIN
+    checks: Dict[str, object] = {}
+    ok = True
+    try:
+        if _ADMIN is None:
+            from confluent_kafka.admin import AdminClient
+            _ADMIN = AdminClient({"bootstrap.servers": KAFKA_BROKERS})
+        md = _ADMIN.list_topics(timeout=READY_TIMEOUT_S)
+        checks["broker"] = "ok"
+        missing_topics = [t for t in TOPICS if t not in md.topics]
+        checks["topics"] = {"missing": missing_topics} if missing_topics else "ok"
+        ok = not missing_topics
+    except Exception as e:
+        checks["broker"] = f"error: {e}"
+        ok = False
+    if HEARTBEATS is None:
+        missing_workers = list(READY_SERVICES)
+        checks["workers"] = {}
+    else:
+        missing_workers = HEARTBEATS.missing(READY_SERVICES, max_age_s=3 * HEARTBEAT_S)
+        checks["workers"] = HEARTBEATS.services(max_age_s=3 * HEARTBEAT_S)
+    if missing_workers:
+        checks["missing_workers"] = missing_workers
+        ok = False
+    return JSONResponse(status_code=200 if ok else 503, content={"ready": ok, "checks": checks})
+
+@app.get("/shadow")
+def shadow():
+    """Resumen incremental primario vs candidato (404 si el modo shadow está desactivado)."""
+    if SHADOW is None:
+        raise HTTPException(status_code=404, detail="modo shadow desactivado (SHADOW_TOPIC_IN)")
+    return SHADOW.summary()
+
+@app.get("/metrics")
+def metrics():
+    return Response(content=render_prometheus(), media_type=CONTENT_TYPE)
+
+def _overloaded(status: int, detail: str, retry_after: int) -> JSONResponse:
+    return JSONResponse(status_code=status, content={"detail": detail},
+                        headers={"Retry-After": str(retry_after)})
 
 @app.post("/predict")
 def predict_one(item: Item):
+    cid = str(uuid.uuid4())
+    # 🧹 normalización única: este texto es el que ven featurizer/workers
+    text = normalize_text(item.text)
+    payload = {k: v for k, v in item.dict().items() if v is not None}
+    payload["text"] = text
+    _dedup_check()
+    first, shared = _dedup_lookup(cid, text) if DEDUP is not None else (None, None)
+    if first is not None:
+        if shared is not None and shared.done.is_set() and shared.evt:
+            # repetido ya resuelto: ni slot ni worker (sólo se publica el resultado para el sink)
+            return _from_first(cid, first, shared.evt, item.text, payload)
+
+    # 🚦 sin slot libre: 429/503 inmediato en vez de encolar en Kafka y esperar 10 s
     try:
-        cid = enqueue(TOPIC_SENT_IN, {"text": item.text})
+        t0 = ADMISSION.acquire()
+    except Rejected as r:
+        if first is None and shared is not None:
+            shared.done.set()
+        return _overloaded(r.status, f"sobrecarga ({r.reason}), reintenta más tarde", r.retry_after)
+    overloaded = False
+    try:
+        if first is not None and shared is not None:
+            # el primero sigue en vuelo: se espera su resultado en vez de re-inferir
+            if shared.done.wait(timeout=RESULT_TIMEOUT_S) and shared.evt:
+                return _from_first(cid, first, shared.evt, item.text, payload)
+            # si el primero falló, este resultado pasa a ser el del grupo
+        # el waiter se registra ANTES de producir: con workers rápidos el
+        # resultado puede llegar antes de que enqueue() retorne
         PENDING_TEXT[cid] = item.text
         waiter = Event()
         WAITERS[cid] = waiter
-        if not waiter.wait(timeout=10):   # ⏳ espera hasta 10s
-            raise TimeoutError("timeout esperando resultado de Kafka")
+        if SHADOW is not None:
+            # antes del primario: el par queda registrado aunque su resultado llegue enseguida
+            SHADOW.mirror(cid, payload, routing_key(payload, cid))
+        enqueue(TOPIC_SENT_IN, payload, cid=cid)
+        if not waiter.wait(timeout=RESULT_TIMEOUT_S):   # ⏳ espera acotada
+            overloaded = True
+            return _overloaded(503, "timeout esperando resultado de Kafka", ADMISSION.retry_after())
         evt = RESULTS.pop(cid, None)
         if not evt:
             raise ValueError("sin resultado")
+        if shared is not None:
+            _shared_result(shared, evt)
         return evt   # ✅ devuelve el resultado directo
     except Exception as e:
         return JSONResponse(status_code=500, content={"detail": f"error en /predict: {e}"})
+    finally:
+        if first is None and shared is not None:
+            shared.done.set()                # despierta a los duplicados (con o sin resultado)
+        WAITERS.pop(cid, None)
+        RESULTS.pop(cid, None)               # resultado llegado justo tras el timeout
+        ADMISSION.release(t0, overloaded)
 
 # ===== arranque rápido =====
 if __name__ == "__main__":
@@ -181,6 +469,3 @@ if __name__ == "__main__":
         port=int(os.getenv("PORT", 8000)),
         log_level="info"
     )
-
-        log_level="info"
-    )
@@ -0,0 +1,362 @@
+"""
+inmemory_kafka.py
+
+Broker en memoria que implementa la superficie de confluent_kafka que usan
+api/main.py y los workers (Producer, Consumer, AdminClient, NewTopic,
+TopicPartition), para correr todo el pipeline en un solo proceso.
+
+- Usable como módulo:
+    from benchmarks.inmemory_kafka import install
+    broker = install()          # registra 'confluent_kafka' falso en sys.modules
+    import api.main             # ...y a partir de aquí usa el broker en memoria
+
+Semántica soportada (la necesaria para el benchmark):
+  - tópicos con N particiones; partición por hash de key (o round-robin sin key)
+  - grupos de consumidores con reparto round-robin de particiones entre miembros
+  - offsets por grupo con auto-commit al entregar el mensaje
+  - assign() manual (OFFSET_BEGINNING/OFFSET_END): posición local, sin grupo
+    ni offsets en el broker
+"""
+
+from __future__ import annotations
+from concurrent.futures import Future
+from threading import Condition
+from time import monotonic, time
+from types import ModuleType
+from typing import Any, Dict, List, Optional, Tuple
+import itertools, sys, zlib
+
+OFFSET_BEGINNING = -2
+OFFSET_END = -1
+OFFSET_INVALID = -1001
+
+
+class KafkaError:
+    def __init__(self, code: int, reason: str = ""):
+        self._code, self._reason = code, reason
+
+    def code(self) -> int:
+        return self._code
+
+    def str(self) -> str:
+        return self._reason
+
+    def __str__(self) -> str:
+        return self._reason
+
+
+class KafkaException(Exception):
+    pass
+
+
+class TopicPartition:
+    def __init__(self, topic: str, partition: int = -1, offset: int = OFFSET_INVALID):
+        self.topic, self.partition, self.offset = topic, partition, offset
+
+    def __repr__(self) -> str:
+        return f"TopicPartition({self.topic!r}, {self.partition}, {self.offset})"
+
+    def __eq__(self, other) -> bool:
+        return (self.topic, self.partition) == (other.topic, other.partition)
+
+    def __hash__(self) -> int:
+        return hash((self.topic, self.partition))
+
+
+class Message:
+    __slots__ = ("_topic", "_partition", "_offset", "_key", "_value", "_ts")
+
+    def __init__(self, topic, partition, offset, key, value, ts):
+        self._topic, self._partition, self._offset = topic, partition, offset
+        self._key, self._value, self._ts = key, value, ts
+
+    def topic(self): return self._topic
+    def partition(self): return self._partition
+    def offset(self): return self._offset
+    def key(self): return self._key
+    def value(self): return self._value
+    def timestamp(self): return (1, int(self._ts * 1000))
+    def error(self): return None
+
+
+def _as_bytes(v: Any) -> Optional[bytes]:
+    if v is None or isinstance(v, bytes):
+        return v
+    return str(v).encode("utf-8")
+
+
+class InMemoryBroker:
+    """Estado compartido: tópicos, logs por partición y offsets por grupo."""
+
+    def __init__(self, default_partitions: int = 1):
+        self.default_partitions = default_partitions
+        self.topics: Dict[str, List[List[Message]]] = {}
+        self.committed: Dict[Tuple[str, str, int], int] = {}      # (group, topic, part) -> offset
+        self.members: Dict[str, List["Consumer"]] = {}            # group -> consumidores
+        self.cond = Condition()
+        self._rr = itertools.count()
+
+    # --- tópicos ---
+    def create_topic(self, name: str, partitions: Optional[int] = None) -> None:
+        with self.cond:
+            if name not in self.topics:
+                self.topics[name] = [[] for _ in range(partitions or self.default_partitions)]
+                self._rebalance_all()
+
+    def add_partitions(self, name: str, total: int) -> None:
+        with self.cond:
+            parts = self.topics[name]
+            parts.extend([] for _ in range(total - len(parts)))
+            self._rebalance_all()
+
+    def append(self, topic: str, key: Optional[bytes], value: Optional[bytes], partition: int = -1) -> Message:
+        if topic not in self.topics:
+            self.create_topic(topic)          # auto.create.topics.enable
+        with self.cond:
+            parts = self.topics[topic]
+            if partition < 0:
+                partition = (zlib.crc32(key) if key is not None else next(self._rr)) % len(parts)
+            log = parts[partition]
+            msg = Message(topic, partition, len(log), key, value, time())
+            log.append(msg)
+            self.cond.notify_all()
+            return msg
+
+    # --- grupos ---
+    def join(self, consumer: "Consumer") -> None:
+        with self.cond:
+            group = self.members.setdefault(consumer.group_id, [])
+            if consumer not in group:
+                group.append(consumer)
+            self._rebalance(consumer.group_id)
+
+    def leave(self, consumer: "Consumer") -> None:
+        with self.cond:
+            group = self.members.get(consumer.group_id, [])
+            if consumer in group:
+                group.remove(consumer)
+            self._rebalance(consumer.group_id)
+
+    def _rebalance_all(self) -> None:
+        for g in list(self.members):
+            self._rebalance(g)
+
+    def _rebalance(self, group_id: str) -> None:
+        members = self.members.get(group_id, [])
+        for m in members:
+            m._assigned = []
+        if not members:
+            return
+        for topic in sorted({t for m in members for t in m._subscription}):
+            if topic not in self.topics:
+                continue
+            subs = [m for m in members if topic in m._subscription]
+            for p in range(len(self.topics[topic])):
+                subs[p % len(subs)]._assigned.append((topic, p))
+
+    def watermarks(self, topic: str, partition: int) -> Tuple[int, int]:
+        return 0, len(self.topics.get(topic, [[]])[partition])
+
+
+_DEFAULT_BROKER: Optional[InMemoryBroker] = None
+
+
+def _broker(conf: Optional[dict]) -> InMemoryBroker:
+    b = (conf or {}).get("broker") or _DEFAULT_BROKER
+    if b is None:
+        raise KafkaException("InMemoryBroker no instalado (usa install())")
+    return b
+
+
+class Producer:
+    def __init__(self, conf: Optional[dict] = None):
+        self.broker = _broker(conf)
+
+    def produce(self, topic: str, value=None, key=None, partition: int = -1, on_delivery=None, **kwargs):
+        msg = self.broker.append(topic, _as_bytes(key), _as_bytes(value), partition)
+        cb = on_delivery or kwargs.get("callback")
+        if cb:
+            cb(None, msg)
+
+    def poll(self, timeout: float = 0) -> int:
+        return 0
+
+    def flush(self, timeout: float = -1) -> int:
+        return 0
+
+    def __len__(self) -> int:
+        return 0
+
+
+class Consumer:
+    def __init__(self, conf: dict):
+        self.broker = _broker(conf)
+        self.group_id = conf.get("group.id", "default")
+        self.reset_earliest = conf.get("auto.offset.reset", "latest") in ("earliest", "smallest", "beginning")
+        self._subscription: List[str] = []
+        self._assigned: List[Tuple[str, int]] = []
+        self._manual: Optional[Dict[Tuple[str, int], int]] = None   # posiciones de assign()
+        self._closed = False
+        self._rr = 0
+
+    def subscribe(self, topics: List[str], **kwargs) -> None:
+        for t in topics:
+            if t not in self.broker.topics:
+                self.broker.create_topic(t)
+        self._subscription = list(topics)
+        self.broker.join(self)
+
+    def assign(self, partitions: List[TopicPartition]) -> None:
+        for tp in partitions:
+            if tp.topic not in self.broker.topics:
+                self.broker.create_topic(tp.topic)
+        with self.broker.cond:
+            self._manual = {}
+            for tp in partitions:
+                end = len(self.broker.topics[tp.topic][tp.partition])
+                self._manual[(tp.topic, tp.partition)] = (
+                    end if tp.offset == OFFSET_END else 0 if tp.offset in (OFFSET_BEGINNING, OFFSET_INVALID)
+                    else min(tp.offset, end))
+            self._assigned = list(self._manual)
+
+    def _position(self, topic: str, part: int) -> int:
+        if self._manual is not None:
+            return self._manual[(topic, part)]
+        key = (self.group_id, topic, part)
+        pos = self.broker.committed.get(key)
+        if pos is None:
+            pos = 0 if self.reset_earliest else len(self.broker.topics[topic][part])
+            self.broker.committed[key] = pos
+        return pos
+
+    def _next_locked(self) -> Optional[Message]:
+        n = len(self._assigned)
+        for i in range(n):
+            topic, part = self._assigned[(self._rr + i) % n]
+            pos = self._position(topic, part)
+            log = self.broker.topics[topic][part]
+            if pos < len(log):
+                if self._manual is not None:
+                    self._manual[(topic, part)] = pos + 1
+                else:
+                    self.broker.committed[(self.group_id, topic, part)] = pos + 1
+                self._rr = (self._rr + i + 1) % n
+                return log[pos]
+        return None
+
+    def poll(self, timeout: Optional[float] = None) -> Optional[Message]:
+        if self._closed:
+            raise RuntimeError("Consumer closed")
+        deadline = monotonic() + (timeout if timeout is not None and timeout >= 0 else 1e9)
+        with self.broker.cond:
+            while True:
+                msg = self._next_locked()
+                if msg is not None:
+                    return msg
+                left = deadline - monotonic()
+                if left <= 0:
+                    return None
+                self.broker.cond.wait(left)
+
+    def consume(self, num_messages: int = 1, timeout: float = -1) -> List[Message]:
+        out: List[Message] = []
+        first = self.poll(timeout)
+        if first is None:
+            return out
+        out.append(first)
+        while len(out) < num_messages:
+            m = self.poll(0)
+            if m is None:
+                break
+            out.append(m)
+        return out
+
+    def assignment(self) -> List[TopicPartition]:
+        return [TopicPartition(t, p) for t, p in self._assigned]
+
+    def position(self, partitions: List[TopicPartition]) -> List[TopicPartition]:
+        return [TopicPartition(tp.topic, tp.partition, self._position(tp.topic, tp.partition)) for tp in partitions]
+
+    def get_watermark_offsets(self, tp: TopicPartition, timeout: float = None, cached: bool = False):
+        return self.broker.watermarks(tp.topic, tp.partition)
+
+    def commit(self, *args, **kwargs) -> None:
+        return None
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self.broker.leave(self)
+
+
+# ---- admin ----
+class NewTopic:
+    def __init__(self, topic: str, num_partitions: int = 1, replication_factor: int = 1, **kwargs):
+        self.topic, self.num_partitions, self.replication_factor = topic, num_partitions, replication_factor
+
+
+class NewPartitions:
+    def __init__(self, topic: str, new_total_count: int):
+        self.topic, self.new_total_count = topic, new_total_count
+
+
+class _TopicMetadata:
+    def __init__(self, topic: str, n: int):
+        self.topic = topic
+        self.partitions = {i: None for i in range(n)}
+
+
+class _ClusterMetadata:
+    def __init__(self, broker: InMemoryBroker):
+        self.topics = {t: _TopicMetadata(t, len(p)) for t, p in broker.topics.items()}
+        self.brokers = {0: "inmemory"}
+
+
+def _done(value=None) -> Future:
+    f: Future = Future()
+    f.set_result(value)
+    return f
+
+
+class AdminClient:
+    def __init__(self, conf: Optional[dict] = None):
+        self.broker = _broker(conf)
+
+    def list_topics(self, topic: Optional[str] = None, timeout: float = -1) -> _ClusterMetadata:
+        return _ClusterMetadata(self.broker)
+
+    def create_topics(self, new_topics: List[NewTopic], **kwargs) -> Dict[str, Future]:
+        out = {}
+        for nt in new_topics:
+            if nt.topic in self.broker.topics:
+                f: Future = Future(); f.set_exception(KafkaException(f"Topic '{nt.topic}' already exists"))
+                out[nt.topic] = f
+            else:
+                self.broker.create_topic(nt.topic, nt.num_partitions)
+                out[nt.topic] = _done()
+        return out
+
+    def create_partitions(self, new_partitions: List[NewPartitions], **kwargs) -> Dict[str, Future]:
+        out = {}
+        for np_ in new_partitions:
+            self.broker.add_partitions(np_.topic, np_.new_total_count)
+            out[np_.topic] = _done()
+        return out
+
+
+def install(broker: Optional[InMemoryBroker] = None) -> InMemoryBroker:
+    """Registra módulos 'confluent_kafka' y 'confluent_kafka.admin' falsos en sys.modules."""
+    global _DEFAULT_BROKER
+    _DEFAULT_BROKER = broker or InMemoryBroker()
+
+    ck = ModuleType("confluent_kafka")
+    for name in ("Producer", "Consumer", "TopicPartition", "Message", "KafkaError", "KafkaException"):
+        setattr(ck, name, globals()[name])
+    ck.OFFSET_INVALID, ck.OFFSET_BEGINNING, ck.OFFSET_END = OFFSET_INVALID, OFFSET_BEGINNING, OFFSET_END
+    admin = ModuleType("confluent_kafka.admin")
+    for name in ("AdminClient", "NewTopic", "NewPartitions"):
+        setattr(admin, name, globals()[name])
+    ck.admin = admin
+    sys.modules["confluent_kafka"] = ck
+    sys.modules["confluent_kafka.admin"] = admin
+    return _DEFAULT_BROKER
@@ -0,0 +1,272 @@
+"""
+run_e2e.py
+
+Benchmark end-to-end del pipeline (API + worker baseline + worker ABSA) en un
+solo proceso, sobre el broker en memoria de benchmarks/inmemory_kafka.py.
+
+Reproduce data/processed/03_test.csv a QPS configurable (carga en lazo
+abierto: la latencia se mide desde el instante programado de envío, así que
+incluye la cola si el sistema no da abasto), reporta p50/p95/p99 por nivel de
+carga y el máximo throughput sostenible, y guarda todo en JSON.
+
+- Uso:
+    python -m benchmarks.run_e2e --qps 25,50,100,200 --duration 10
+    python -m benchmarks.run_e2e --target both --out benchmarks/results/mi_rama.json \
+        --compare benchmarks/results/baseline.json
+
+- Un nivel de QPS es "sostenible" si se alcanza >= 95 % del objetivo, sin
+  errores y con p99 <= --slo-ms. Con --compare, sale con código 1 si el
+  máximo sostenible baja o el p99 sube más de --tolerance respecto al JSON
+  de referencia.
+"""
+
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Event, Thread
+from time import perf_counter, sleep, time
+from typing import Any, Dict, List, Optional
+import argparse, csv, importlib.util, json, os, platform, subprocess, sys, tempfile, uuid
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_CSV = ROOT / "data" / "processed" / "03_test.csv"
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+
+class Overloaded(Exception):
+    """La API rechazó la petición (429/503 del control de admisión)."""
+
+
+def percentile(sorted_vals: List[float], q: float) -> float:
+    """Percentil por rango más cercano (q en [0, 100])."""
+    if not sorted_vals:
+        return float("nan")
+    k = max(int(round(q / 100 * len(sorted_vals) + 0.5)) - 1, 0)
+    return sorted_vals[min(k, len(sorted_vals) - 1)]
+
+
+def load_texts(path: Path, limit: Optional[int] = None) -> List[str]:
+    with open(path, newline="", encoding="utf-8") as f:
+        texts = [row["text"] for row in csv.DictReader(f) if row.get("text")]
+    return texts[:limit] if limit else texts
+
+
+def _load_module(name: str, path: Path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+class Pipeline:
+    """Levanta API + workers contra el broker en memoria, en hilos daemon."""
+
+    def __init__(self, models_dir: Path, with_absa: bool = True):
+        from benchmarks.inmemory_kafka import install
+        self.broker = install()
+        os.environ.setdefault("KAFKA_BROKERS", "inmemory:0")
+        os.environ["MODEL_PATH"] = str(models_dir / "02_sentiment_logreg_tfidf.joblib")
+        os.environ["MODELS_DIR"] = str(models_dir)
+        os.environ["CONFIGS_DIR"] = str(ROOT / "models" / "model_configs")
+        os.environ["METRICS_PORT"] = "0"          # puerto efímero: varios servicios en un proceso
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        os.environ.setdefault("HEARTBEAT_S", "0.5")
+        os.environ["READY_SERVICES"] = "sentiment,absa" if with_absa else "sentiment"
+        # el CSV se repite (texts[i % len(texts)]): con la caché de duplicados de la API las
+        # vueltas siguientes se responderían sin pasar por Kafka ni por los workers
+        os.environ["DEDUP_WINDOW"] = "0"
+
+        sys.path.insert(0, str(ROOT))
+        import api.main as api
+        self.api = api
+        self._tmp = tempfile.TemporaryDirectory(prefix="bench_reports_")
+        api.RESULTS_CSV = Path(self._tmp.name) / "results_log.csv"
+        api.ALERTS_CSV = Path(self._tmp.name) / "alerts_log.csv"
+
+        t0 = perf_counter()
+        self.sentiment = _load_module("bench_worker_sentiment", ROOT / "src" / "dockers" / "baseline" / "main.py")
+        self.absa = _load_module("bench_worker_absa", ROOT / "src" / "dockers" / "absa" / "main.py") if with_absa else None
+        self.load_s = perf_counter() - t0
+
+        t0 = perf_counter()
+        api._startup()
+        for w in (self.sentiment, self.absa):
+            if w is not None:
+                Thread(target=w.main, daemon=True).start()
+        self.ready_s = self.wait_ready()
+        self.ready_s = round(perf_counter() - t0, 3) if self.ready_s is not None else None
+
+    def wait_ready(self, timeout: float = 60.0) -> Optional[float]:
+        """Espera a que /ready devuelva 200 (como haría un balanceador)."""
+        deadline = perf_counter() + timeout
+        while perf_counter() < deadline:
+            if self.api.ready().status_code == 200:
+                return perf_counter()
+            sleep(0.05)
+        return None
+
+    def request(self, topic: str, text: str, timeout: float = 10.0) -> Dict[str, Any]:
+        """Mismo flujo que /predict pero para cualquier tópico de entrada."""
+        api = self.api
+        if topic == api.TOPIC_SENT_IN:
+            out = api.predict_one(api.Item(text=text))
+            if not isinstance(out, dict):
+                if out.status_code in (429, 503):
+                    raise Overloaded(out.status_code)
+                raise RuntimeError(out.body.decode("utf-8"))
+            return out
+        cid = str(uuid.uuid4())
+        waiter = Event()
+        api.PENDING_TEXT[cid] = text
+        api.RESULT_TOPIC[cid] = api.TOPIC_ABSA_OUT       # el cid se resuelve con la salida de ABSA
+        api.WAITERS[cid] = waiter
+        try:
+            api.enqueue(topic, {"text": text}, cid=cid)
+            if not waiter.wait(timeout):
+                raise TimeoutError(f"timeout en {topic}")
+            return api.RESULTS.pop(cid)
+        finally:
+            api.WAITERS.pop(cid, None)
+            api.RESULT_TOPIC.pop(cid, None)
+
+
+def run_level(pipe: Pipeline, texts: List[str], topics: List[str], qps: float,
+              duration: float, concurrency: int) -> Dict[str, Any]:
+    """Carga en lazo abierto a `qps` durante `duration` segundos."""
+    n = max(int(qps * duration), 1)
+    lat: List[float] = []
+    rejected_lat: List[float] = []
+    first: List[float] = []
+    errors = 0
+
+    def one(i: int, t_sched: float):
+        nonlocal errors
+        try:
+            for topic in topics:
+                pipe.request(topic, texts[i % len(texts)])
+            lat.append(perf_counter() - t_sched)
+            if i == 0:
+                first.append(lat[-1])
+        except Overloaded:
+            rejected_lat.append(perf_counter() - t_sched)
+        except Exception:
+            errors += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = perf_counter()
+        for i in range(n):
+            t_sched = start + i / qps
+            delay = t_sched - perf_counter()
+            if delay > 0:
+                sleep(delay)
+            pool.submit(one, i, t_sched)
+    elapsed = perf_counter() - start
+    lat.sort()
+    rejected_lat.sort()
+    return {
+        "qps_target": qps,
+        "qps_achieved": round(len(lat) / elapsed, 2) if elapsed else 0.0,
+        "n": n,
+        "ok": len(lat),
+        "errors": errors,
+        "rejected": len(rejected_lat),
+        "rejected_p99_ms": round(percentile(rejected_lat, 99) * 1e3, 3) if rejected_lat else None,
+        "p50_ms": round(percentile(lat, 50) * 1e3, 3),
+        "p95_ms": round(percentile(lat, 95) * 1e3, 3),
+        "p99_ms": round(percentile(lat, 99) * 1e3, 3),
+        "max_ms": round(lat[-1] * 1e3, 3) if lat else None,
+        "first_ms": round(first[0] * 1e3, 3) if first else None,
+    }
+
+
+def _git_version() -> str:
+    try:
+        return subprocess.check_output(["git", "-C", str(ROOT), "describe", "--always", "--dirty"],
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current: Dict[str, Any], reference: Dict[str, Any], tolerance: float) -> List[str]:
+    """Devuelve la lista de regresiones (vacía si todo está dentro de la tolerancia)."""
+    problems = []
+    ref_max, cur_max = reference.get("max_sustainable_qps") or 0, current.get("max_sustainable_qps") or 0
+    if ref_max and cur_max < ref_max * (1 - tolerance):
+        problems.append(f"max_sustainable_qps {cur_max} < {ref_max} (-{tolerance:.0%})")
+    ref_runs = {r["qps_target"]: r for r in reference.get("runs", [])}
+    for r in current.get("runs", []):
+        ref = ref_runs.get(r["qps_target"])
+        if ref and ref.get("p99_ms") and r.get("p99_ms") and r["p99_ms"] > ref["p99_ms"] * (1 + tolerance):
+            problems.append(f"p99 @ {r['qps_target']} qps: {r['p99_ms']} ms > {ref['p99_ms']} ms (+{tolerance:.0%})")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark end-to-end API + workers (broker en memoria)")
+    ap.add_argument("--csv", type=Path, default=DEFAULT_CSV)
+    ap.add_argument("--models-dir", type=Path, default=ROOT / "models" / "trained_models")
+    ap.add_argument("--target", choices=["sentiment", "absa", "both"], default="sentiment")
+    ap.add_argument("--qps", default="25,50,100,200", help="niveles de carga separados por coma")
+    ap.add_argument("--duration", type=float, default=10.0, help="segundos por nivel")
+    ap.add_argument("--warmup", type=int, default=20, help="peticiones de calentamiento (no medidas)")
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--slo-ms", type=float, default=1000.0)
+    ap.add_argument("--out", type=Path, default=None)
+    ap.add_argument("--compare", type=Path, default=None)
+    ap.add_argument("--tolerance", type=float, default=0.15)
+    args = ap.parse_args(argv)
+
+    texts = load_texts(args.csv)
+    pipe = Pipeline(args.models_dir, with_absa=args.target != "sentiment")
+    api = pipe.api
+    topics = {"sentiment": [api.TOPIC_SENT_IN], "absa": [api.TOPIC_ABSA_IN],
+              "both": [api.TOPIC_SENT_IN, api.TOPIC_ABSA_IN]}[args.target]
+
+    for i in range(args.warmup):
+        for t in topics:
+            pipe.request(t, texts[i % len(texts)])
+
+    runs, max_ok = [], 0.0
+    for qps in [float(q) for q in args.qps.split(",") if q.strip()]:
+        r = run_level(pipe, texts, topics, qps, args.duration, args.concurrency)
+        r["sustainable"] = (r["errors"] == 0 and r["rejected"] == 0 and r["qps_achieved"] >= 0.95 * qps
+                            and r["p99_ms"] <= args.slo_ms)
+        if r["sustainable"]:
+            max_ok = max(max_ok, r["qps_achieved"])
+        runs.append(r)
+        print(f"[i] {qps:>7.1f} qps -> {r['qps_achieved']:>7.1f} qps | p50 {r['p50_ms']:.1f} ms | "
+              f"p95 {r['p95_ms']:.1f} ms | p99 {r['p99_ms']:.1f} ms | err {r['errors']} | 429/503 {r['rejected']}"
+              f"{'' if r['sustainable'] else '  (no sostenible)'}")
+
+    version = _git_version()
+    if version.endswith("-dirty"):
+        print("[!] Árbol con cambios sin commit: no uses este JSON como referencia (--compare)")
+    result = {
+        "version": version,
+        "ts": time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": {"target": args.target, "duration_s": args.duration, "concurrency": args.concurrency,
+                   "slo_ms": args.slo_ms, "dedup_window": api.DEDUP_WINDOW,
+                   "csv": str(args.csv.relative_to(ROOT)) if args.csv.is_relative_to(ROOT) else str(args.csv)},
+        "model_load_s": round(pipe.load_s, 3),
+        "ready_s": pipe.ready_s,
+        "runs": runs,
+        "max_sustainable_qps": max_ok,
+    }
+    out = args.out or RESULTS_DIR / f"e2e_{args.target}_{result['version']}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(f"[✓] Resultado: {out} (máx. sostenible {max_ok} qps)")
+
+    if args.compare:
+        problems = compare(result, json.loads(args.compare.read_text(encoding="utf-8")), args.tolerance)
+        for p in problems:
+            print(f"[!] Regresión: {p}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
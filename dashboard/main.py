@@ -15,15 +15,27 @@ import pandas as pd
 import altair as alt
 from pathlib import Path
 
-# Ruta fija hacia la carpeta donde guardas los logs:
-# -> si tus CSV están en src/utils, usa: Path(__file__).resolve().parent / "src" / "utils"
-reports_dir = Path(__file__).resolve().parent / "src"
-reports_dir.mkdir(parents=True, exist_ok=True)  # opcional, por si no existe
-
-# Rutas de los ficheros
+try:
+    from src.utils.results_store import Filters, ResultsStore
+    from src.utils.settings import Settings
+except ModuleNotFoundError:
+    sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))  # añade .../src
+    from utils.results_store import Filters, ResultsStore
+    from utils.settings import Settings
+
+# Carpeta de los logs de la API: REPORTS_DIR (default docs/reports; la copia
+# que se despliega con el dashboard está en REPORTS_DIR=dashboard/src)
+reports_dir = Settings.from_env().reports_dir
 RESULTS_CSV = reports_dir / "results_log.csv"
 ALERTS_CSV  = reports_dir / "alerts_log.csv"
 
+# Store SQLite del sink (src/dockers/sink). Sin RESULTS_DB se importa el CSV a
+# un store en memoria: en ambos casos filtros, conteos y paginación van en SQL
+# y sólo se traen a pandas los conteos y la página visible. El store en memoria
+# es uno por proceso y en cada rerun sólo importa las filas nuevas del CSV.
+RESULTS_DB = os.getenv("RESULTS_DB", "")
+PAGE_SIZE  = int(os.getenv("PAGE_SIZE", "50"))
+
 # Estilo del dashboard
 st.set_page_config(page_title="Panel de Análisis de Sentimientos", layout="wide")
 PASTEL_BG   = "#F7F6FB"
@@ -37,43 +49,64 @@ st.markdown(f"<h3 style='color:{PASTEL_H3};'>Amazon Product Reviews – Celulare
 st.markdown(f"<hr style='border:1px solid {PASTEL_LINE};'/>", unsafe_allow_html=True)
 
 # --- Función auxiliar ---
-def load_csv(path: Path) -> pd.DataFrame:
-    if not path.exists():
-        return pd.DataFrame(columns=["ts", "text", "sentiment", "urgency", "aspects"])
-    df = pd.read_csv(path)
-    for c in ["ts", "text", "sentiment", "urgency", "aspects"]:
-        if c not in df.columns:
-            df[c] = ""
-    return df
-
-# Cargamos los datos
-results = load_csv(RESULTS_CSV)
-alerts  = load_csv(ALERTS_CSV)
-
-if "ts" in results.columns:
-    results["ts"] = pd.to_datetime(results["ts"], errors="coerce", utc=True)
+@st.cache_resource(max_entries=1)
+def open_store(db: str, csv: str) -> ResultsStore:
+    """Store de solo lectura del sink, o uno en memoria para el CSV (compartido por todas las sesiones)."""
+    return ResultsStore(db, readonly=True) if db else ResultsStore(":memory:")
+
+if RESULTS_DB and not Path(RESULTS_DB).exists():
+    st.warning(f"RESULTS_DB={RESULTS_DB} no existe todavía; ¿está corriendo el sink?")
+    st.stop()
+store = open_store(RESULTS_DB, str(RESULTS_CSV))
+if not RESULTS_DB:
+    store.sync_csv(RESULTS_CSV)     # sólo las filas que la API añadió desde el último rerun
+
+# Sólo conteos; las filas se piden ya filtradas y paginadas
+total_rows   = store.count()
+alerts_count = store.count_alerts()
 
 # Filtros del dashboard
 c1, c2, c3 = st.columns([1, 1, 1.2])
 with c1:
     urg_filter = st.multiselect("Filtrar urgencia", ["low", "medium", "high"], default=["low", "medium", "high"])
+    asp_filter = st.multiselect("Filtrar aspecto (vacío = todos)", store.aspects(), default=[])
 with c2:
     sent_filter = st.multiselect("Filtrar sentimiento", ["positive", "neutral", "negative"], default=["positive", "neutral", "negative"])
+    ts_min, ts_max = store.ts_range()
+    dates = ()
+    if ts_min is not None:
+        d_min = pd.to_datetime(ts_min, unit="s", utc=True).date()
+        d_max = pd.to_datetime(ts_max, unit="s", utc=True).date()
+        dates = st.date_input("Rango de fechas", value=(d_min, d_max), min_value=d_min, max_value=d_max)
 with c3:
-    max_rows = len(results)
+    max_rows = max(total_rows, 50)
     show_n = st.slider("Mostrar últimos N registros", 50, max_rows, min(500, max_rows))
-    st.metric("Alertas (global)", f"{len(alerts)}")
+    st.metric("Alertas (global)", f"{alerts_count}")
+
+def _day_ts(d, days: int = 0) -> float:
+    return (pd.Timestamp(d, tz="UTC") + pd.Timedelta(days=days)).timestamp()
 
-if len(results):
-    df_filtered = results[
-        results["urgency"].astype(str).str.lower().isin([u.lower() for u in urg_filter]) &
-        results["sentiment"].astype(str).str.lower().isin([s.lower() for s in sent_filter])
-    ].copy()
-    df_filtered = df_filtered.sort_values("ts").tail(show_n)
+filters = Filters(
+    urgencies=[u.lower() for u in urg_filter],
+    sentiments=[s.lower() for s in sent_filter],
+    aspects=asp_filter or None,
+    ts_from=_day_ts(dates[0]) if len(dates) >= 1 else None,
+    ts_to=_day_ts(dates[-1], days=1) if len(dates) >= 1 else None,
+)
 
-    total_rango    = len(df_filtered)
-    neg_pct_rango  = (df_filtered["sentiment"].astype(str).str.lower().eq("negative").mean() * 100) if total_rango else 0.0
-    high_pct_rango = (df_filtered["urgency"].astype(str).str.lower().eq("high").mean() * 100) if total_rango else 0.0
+if total_rows:
+    # (urgencia, sentimiento) -> n de las últimas N filas filtradas, agregado en SQL
+    order_sent, order_urg = ["negative", "neutral", "positive"], ["low", "medium", "high"]
+    full_idx = pd.MultiIndex.from_product([order_urg, order_sent], names=["urgency", "sentiment"])
+    cross = (
+        pd.Series(store.counts(filters, window=show_n), dtype="int64")
+        .reindex(full_idx, fill_value=0).rename("count").reset_index()
+    )
+    stack_df = cross
+
+    total_rango    = int(cross["count"].sum())
+    neg_pct_rango  = (cross.loc[cross["sentiment"] == "negative", "count"].sum() / total_rango * 100) if total_rango else 0.0
+    high_pct_rango = (cross.loc[cross["urgency"] == "high", "count"].sum() / total_rango * 100) if total_rango else 0.0
 
     k1, k2, k3 = st.columns(3)
     k1.metric("Reseñas (rango)", f"{total_rango}")
@@ -84,21 +117,12 @@ if len(results):
     with a:
         st.caption("**Rango** = aplica N y filtros superiores.")
     with b:
-        st.caption("**Global** = total histórico en *alerts_log.csv* (no depende de N).")
+        st.caption("**Global** = total histórico de alertas (no depende de N).")
 
     # Gráficos básicos
     st.subheader("Distribución de sentimiento y urgencia")
-    order_sent, order_urg = ["negative", "neutral", "positive"], ["low", "medium", "high"]
-
-    sent_counts = (
-        df_filtered.assign(sentiment=df_filtered["sentiment"].astype(str).str.lower())
-        .groupby("sentiment").size().reindex(order_sent, fill_value=0).reset_index(name="count")
-    )
-    urg_counts = (
-        df_filtered.assign(urgency=df_filtered["urgency"].astype(str).str.lower())
-        .groupby("urgency").size().reindex(order_urg, fill_value=0).reset_index(name="count")
-    )
-
+    sent_counts = cross.groupby("sentiment")["count"].sum().reindex(order_sent, fill_value=0).reset_index(name="count")
+    urg_counts  = cross.groupby("urgency")["count"].sum().reindex(order_urg, fill_value=0).reset_index(name="count")
     col1, col2 = st.columns(2)
     with col1:
         chart_sent = (
@@ -128,18 +152,6 @@ if len(results):
 
     st.subheader("Cruce urgencia × sentimiento")
     if total_rango:
-        cross = (
-            df_filtered.assign(
-                urgency=df_filtered["urgency"].astype(str).str.lower(),
-                sentiment=df_filtered["sentiment"].astype(str).str.lower(),
-            )
-            .groupby(["urgency", "sentiment"])
-            .size()
-            .reset_index(name="count")
-        )
-        full_idx = pd.MultiIndex.from_product([order_urg, order_sent], names=["urgency", "sentiment"])
-        cross = cross.set_index(["urgency", "sentiment"]).reindex(full_idx, fill_value=0).reset_index()
-
         heat = (
             alt.Chart(cross)
             .mark_rect()
@@ -155,18 +167,6 @@ if len(results):
 
     st.subheader("Composición de sentimiento por nivel de urgencia (%)")
     if total_rango:
-        stack_df = (
-            df_filtered.assign(
-                urgency=df_filtered["urgency"].astype(str).str.lower(),
-                sentiment=df_filtered["sentiment"].astype(str).str.lower(),
-            )
-            .groupby(["urgency", "sentiment"])
-            .size()
-            .reset_index(name="count")
-        )
-        full_idx = pd.MultiIndex.from_product([order_urg, order_sent], names=["urgency", "sentiment"])
-        stack_df = stack_df.set_index(["urgency", "sentiment"]).reindex(full_idx, fill_value=0).reset_index()
-
         stack_chart = (
             alt.Chart(stack_df)
             .mark_bar()
@@ -186,13 +186,29 @@ if len(results):
         st.altair_chart(stack_chart, use_container_width=True)
 
     st.subheader("Últimos resultados")
-    table = df_filtered.copy()
-    table = table[["sentiment", "urgency", "aspects", "text"]].rename(
+    # Paginación keyset: se guarda el cursor de inicio de cada página visitada;
+    # si cambian los filtros se vuelve a la primera.
+    if st.session_state.get("page_filters") != filters:
+        st.session_state.page_filters = filters
+        st.session_state.page_cursors = [None]
+    cursors = st.session_state.page_cursors
+    page_df, next_cursor = store.page(filters, limit=PAGE_SIZE, after=cursors[-1])
+
+    p1, p2, p3 = st.columns([1, 1, 4])
+    if p1.button("⬅️ Anterior", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if p2.button("Siguiente ➡️", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun()
+    p3.caption(f"Página {len(cursors)} · {store.count(filters)} reseñas con estos filtros")
+
+    table = page_df[["sentiment", "urgency", "aspects", "text"]].rename(
         columns={"sentiment": "Sentimiento", "urgency": "Urgencia", "aspects": "Aspectos", "text": "Texto"}
     )
     st.dataframe(table, use_container_width=True)
 
 else:
-    st.warning("Aún no hay datos en results_log.csv. Usa la API /predict o /batch para generar datos.")
+    st.warning("Aún no hay resultados. Usa la API /predict o /batch para generar datos.")
 
 
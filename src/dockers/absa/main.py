@@ -1,58 +1,193 @@
-import os, json, time, joblib, glob, re
+import os, json, time
+from pathlib import Path
+from threading import Lock
+from time import perf_counter
 from confluent_kafka import Consumer, Producer
 
+# ===== utilidades compartidas (src/utils) =====
+try:
+    from src.utils.instrumentation import (STAGE_SECONDS, BATCH_SIZE, MESSAGES, QUEUE_DEPTH,
+                                           Stopwatch, observe_consumer_lag, start_metrics_server)
+    from src.utils.model_registry import aspect_registry
+    from src.utils.kafka_utils import poll_batch, partition_batches, producer_conf, consumer_conf
+    from src.utils.log_setup import setup_logging, EventSampler
+    from src.utils.sparse_features import AdapterCache, event_features
+    from src.utils.readiness import Heartbeat, warm_up
+    from src.utils.settings import Settings
+    from src.utils.aspects import MentionDetector, NOT_MENTIONED
+except ModuleNotFoundError:
+    import sys
+    sys.path.append(str(Path(__file__).resolve().parents[2]))   # añade .../src
+    from utils.instrumentation import (STAGE_SECONDS, BATCH_SIZE, MESSAGES, QUEUE_DEPTH,
+                                       Stopwatch, observe_consumer_lag, start_metrics_server)
+    from utils.model_registry import aspect_registry
+    from utils.kafka_utils import poll_batch, partition_batches, producer_conf, consumer_conf
+    from utils.log_setup import setup_logging, EventSampler
+    from utils.sparse_features import AdapterCache, event_features
+    from utils.readiness import Heartbeat, warm_up
+    from utils.settings import Settings
+    from utils.aspects import MentionDetector, NOT_MENTIONED
+
 # ---- Kafka ----
-BOOTSTRAP = os.getenv("KAFKA_BROKERS", "kafka:9092")
+SETTINGS  = Settings.from_env()   # KAFKA_BROKERS, MODELS_DIR, CONFIGS_DIR (la imagen los fija en /app/...)
+BOOTSTRAP = SETTINGS.kafka_brokers
 GROUP_ID  = os.getenv("GROUP_ID", "absa-consumer")
-TOPIC_IN  = os.getenv("TOPIC_IN", "ml.absa.in")
+TOPIC_IN  = os.getenv("TOPIC_IN", "ml.absa.in")   # o "ml.features" (featurizador compartido)
 TOPIC_OUT = os.getenv("TOPIC_OUT", "ml.absa.out")
-MODELS_DIR= os.getenv("MODELS_DIR", "/app/models")
-
-# ---- Cargar todos los modelos 04_aspect_*_clf.joblib ----
-ASPECT_MODELS = {}  # {"battery": (model, preproc), ...}
-paths = sorted(glob.glob(os.path.join(MODELS_DIR, "04_aspect_*_clf.joblib")))
-if not paths:
-    raise RuntimeError(f"No hay modelos de aspecto en {MODELS_DIR}/04_aspect_*_clf.joblib")
-
-for path in paths:
-    bundle = joblib.load(path)              # esperado: {"model": clf, "preproc": vectorizer?}
-    model = bundle["model"]; pre = bundle.get("preproc")
-    aspect = re.sub(r"^04_aspect_|_clf\.joblib$", "", os.path.basename(path))
-    ASPECT_MODELS[aspect] = (model, pre)
-
-print("✅ ABSA loaded aspects:", ", ".join(sorted(ASPECT_MODELS.keys())))
-
-def infer_all(payload: dict | str):
-    text = payload["text"] if isinstance(payload, dict) else str(payload)
-    results = {}
-    for aspect, (model, pre) in ASPECT_MODELS.items():
-        X = pre.transform([text]) if pre else [text]
-        y = model.predict(X)[0]
-        results[aspect] = y
+MODELS_DIR   = SETTINGS.models_dir
+CONFIGS_DIR  = SETTINGS.configs_dir
+MODEL_POLL_S = float(os.getenv("MODEL_POLL_S", "30"))   # 0 = sin recarga
+BATCH_MAX = int(os.getenv("BATCH_MAX", "64"))
+# prefiltro: sólo se puntúan los aspectos mencionados (lexicón + vocabulario TF-IDF); el resto -> "not_mentioned"
+PREFILTER = os.getenv("ABSA_PREFILTER", "1") == "1"
+
+# ---- Métricas ----
+SERVICE      = "absa"
+log          = setup_logging(SERVICE)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9101"))
+LAG_EVERY_S  = float(os.getenv("LAG_EVERY_S", "10"))
+ST = {s: STAGE_SECONDS.labels(SERVICE, s)
+      for s in ("deserialize", "vectorize", "predict", "serialize", "produce")}
+
+# ---- Cargar todos los modelos 04_aspect_*_clf.joblib (registro versionado) ----
+registry = aspect_registry(MODELS_DIR, CONFIGS_DIR)   # entries: {"battery": ModelEntry, ...}
+ADAPTERS = AdapterCache()   # features precomputadas -> vocabulario de cada aspecto
+_DETECTOR_LOCK = Lock()     # prepare() corre en el hilo del registro; infer_batch en el bucle principal
+
+def detector_for(snap):
+    """MentionDetector del snapshot, guardado en snap.extras (se construye una vez por snapshot)."""
+    det = snap.extras.get("detector")
+    if det is None:
+        with _DETECTOR_LOCK:
+            det = snap.extras.get("detector")
+            if det is None:
+                det = snap.extras["detector"] = MentionDetector.from_snapshot(snap)
+    return det
+
+log.info("✅ ABSA loaded aspects", extra={"aspects": registry.current().versions()})
+
+def infer_batch(payloads: list, features: list | None = None, snap=None, sw: Stopwatch | None = None):
+    """Un transform/predict por aspecto para todo el lote (sólo las reseñas que lo mencionan)."""
+    snap = snap or registry.current()
+    texts = [pl["text"] if isinstance(pl, dict) else str(pl) for pl in payloads]
+    features = features or [None] * len(texts)
+    results = [{} for _ in texts]
+    shared = {}   # familia hashed: conteos del HashingVectorizer una vez por lote para los 10 aspectos
+    t_vec = t_pred = 0.0
+    t0 = perf_counter()
+    mask = detector_for(snap).detect_many(texts) if PREFILTER else None
+    t_vec += perf_counter() - t0
+    for j, (aspect, entry) in enumerate(snap.entries.items()):
+        rows = None
+        if mask is not None:
+            rows = [i for i in range(len(texts)) if mask[i, j]]
+            for i in range(len(texts)):
+                results[i][aspect] = NOT_MENTIONED
+            if not rows: continue
+        t0 = perf_counter()
+        X = ADAPTERS.vectorize_many(entry, texts, features, shared, rows)
+        t1 = perf_counter()
+        y = entry.model.predict(X)
+        t_vec += t1 - t0; t_pred += perf_counter() - t1
+        for i, label in zip(rows if rows is not None else range(len(texts)), y):
+            results[i][aspect] = label
+    if sw:
+        # una observación por mensaje (suma de los 10 aspectos, amortizada en el lote)
+        n = len(texts)
+        for _ in range(n):
+            ST["vectorize"].observe(t_vec / n); ST["predict"].observe(t_pred / n)
+        sw.t = perf_counter()
     return results
 
+def infer_all(payload: dict | str, sw: Stopwatch | None = None, snap=None, features=None):
+    return infer_batch([payload], [features], snap, sw)[0]
+
 # ---- Kafka clients ----
-c = Consumer({"bootstrap.servers": BOOTSTRAP, "group.id": GROUP_ID,
-              "auto.offset.reset":"earliest", "enable.auto.commit": True})
-p = Producer({"bootstrap.servers": BOOTSTRAP})
+c = Consumer(consumer_conf(BOOTSTRAP, GROUP_ID))
+p = Producer(producer_conf(BOOTSTRAP))
 
 def main():
+    hb = Heartbeat(p, SERVICE).start()                  # ready=False hasta terminar el warm-up
+    start_metrics_server(METRICS_PORT, ready=lambda: hb.ready)
+    QUEUE_DEPTH.labels(SERVICE, "producer").set_function(lambda: len(p))
+    batch_size = BATCH_SIZE.labels(SERVICE)
+    ok, failed = MESSAGES.labels(SERVICE, "ok"), MESSAGES.labels(SERVICE, "error")
+    per_msg = EventSampler(log)                          # eventos por mensaje: muestreados
+    err_log = EventSampler(log, every=1, max_per_sec=5)  # errores: todos, con tope por segundo
+
+    # warm-up ANTES de suscribirse: no se reciben particiones estando "frío"
+    def prepare(snap):
+        if PREFILTER: detector_for(snap)
+        return warm_up(snap, ADAPTERS, service=SERVICE)
+    timings = prepare(registry.current())
+    registry.prepare = prepare   # también en recargas
+    registry.start(poll_s=MODEL_POLL_S)
     c.subscribe([TOPIC_IN])
-    print(f"🎧 ABSA listening: {TOPIC_IN}")
+    hb.update(ready=True, model_version=registry.current().version, models=timings)
+    log.info("🎧 ABSA listening", extra={"topic": TOPIC_IN, "metrics_port": METRICS_PORT,
+                                        "model_version": registry.current().version,
+                                        "models": timings})
+    next_lag = 0.0
     try:
         while True:
-            m = c.poll(1.0)
-            if not m: continue
-            if m.error(): print("KafkaErr:", m.error()); continue
-            try:
-                evt = json.loads(m.value().decode("utf-8"))
-                cid = evt.get("correlation_id","no-cid")
-                res = infer_all(evt.get("payload",""))
-                out = {"correlation_id": cid, "result": res, "ts": time.time()}
-                p.produce(TOPIC_OUT, json.dumps(out).encode("utf-8"), key=cid); p.poll(0)
-                print("✅ processed:", out)
-            except Exception as e:
-                print("❌ processing error:", e)
+            if time.monotonic() >= next_lag:
+                observe_consumer_lag(c, SERVICE)
+                next_lag = time.monotonic() + LAG_EVERY_S
+            batch = poll_batch(c, BATCH_MAX, 1.0)
+            if not batch: continue
+            batch_size.observe(len(batch))
+            # cambio de modelos sólo entre lotes: el lote entero usa el mismo snapshot
+            if registry.maybe_swap():
+                log.info("🔁 modelos actualizados", extra={"model_version": registry.current().version,
+                                                         "aspects": registry.current().versions()})
+                hb.update(model_version=registry.current().version)
+            snap = registry.current()
+            # un predict por aspecto y partición, en orden de offsets: el orden por key se conserva
+            for part in partition_batches(batch):
+                sw = Stopwatch()
+                evts = []
+                for m in part:
+                    if m.error(): err_log.error("kafka error", err=str(m.error())); continue
+                    try:
+                        evt = json.loads(m.value().decode("utf-8"))
+                        evts.append((m, evt, event_features(evt)))   # se decodifica una vez para los 10 aspectos
+                    except Exception as e:
+                        failed.inc()
+                        err_log.error("processing error", err=repr(e))
+                if not evts: continue
+                sw.lap(ST["deserialize"], len(evts))
+                try:
+                    results = infer_batch([e.get("payload","") for _, e, _ in evts],
+                                          [f for _, _, f in evts], snap, sw)
+                except Exception:
+                    # un mensaje malo no tumba el lote: se reintenta uno a uno
+                    results = []
+                    for _, e, f in evts:
+                        try:
+                            results.append(infer_all(e.get("payload",""), None, snap, f))
+                        except Exception as ex:
+                            results.append(None)
+                            failed.inc()
+                            err_log.error("processing error", err=repr(ex))
+                    sw = Stopwatch()
+                for (m, evt, _), res in zip(evts, results):
+                    if res is None: continue
+                    try:
+                        cid = evt.get("correlation_id","no-cid")
+                        out = {"correlation_id": cid, "result": res, "ts": time.time(),
+                               "model_version": snap.version, "model_loaded_at": snap.created_at}
+                        ts_enqueue = (evt.get("meta") or {}).get("ts_enqueue")
+                        if ts_enqueue: out["ts_enqueue"] = ts_enqueue
+                        data = json.dumps(out).encode("utf-8")
+                        sw.lap(ST["serialize"])
+                        # misma key de entrada -> misma partición de salida
+                        p.produce(TOPIC_OUT, data, key=m.key() or cid); p.poll(0)
+                        sw.lap(ST["produce"])
+                        ok.inc()
+                        per_msg.info("processed", cid=cid)
+                    except Exception as e:
+                        failed.inc()
+                        err_log.error("processing error", err=repr(e))
     finally:
         c.close(); p.flush()
 
@@ -1,47 +1,152 @@
-import os, json, time, joblib
+import os, json, time
+from pathlib import Path
 from confluent_kafka import Consumer, Producer
 
+# ===== utilidades compartidas (src/utils) =====
+try:
+    from src.utils.instrumentation import (STAGE_SECONDS, BATCH_SIZE, MESSAGES, QUEUE_DEPTH,
+                                           Stopwatch, observe_consumer_lag, start_metrics_server)
+    from src.utils.model_registry import sentiment_registry
+    from src.utils.kafka_utils import poll_batch, partition_batches, producer_conf, consumer_conf
+    from src.utils.log_setup import setup_logging, EventSampler
+    from src.utils.sparse_features import AdapterCache, event_features
+    from src.utils.readiness import Heartbeat, warm_up
+    from src.utils.settings import Settings
+except ModuleNotFoundError:
+    import sys
+    sys.path.append(str(Path(__file__).resolve().parents[2]))   # añade .../src
+    from utils.instrumentation import (STAGE_SECONDS, BATCH_SIZE, MESSAGES, QUEUE_DEPTH,
+                                       Stopwatch, observe_consumer_lag, start_metrics_server)
+    from utils.model_registry import sentiment_registry
+    from utils.kafka_utils import poll_batch, partition_batches, producer_conf, consumer_conf
+    from utils.log_setup import setup_logging, EventSampler
+    from utils.sparse_features import AdapterCache, event_features
+    from utils.readiness import Heartbeat, warm_up
+    from utils.settings import Settings
+
 # ---- Kafka (PLAINTEXT) ----
-BOOTSTRAP = os.getenv("KAFKA_BROKERS", "kafka:9092")
+SETTINGS  = Settings.from_env()   # KAFKA_BROKERS, MODEL_PATH, CONFIGS_DIR (la imagen los fija en /app/...)
+BOOTSTRAP = SETTINGS.kafka_brokers
 GROUP_ID  = os.getenv("GROUP_ID", "sentiment-consumer")
-TOPIC_IN  = os.getenv("TOPIC_IN", "ml.sentiment.in")
+TOPIC_IN  = os.getenv("TOPIC_IN", "ml.sentiment.in")   # o "ml.features" (featurizador compartido)
 TOPIC_OUT = os.getenv("TOPIC_OUT", "ml.sentiment.out")
+BATCH_MAX = int(os.getenv("BATCH_MAX", "64"))
+
+# ---- Métricas ----
+SERVICE      = os.getenv("SERVICE_NAME", "sentiment")   # p.ej. "sentiment-shadow" para el candidato
+log          = setup_logging(SERVICE)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+LAG_EVERY_S  = float(os.getenv("LAG_EVERY_S", "10"))
+ST = {s: STAGE_SECONDS.labels(SERVICE, s)
+      for s in ("deserialize", "vectorize", "predict", "serialize", "produce")}
 
-# ---- Modelo ----
-MODEL_PATH = os.getenv("MODEL_PATH", "/app/models/02_baseline_best.joblib")
-bundle = joblib.load(MODEL_PATH)         # esperado: {"model": clf, "preproc": vectorizer?}
-model  = bundle["model"]
-pre    = bundle.get("preproc")
+# ---- Modelo (registro versionado con recarga en caliente) ----
+MODEL_PATH   = SETTINGS.model_path
+CONFIGS_DIR  = SETTINGS.configs_dir
+MODEL_POLL_S = float(os.getenv("MODEL_POLL_S", "30"))   # 0 = sin recarga
+registry = sentiment_registry(MODEL_PATH, CONFIGS_DIR)   # Pipeline, {"model", "preproc"} o estimador
+ADAPTERS = AdapterCache()   # features precomputadas -> vocabulario del modelo activo
 
-def infer(payload: dict | str):
-    text = payload["text"] if isinstance(payload, dict) else str(payload)
-    X = pre.transform([text]) if pre else [text]
-    y = model.predict(X)[0]
+def infer_batch(payloads: list, features: list | None = None, entry=None, sw: Stopwatch | None = None):
+    """Un solo transform/predict para todo el lote (mismo resultado que infer() uno a uno)."""
+    entry = entry or registry.current().entries["sentiment"]
+    model = entry.model
+    texts = [pl["text"] if isinstance(pl, dict) else str(pl) for pl in payloads]
+    X = ADAPTERS.vectorize_many(entry, texts, features or [None] * len(texts))
+    if sw: sw.lap(ST["vectorize"], len(texts))
+    y = model.predict(X)
     proba = getattr(model, "predict_proba", None)
-    return {"prediction": y, "proba": proba(X)[0].tolist() if proba else None}
+    P = proba(X) if proba else None
+    res = [{"prediction": y[i], "proba": P[i].tolist() if P is not None else None} for i in range(len(texts))]
+    if sw: sw.lap(ST["predict"], len(texts))
+    return res
+
+def infer(payload: dict | str, sw: Stopwatch | None = None, entry=None, features=None):
+    return infer_batch([payload], [features], entry, sw)[0]
 
 # ---- Kafka clients ----
-c = Consumer({"bootstrap.servers": BOOTSTRAP, "group.id": GROUP_ID,
-              "auto.offset.reset": "earliest", "enable.auto.commit": True})
-p = Producer({"bootstrap.servers": BOOTSTRAP})
+c = Consumer(consumer_conf(BOOTSTRAP, GROUP_ID))
+p = Producer(producer_conf(BOOTSTRAP))
 
 def main():
+    hb = Heartbeat(p, SERVICE).start()                  # ready=False hasta terminar el warm-up
+    start_metrics_server(METRICS_PORT, ready=lambda: hb.ready)
+    QUEUE_DEPTH.labels(SERVICE, "producer").set_function(lambda: len(p))
+    batch_size = BATCH_SIZE.labels(SERVICE)
+    ok, failed = MESSAGES.labels(SERVICE, "ok"), MESSAGES.labels(SERVICE, "error")
+    per_msg = EventSampler(log)                          # eventos por mensaje: muestreados
+    err_log = EventSampler(log, every=1, max_per_sec=5)  # errores: todos, con tope por segundo
+
+    # warm-up ANTES de suscribirse: no se reciben particiones estando "frío"
+    timings = warm_up(registry.current(), ADAPTERS, service=SERVICE)
+    registry.prepare = lambda snap: warm_up(snap, ADAPTERS, service=SERVICE)   # también en recargas
+    registry.start(poll_s=MODEL_POLL_S)
     c.subscribe([TOPIC_IN])
-    print(f"✅ Sentiment listening: {TOPIC_IN}")
+    hb.update(ready=True, model_version=registry.current().version, models=timings)
+    log.info("✅ Sentiment listening", extra={"topic": TOPIC_IN, "metrics_port": METRICS_PORT,
+                                             "model_version": registry.current().version,
+                                             "models": timings})
+    next_lag = 0.0
     try:
         while True:
-            m = c.poll(1.0)
-            if not m: continue
-            if m.error(): print("KafkaErr:", m.error()); continue
-            try:
-                evt = json.loads(m.value().decode("utf-8"))
-                cid = evt.get("correlation_id", "no-cid")
-                res = infer(evt.get("payload", ""))
-                out = {"correlation_id": cid, "result": res, "ts": time.time()}
-                p.produce(TOPIC_OUT, json.dumps(out).encode("utf-8"), key=cid); p.poll(0)
-                print("✅ processed:", out)
-            except Exception as e:
-                print("❌ processing error:", e)
+            if time.monotonic() >= next_lag:
+                observe_consumer_lag(c, SERVICE)
+                next_lag = time.monotonic() + LAG_EVERY_S
+            batch = poll_batch(c, BATCH_MAX, 1.0)
+            if not batch: continue
+            batch_size.observe(len(batch))
+            # cambio de modelo sólo entre lotes: el lote entero usa el mismo snapshot
+            if registry.maybe_swap():
+                log.info("🔁 modelo actualizado", extra={"model_version": registry.current().version})
+                hb.update(model_version=registry.current().version)
+            snap = registry.current()
+            entry = snap.entries["sentiment"]
+            # un predict por partición, en orden de offsets: el orden por key se conserva
+            for part in partition_batches(batch):
+                sw = Stopwatch()
+                evts = []
+                for m in part:
+                    if m.error(): err_log.error("kafka error", err=str(m.error())); continue
+                    try:
+                        evt = json.loads(m.value().decode("utf-8"))
+                        evts.append((m, evt, event_features(evt)))   # features sólo si viene del featurizador
+                    except Exception as e:
+                        failed.inc()
+                        err_log.error("processing error", err=repr(e))
+                if not evts: continue
+                sw.lap(ST["deserialize"], len(evts))
+                try:
+                    results = infer_batch([e.get("payload", "") for _, e, _ in evts],
+                                          [f for _, _, f in evts], entry, sw)
+                except Exception:
+                    # un mensaje malo no tumba el lote: se reintenta uno a uno
+                    results = []
+                    for _, e, f in evts:
+                        try:
+                            results.append(infer(e.get("payload", ""), None, entry, f))
+                        except Exception as ex:
+                            results.append(None)
+                            failed.inc()
+                            err_log.error("processing error", err=repr(ex))
+                    sw = Stopwatch()
+                for (m, evt, _), res in zip(evts, results):
+                    if res is None: continue
+                    try:
+                        cid = evt.get("correlation_id", "no-cid")
+                        out = {"correlation_id": cid, "result": res, "ts": time.time(),
+                               "model_version": snap.version, "model_loaded_at": snap.created_at}
+                        ts_enqueue = (evt.get("meta") or {}).get("ts_enqueue")
+                        if ts_enqueue: out["ts_enqueue"] = ts_enqueue
+                        data = json.dumps(out).encode("utf-8")
+                        sw.lap(ST["serialize"])
+                        # misma key de entrada -> misma partición de salida
+                        p.produce(TOPIC_OUT, data, key=m.key() or cid); p.poll(0)
+                        sw.lap(ST["produce"])
+                        ok.inc()
+                        per_msg.info("processed", cid=cid)
+                    except Exception as e:
+                        failed.inc()
+                        err_log.error("processing error", err=repr(e))
     finally:
         c.close(); p.flush()
 
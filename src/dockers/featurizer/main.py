@@ -0,0 +1,103 @@
+import os, json, time
+from pathlib import Path
+from confluent_kafka import Consumer, Producer
+
+# ===== utilidades compartidas (src/utils) =====
+try:
+    from src.utils.instrumentation import (STAGE_SECONDS, BATCH_SIZE, MESSAGES, QUEUE_DEPTH,
+                                           Stopwatch, observe_consumer_lag, start_metrics_server)
+    from src.utils.sparse_features import Featurizer, to_b64
+    from src.utils.readiness import Heartbeat, WARMUP_TEXTS
+    from src.utils.settings import Settings
+    from src.utils.kafka_utils import poll_batch, producer_conf, consumer_conf
+    from src.utils.log_setup import setup_logging, EventSampler
+except ModuleNotFoundError:
+    import sys
+    sys.path.append(str(Path(__file__).resolve().parents[2]))   # añade .../src
+    from utils.instrumentation import (STAGE_SECONDS, BATCH_SIZE, MESSAGES, QUEUE_DEPTH,
+                                       Stopwatch, observe_consumer_lag, start_metrics_server)
+    from utils.sparse_features import Featurizer, to_b64
+    from utils.readiness import Heartbeat, WARMUP_TEXTS
+    from utils.settings import Settings
+    from utils.kafka_utils import poll_batch, producer_conf, consumer_conf
+    from utils.log_setup import setup_logging, EventSampler
+
+# ---- Kafka ----
+# La API publica el texto en TOPIC_IN; aquí se tokeniza UNA vez y los scorers
+# (sentiment y absa, cada uno con su group.id) consumen TOPIC_OUT.
+SETTINGS  = Settings.from_env()   # KAFKA_BROKERS, CONFIGS_DIR
+BOOTSTRAP = SETTINGS.kafka_brokers
+GROUP_ID  = os.getenv("GROUP_ID", "featurizer")
+TOPIC_IN  = os.getenv("TOPIC_IN", "ml.features.in")
+TOPIC_OUT = os.getenv("TOPIC_OUT", "ml.features")
+BATCH_MAX = int(os.getenv("BATCH_MAX", "64"))
+
+# ---- Métricas ----
+SERVICE      = "featurizer"
+log          = setup_logging(SERVICE)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9102"))
+LAG_EVERY_S  = float(os.getenv("LAG_EVERY_S", "10"))
+ST = {s: STAGE_SECONDS.labels(SERVICE, s)
+      for s in ("deserialize", "vectorize", "serialize", "produce")}
+
+# ---- Analizador (el mismo que usan todos los TfidfVectorizer entrenados) ----
+ANALYZER_CONFIG = os.getenv("ANALYZER_CONFIG") or SETTINGS.configs_dir / "02_sentiment_logreg_tfidf.json"
+featurizer = Featurizer.from_config(ANALYZER_CONFIG)
+
+# ---- Kafka clients ----
+c = Consumer(consumer_conf(BOOTSTRAP, GROUP_ID))
+p = Producer(producer_conf(BOOTSTRAP))
+
+def main():
+    hb = Heartbeat(p, SERVICE).start()                  # ready=False hasta terminar el warm-up
+    start_metrics_server(METRICS_PORT, ready=lambda: hb.ready)
+    QUEUE_DEPTH.labels(SERVICE, "producer").set_function(lambda: len(p))
+    batch_size = BATCH_SIZE.labels(SERVICE)
+    ok, failed = MESSAGES.labels(SERVICE, "ok"), MESSAGES.labels(SERVICE, "error")
+    per_msg = EventSampler(log)                          # eventos por mensaje: muestreados
+    err_log = EventSampler(log, every=1, max_per_sec=5)  # errores: todos, con tope por segundo
+
+    t0 = time.perf_counter()
+    for t in WARMUP_TEXTS:
+        featurizer.featurize(t)
+    warmup_s = round(time.perf_counter() - t0, 4)
+    c.subscribe([TOPIC_IN])
+    hb.update(ready=True, models={"analyzer": {"load_s": 0.0, "warmup_s": warmup_s}})
+    log.info("✅ Featurizer listening", extra={"topic": TOPIC_IN, "out": TOPIC_OUT,
+                                              "signature": f"{featurizer.signature:016x}",
+                                              "metrics_port": METRICS_PORT})
+    next_lag = 0.0
+    try:
+        while True:
+            if time.monotonic() >= next_lag:
+                observe_consumer_lag(c, SERVICE)
+                next_lag = time.monotonic() + LAG_EVERY_S
+            batch = poll_batch(c, BATCH_MAX, 1.0)
+            if not batch: continue
+            batch_size.observe(len(batch))
+            for m in batch:
+                if m.error(): err_log.error("kafka error", err=str(m.error())); continue
+                try:
+                    sw = Stopwatch()
+                    evt = json.loads(m.value().decode("utf-8"))
+                    sw.lap(ST["deserialize"])
+                    cid = evt.get("correlation_id", "no-cid")
+                    payload = evt.get("payload", "")
+                    text = payload.get("text", "") if isinstance(payload, dict) else str(payload)
+                    # se conserva el evento original (texto incluido: fallback y logs de la API)
+                    evt["features"] = to_b64(featurizer.featurize(text))
+                    sw.lap(ST["vectorize"])
+                    data = json.dumps(evt).encode("utf-8")
+                    sw.lap(ST["serialize"])
+                    p.produce(TOPIC_OUT, data, key=m.key() or cid); p.poll(0)   # conserva la key de partición
+                    sw.lap(ST["produce"])
+                    ok.inc()
+                    per_msg.info("featurized", cid=cid)
+                except Exception as e:
+                    failed.inc()
+                    err_log.error("processing error", err=repr(e))
+    finally:
+        c.close(); p.flush()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os, json, time
+from pathlib import Path
+from confluent_kafka import Consumer, Producer
+
+# ===== utilidades compartidas (src/utils) =====
+try:
+    from src.utils.instrumentation import (STAGE_SECONDS, BATCH_SIZE, MESSAGES,
+                                           Stopwatch, observe_consumer_lag, start_metrics_server)
+    from src.utils.results_store import ResultsStore
+    from src.utils.readiness import Heartbeat
+    from src.utils.settings import Settings
+    from src.utils.kafka_utils import poll_batch, producer_conf, consumer_conf
+    from src.utils.log_setup import setup_logging, EventSampler
+except ModuleNotFoundError:
+    import sys
+    sys.path.append(str(Path(__file__).resolve().parents[2]))   # añade .../src
+    from utils.instrumentation import (STAGE_SECONDS, BATCH_SIZE, MESSAGES,
+                                       Stopwatch, observe_consumer_lag, start_metrics_server)
+    from utils.results_store import ResultsStore
+    from utils.readiness import Heartbeat
+    from utils.settings import Settings
+    from utils.kafka_utils import poll_batch, producer_conf, consumer_conf
+    from utils.log_setup import setup_logging, EventSampler
+
+# ---- Kafka ----
+# Persiste TODOS los resultados de ml.*.out (no sólo los que pidió esta API) y
+# el texto de los tópicos de entrada; se unen por correlation_id en el store.
+BOOTSTRAP   = Settings.from_env().kafka_brokers
+GROUP_ID    = os.getenv("GROUP_ID", "results-sink")
+TOPICS_OUT  = [t for t in os.getenv("TOPICS_OUT", "ml.sentiment.out,ml.absa.out").split(",") if t]
+TOPICS_TEXT = [t for t in os.getenv("TOPICS_TEXT", "ml.sentiment.in,ml.absa.in,ml.features").split(",") if t]   # ml.features: topología con featurizador
+BATCH_MAX   = int(os.getenv("BATCH_MAX", "5000"))      # lotes grandes: una transacción por lote
+POLL_S      = float(os.getenv("POLL_S", "1.0"))
+
+# ---- Almacén ----
+RESULTS_DB = os.getenv("RESULTS_DB", "/data/results.db")
+
+# ---- Métricas ----
+SERVICE      = "sink"
+log          = setup_logging(SERVICE)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9103"))
+LAG_EVERY_S  = float(os.getenv("LAG_EVERY_S", "10"))
+ST = {s: STAGE_SECONDS.labels(SERVICE, s) for s in ("deserialize", "store", "commit")}
+
+# ---- Kafka clients ----
+# offsets manuales: se confirman DESPUÉS de escribir el lote (al menos una vez;
+# el upsert por correlation_id hace que los reintentos no dupliquen filas)
+c = Consumer(consumer_conf(BOOTSTRAP, GROUP_ID, **{"enable.auto.commit": False}))
+p = Producer(producer_conf(BOOTSTRAP))                   # sólo heartbeats
+
+def main():
+    hb = Heartbeat(p, SERVICE).start()
+    start_metrics_server(METRICS_PORT, ready=lambda: hb.ready)
+    store = ResultsStore(RESULTS_DB)
+    batch_size = BATCH_SIZE.labels(SERVICE)
+    ok, failed = MESSAGES.labels(SERVICE, "ok"), MESSAGES.labels(SERVICE, "error")
+    err_log = EventSampler(log, every=1, max_per_sec=5)  # errores: todos, con tope por segundo
+
+    topics = TOPICS_OUT + TOPICS_TEXT
+    c.subscribe(topics)
+    hb.update(ready=True)
+    log.info("🗄️ Sink listening", extra={"topics": topics, "db": RESULTS_DB, "metrics_port": METRICS_PORT})
+    next_lag = 0.0
+    try:
+        while True:
+            if time.monotonic() >= next_lag:
+                observe_consumer_lag(c, SERVICE)
+                next_lag = time.monotonic() + LAG_EVERY_S
+            batch = poll_batch(c, BATCH_MAX, POLL_S)
+            if not batch: continue
+            batch_size.observe(len(batch))
+            sw = Stopwatch()
+            evts = []
+            for m in batch:
+                if m.error(): err_log.error("kafka error", err=str(m.error())); continue
+                try:
+                    evts.append(json.loads(m.value().decode("utf-8")))
+                except Exception as e:
+                    failed.inc()
+                    err_log.error("processing error", err=repr(e))
+            sw.lap(ST["deserialize"], len(batch))
+            try:
+                store.upsert_events(evts)
+            except Exception as e:
+                # sin commit: el lote se vuelve a leer tras reiniciar (idempotente)
+                err_log.error("store error", err=repr(e), n=len(evts))
+                raise
+            sw.lap(ST["store"], len(batch))
+            c.commit(asynchronous=False)
+            sw.lap(ST["commit"], len(batch))
+            ok.inc(len(evts))
+    finally:
+        c.close(); store.close(); p.flush()
+
+if __name__ == "__main__":
+    main()
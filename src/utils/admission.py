@@ -0,0 +1,131 @@
+"""
+admission.py
+
+Control de admisión con concurrencia adaptativa (AIMD) para /predict.
+
+- Cada petición ocupa un "slot" mientras produce a Kafka y espera el
+  resultado. Si no hay slot libre espera como mucho `queue_timeout_s` en una
+  cola corta; si la cola está llena se rechaza al instante con 429 y si vence
+  la espera con 503, ambos con Retry-After. Así, bajo sobrecarga, la API
+  responde rápido en lugar de agotar el threadpool y devolver una ola de
+  timeouts de 10 s.
+- El límite se adapta con la latencia observada del resultado (AIMD):
+    latencia <= objetivo  -> limit += 1 / limit   (≈ +1 por "ronda" completa)
+    latencia > objetivo o timeout -> limit *= backoff (como mucho una vez por
+    latencia media, para no desplomarlo con todas las peticiones lentas de la
+    misma ronda)
+- limit + max_queue debe quedar por debajo del threadpool de FastAPI
+  (40 hilos por defecto), que es quien ejecuta los endpoints síncronos.
+
+- Usable como módulo:
+    adm = AdmissionController.from_env()
+    try:
+        t0 = adm.acquire()
+    except Rejected as r:
+        ...  # JSONResponse(r.status, headers={"Retry-After": str(r.retry_after)})
+    try:
+        ...  # trabajo
+    finally:
+        adm.release(t0, overloaded=False)
+"""
+
+from __future__ import annotations
+from threading import Condition
+from time import monotonic, perf_counter
+from typing import Dict, Optional
+import math, os
+
+try:
+    from src.utils.instrumentation import Counter, Gauge, QUEUE_DEPTH
+except ModuleNotFoundError:
+    from utils.instrumentation import Counter, Gauge, QUEUE_DEPTH
+
+ADMISSION_LIMIT = Gauge("ml_admission_limit", "Límite de concurrencia actual (AIMD)", ("service",))
+ADMISSION_REJECTED = Counter("ml_admission_rejected_total", "Peticiones rechazadas por control de admisión",
+                             ("service", "reason"))
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status, self.retry_after, self.reason = status, retry_after, reason
+
+
+class AdmissionController:
+    def __init__(self, initial: int = 16, min_limit: int = 2, max_limit: int = 32,
+                 target_s: float = 1.0, max_queue: int = 8, queue_timeout_s: float = 0.25,
+                 backoff: float = 0.9, service: str = "api"):
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.min_limit, self.max_limit = min_limit, max_limit
+        self.target_s, self.backoff = target_s, backoff
+        self.max_queue, self.queue_timeout_s = max_queue, queue_timeout_s
+        self.inflight = 0
+        self.queued = 0
+        self.latency_s: Optional[float] = None          # EWMA de la latencia del resultado
+        self._last_decrease = 0.0
+        self._cond = Condition()
+        ADMISSION_LIMIT.labels(service).set_function(lambda: self.limit)
+        QUEUE_DEPTH.labels(service, "inflight").set_function(lambda: self.inflight)
+        QUEUE_DEPTH.labels(service, "admission_queue").set_function(lambda: self.queued)
+        self._rejected = {r: ADMISSION_REJECTED.labels(service, r) for r in ("queue_full", "queue_timeout")}
+
+    @classmethod
+    def from_env(cls, service: str = "api") -> "AdmissionController":
+        env = os.getenv
+        return cls(initial=int(env("ADMISSION_INITIAL", "16")),
+                   min_limit=int(env("ADMISSION_MIN", "2")),
+                   max_limit=int(env("ADMISSION_MAX", "32")),
+                   target_s=float(env("ADMISSION_TARGET_MS", "1000")) / 1000,
+                   max_queue=int(env("ADMISSION_MAX_QUEUE", "8")),
+                   queue_timeout_s=float(env("ADMISSION_QUEUE_MS", "250")) / 1000,
+                   service=service)
+
+    def retry_after(self) -> int:
+        """Segundos sugeridos: lo que tardaría en vaciarse lo que hay delante (1..30)."""
+        lat = self.latency_s or self.target_s
+        ahead = self.inflight + self.queued
+        return int(min(max(math.ceil(lat * ahead / max(self.limit, 1.0)), 1), 30))
+
+    def _reject(self, status: int, reason: str) -> Rejected:
+        self._rejected[reason].inc()
+        return Rejected(status, self.retry_after(), reason)
+
+    def acquire(self) -> float:
+        """Reserva un slot (o lanza Rejected). Devuelve el instante de inicio para release()."""
+        with self._cond:
+            if self.inflight < int(self.limit):
+                self.inflight += 1
+                return perf_counter()
+            if self.queued >= self.max_queue:
+                raise self._reject(429, "queue_full")
+            self.queued += 1
+            deadline = monotonic() + self.queue_timeout_s
+            try:
+                while self.inflight >= int(self.limit):
+                    left = deadline - monotonic()
+                    if left <= 0:
+                        raise self._reject(503, "queue_timeout")
+                    self._cond.wait(left)
+                self.inflight += 1
+            finally:
+                self.queued -= 1
+        return perf_counter()
+
+    def release(self, t0: float, overloaded: bool = False) -> None:
+        """Libera el slot y ajusta el límite con la latencia observada."""
+        latency = perf_counter() - t0
+        with self._cond:
+            self.inflight -= 1
+            self.latency_s = latency if self.latency_s is None else 0.8 * self.latency_s + 0.2 * latency
+            if not overloaded and latency <= self.target_s:
+                self.limit = min(self.limit + 1.0 / self.limit, float(self.max_limit))
+            else:
+                now = monotonic()
+                if now - self._last_decrease >= max(self.latency_s, self.target_s):
+                    self.limit = max(self.limit * self.backoff, float(self.min_limit))
+                    self._last_decrease = now
+            self._cond.notify()
+
+    def snapshot(self) -> Dict[str, float]:
+        return {"limit": round(self.limit, 2), "inflight": self.inflight, "queued": self.queued,
+                "latency_ms": round((self.latency_s or 0.0) * 1000, 2)}
@@ -1,5 +1,10 @@
+try:
+    from src.utils.text_normalize import normalize_text
+except ModuleNotFoundError:
+    from utils.text_normalize import normalize_text
+
 def check_urgency(row):
-    review = row["review"].lower()
+    review = normalize_text(row["review"])
     urgent_keywords = ["urgente", "reembolso", "devuelvan", "demanda", "legal", "fraude"]
     for word in urgent_keywords:
         if word in review:
@@ -8,3 +13,12 @@ def check_urgency(row):
                 "reason": f"Palabra clave urgente detectada: '{word}'"
             }
     return {"alert": False}
+
+URGENT_EN = {"broken", "refund", "late", "missing", "defect"}
+
+def simple_urgency(text, sentiment):
+    """Urgencia de la API/pipeline: 'high' si es negativa y menciona un problema."""
+    t = normalize_text(text)
+    if sentiment == "negative" and any(k in t for k in URGENT_EN):
+        return "high"
+    return "low"
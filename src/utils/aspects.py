@@ -0,0 +1,201 @@
+"""
+aspects.py
+
+Lexicón de aspectos del notebook 04 (04_ABSA_Modelo.ipynb), compartido por
+los scripts que reconstruyen los datasets por aspecto.
+
+- ASPECT_KEYWORDS: palabras clave por aspecto (en inglés), las mismas con las
+  que se armó 04_aspects_dataset.csv para entrenar 04_aspect_*_clf.joblib.
+- detect_aspects(): misma regla que detect_aspects_rule() del notebook
+  (subcadena sobre el texto en minúsculas), para que los datasets
+  reconstruidos coincidan con los de entrenamiento.
+- MentionDetector: prefiltro del worker ABSA. Un aspecto se considera
+  mencionado si lo detecta el lexicón O si la reseña tiene algún término
+  (n-grama) del vocabulario del aspecto. Ese vocabulario sale del
+  TfidfVectorizer de cada modelo 04_aspect_*: el idf guardado da la
+  fracción de reseñas del aspecto que contienen cada término, y se quedan
+  los términos `min_lift` veces más frecuentes que en los otros aspectos
+  ("batteries", "recharged", "touchscreen", "shipped"...). Los aspectos no
+  mencionados no se puntúan y devuelven NOT_MENTIONED.
+
+- Usable como módulo:
+    detect_aspects("Battery lasts long but the camera is terrible")  # ["battery", "camera"]
+    det = MentionDetector.from_snapshot(registry.current())
+    mask = det.detect_many(texts)        # bool (n_textos x n_aspectos), columnas = det.aspects
+- Usable como script (recall frente a 04_absa_results.json y aspectos puntuados por reseña):
+    python -m src.utils.aspects --data data/processed/03_test.csv
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import argparse, json, math, sys
+
+NOT_MENTIONED = "not_mentioned"
+
+ASPECT_KEYWORDS: Dict[str, List[str]] = {
+    "price":         ["price", "cost", "expensive", "cheap", "deal", "offer", "value", "worth"],
+    "battery":       ["battery", "charge", "charging", "battery life", "lasts", "drain"],
+    "screen":        ["screen", "display", "brightness", "resolution", "oled", "amoled", "lcd", "glass"],
+    "camera":        ["camera", "photo", "picture", "video", "stabilization", "zoom", "selfie"],
+    "performance":   ["performance", "slow", "fast", "snappy", "lag", "processor", "chip", "ram", "speed"],
+    "audio":         ["sound", "audio", "volume", "speaker", "earphone", "headphone", "microphone", "mic", "noise"],
+    "connectivity":  ["signal", "wifi", "bluetooth", "5g", "lte", "data", "network", "reception", "nfc"],
+    "build_quality": ["quality", "material", "defect", "defective", "fragile", "sturdy", "durable", "scratch"],
+    "shipping":      ["shipping", "delivery", "arrived", "late", "package", "packaging", "courier"],
+    "accessories":   ["charger", "case", "cable", "protector", "earbuds", "headphones", "adapter"],
+}
+
+
+def detect_aspects(text: str) -> List[str]:
+    """Aspectos cuyo lexicón aparece en el texto (en el orden de ASPECT_KEYWORDS)."""
+    t = str(text).lower()
+    return [a for a, kws in ASPECT_KEYWORDS.items() if any(k in t for k in kws)]
+
+
+def _tfidf_vectorizer(pre: Any) -> Optional[Any]:
+    """El TfidfVectorizer del preproc (o del último paso si es un Pipeline); None si no tiene vocabulario."""
+    vec = pre.steps[-1][1] if hasattr(pre, "steps") else pre
+    return vec if hasattr(vec, "vocabulary_") and hasattr(vec, "idf_") else None
+
+
+def term_rates(vec: Any, n_docs: int) -> Dict[str, float]:
+    """Fracción de documentos de entrenamiento con cada término, invirtiendo idf = ln((1+n)/(1+df)) + 1."""
+    import numpy as np
+    df = (1 + n_docs) / np.exp(vec.idf_ - 1) - 1          # smooth_idf=True (default) en todos los modelos 04
+    rate = np.clip(df / n_docs, 0.0, 1.0).tolist()
+    return {t: rate[i] for t, i in vec.vocabulary_.items()}
+
+
+def aspect_vocabulary(entries: Dict[str, Any], min_lift: float = 3.0, min_rate: float = 0.01) -> Dict[str, List[str]]:
+    """Términos característicos de cada aspecto (ver docstring del módulo).
+
+    `entries` es snapshot.entries; los aspectos sin TfidfVectorizer (familia
+    hashed) o sin `n_samples` en su config quedan fuera y se resuelven sólo
+    con el lexicón.
+    """
+    import numpy as np
+    rates = {}
+    for name, e in entries.items():
+        vec = _tfidf_vectorizer(e.preproc) if e.preproc is not None else None
+        n = (e.config or {}).get("n_samples")
+        test_size = ((e.config or {}).get("split") or {}).get("test_size", 0.2)
+        if vec is None or not n:
+            continue
+        rates[name] = term_rates(vec, int(n) - math.ceil(test_size * int(n)))   # mismo split que train_test_split
+    names = list(rates)
+    index: Dict[str, int] = {}
+    for r in rates.values():
+        for t in r:
+            index.setdefault(t, len(index))
+    terms = list(index)
+    R = np.zeros((len(names), len(terms)))                 # tasa de cada término en cada aspecto (0 = no está)
+    for i, n in enumerate(names):
+        R[i, [index[t] for t in rates[n]]] = list(rates[n].values())
+    vocab = {}
+    for i, n in enumerate(names):
+        base = np.median(np.delete(R, i, axis=0), axis=0) if len(names) > 1 else np.zeros(len(terms))
+        keep = (R[i] >= min_rate) & (R[i] >= min_lift * np.maximum(base, 1e-3))
+        vocab[n] = [terms[j] for j in np.flatnonzero(keep)]
+    return vocab
+
+
+class MentionDetector:
+    def __init__(self, aspects: Sequence[str], vocab: Dict[str, Iterable[str]],
+                 keywords: Dict[str, List[str]] = ASPECT_KEYWORDS, ngram_range=(1, 1)):
+        import numpy as np
+        from scipy.sparse import csr_matrix
+        from sklearn.feature_extraction.text import CountVectorizer
+        self.aspects = list(aspects)
+        self.keywords = {a: keywords[a] for a in self.aspects if keywords.get(a)}
+        # sólo n-gramas hasta ngram_range[1]: con (1, 1) el análisis cuesta un tercio del de los modelos (1, 2)
+        vocab = {a: [t for t in vocab.get(a, ()) if t.count(" ") < ngram_range[1]] for a in self.aspects}
+        terms = sorted({t for ts in vocab.values() for t in ts})
+        index = {t: i for i, t in enumerate(terms)}
+        rows = [index[t] for a in self.aspects for t in vocab[a]]
+        cols = [j for j, a in enumerate(self.aspects) for _ in vocab[a]]
+        self.n_terms = len(terms)
+        self._vec = CountVectorizer(vocabulary=terms, ngram_range=ngram_range, binary=True) if terms else None
+        self._M = csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(len(terms), len(self.aspects)))
+        # sin lexicón ni vocabulario no hay forma de descartar: se puntúa siempre
+        self._always = np.array([a not in self.keywords and not vocab[a] for a in self.aspects])
+
+    @classmethod
+    def from_snapshot(cls, snap: Any, min_lift: float = 3.0, min_rate: float = 0.01) -> "MentionDetector":
+        return cls(list(snap.entries), aspect_vocabulary(snap.entries, min_lift, min_rate))
+
+    def detect_many(self, texts: Sequence[str]):
+        """Máscara bool (n_textos x n_aspectos): True = el aspecto se puntúa."""
+        import numpy as np
+        mask = np.zeros((len(texts), len(self.aspects)), dtype=bool)
+        if self._vec is not None and len(texts):
+            mask |= (self._vec.transform(texts) @ self._M).toarray() > 0
+        lowered = [str(x).lower() for x in texts]
+        for j, a in enumerate(self.aspects):
+            kws = self.keywords.get(a)
+            if kws:
+                mask[:, j] |= [any(k in t for k in kws) for t in lowered]   # misma regla que detect_aspects()
+        mask[:, self._always] = True
+        return mask
+
+
+def recall_report(det: MentionDetector, texts: Sequence[str], absa_results: Optional[Dict[str, Any]] = None,
+                  n_reviews: int = 30000) -> Dict[str, Any]:
+    """Recall del prefiltro frente a la regla con la que se armaron los datasets de entrenamiento.
+
+    Un aspecto "mencionado" para los modelos 04 es el que detecta el lexicón
+    (04_aspects_dataset.csv); recall = fracción de esas menciones que el
+    prefiltro deja pasar. Con `absa_results` (04_absa_results.json, n por
+    aspecto sobre `n_reviews` reseñas) se compara además la tasa de mención.
+    """
+    import numpy as np
+    mask = det.detect_many(texts)
+    ref = np.array([[a in found for a in det.aspects] for found in map(detect_aspects, texts)], dtype=bool)
+    out = {"n_texts": len(texts), "vocab_terms": det.n_terms,
+           "recall": float((mask & ref).sum() / max(ref.sum(), 1)),
+           "aspects_scored_per_review": float(mask.sum(1).mean()),
+           "aspects_lexicon_per_review": float(ref.sum(1).mean()),
+           "skipped_fraction": float(1 - mask.mean()),
+           "per_aspect": {}}
+    for j, a in enumerate(det.aspects):
+        row = {"recall": float((mask[:, j] & ref[:, j]).sum() / max(ref[:, j].sum(), 1)),
+               "rate_prefilter": float(mask[:, j].mean()), "rate_lexicon": float(ref[:, j].mean())}
+        if absa_results and a in absa_results:
+            row["rate_train"] = absa_results[a]["n"] / n_reviews
+        out["per_aspect"][a] = row
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    try:
+        from src.utils.model_registry import aspect_registry
+    except ModuleNotFoundError:
+        sys.path.append(str(Path(__file__).resolve().parents[1]))  # añade .../src al sys.path
+        from utils.model_registry import aspect_registry
+    import pandas as pd
+
+    ap = argparse.ArgumentParser(description="Recall del prefiltro de menciones de aspectos")
+    ap.add_argument("--data", type=Path, default=Path("data/processed/03_test.csv"))
+    ap.add_argument("--models-dir", type=Path, default=Path("models/trained_models"))
+    ap.add_argument("--configs-dir", type=Path, default=Path("models/model_configs"))
+    ap.add_argument("--absa-results", type=Path, default=Path("data/evaluation/04_absa_results.json"))
+    ap.add_argument("--min-lift", type=float, default=3.0)
+    ap.add_argument("--out", type=Path, default=None)
+    args = ap.parse_args(argv)
+
+    det = MentionDetector.from_snapshot(aspect_registry(args.models_dir, args.configs_dir).current(), args.min_lift)
+    texts = pd.read_csv(args.data)["text"].astype(str).tolist()
+    absa = json.loads(args.absa_results.read_text(encoding="utf-8")) if args.absa_results.exists() else None
+    rep = recall_report(det, texts, absa)
+    print(f"[✓] recall {rep['recall']:.4f} | aspectos puntuados/reseña {rep['aspects_scored_per_review']:.2f} "
+          f"(lexicón {rep['aspects_lexicon_per_review']:.2f}) | se omite {rep['skipped_fraction']:.1%}")
+    for a, r in rep["per_aspect"].items():
+        print(f"    {a:14s} recall {r['recall']:.3f}  prefiltro {r['rate_prefilter']:.3f}  "
+              f"lexicón {r['rate_lexicon']:.3f}  train {r.get('rate_train', float('nan')):.3f}")
+    if args.out:
+        args.out.write_text(json.dumps(rep, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"[✓] {args.out}")
+
+
+if __name__ == "__main__":
+    main()
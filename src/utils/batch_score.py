@@ -0,0 +1,237 @@
+"""
+batch_score.py
+
+Scoring offline masivo de reseñas (sentimiento + ABSA + urgencia) sobre CSV o
+Parquet, sin pasar por Kafka. Usa los mismos artefactos que los workers
+(02_sentiment_logreg_tfidf.joblib y 04_aspect_*_clf.joblib) y la misma regla
+de urgencia que la API.
+
+- El archivo de entrada se lee por chunks y la salida se escribe de forma
+  incremental: la memoria no depende del tamaño del archivo. Se escribe en
+  un temporal junto a la salida que sólo reemplaza al destino si la corrida
+  termina bien (un error deja intacto lo que hubiera); salida == entrada se
+  rechaza antes de leer nada.
+- Los chunks se procesan en paralelo en un pool de procesos (los modelos se
+  cargan una vez por proceso) con un máximo de chunks en vuelo, y se escriben
+  en el orden de entrada.
+- Mismo prefiltro que el worker ABSA (aspects.MentionDetector): los aspectos
+  que la reseña no menciona no se puntúan y quedan como "not_mentioned"
+  (fuera de la columna aspects), igual que en el sink y el dashboard.
+  --no-prefilter puntúa los 10.
+
+- Usable como script:
+    python -m src.utils.batch_score data/processed/03_test.csv out/03_test_scored.parquet
+    python -m src.utils.batch_score reviews.parquet scored.csv --chunksize 20000 --workers 8
+
+Columnas añadidas: sentiment, sentiment_proba, urgency, aspects (formato
+"aspecto:label|..." como results_log.csv, sin los no mencionados) y
+absa_<aspecto> por aspecto.
+Parquet requiere pyarrow (no viene en los requirements de los servicios:
+pip install pyarrow); sin él, run() falla antes de arrancar el pool.
+"""
+
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import argparse, os, sys
+
+try:
+    from src.utils.model_loader import load_bundle
+    from src.utils.model_registry import aspect_registry
+    from src.utils.aspects import MentionDetector, NOT_MENTIONED
+    from src.utils.alert_system import simple_urgency
+    from src.utils.text_normalize import normalize_text
+except ModuleNotFoundError:
+    sys.path.append(str(Path(__file__).resolve().parents[1]))  # añade .../src al sys.path
+    from utils.model_loader import load_bundle
+    from utils.model_registry import aspect_registry
+    from utils.aspects import MentionDetector, NOT_MENTIONED
+    from utils.alert_system import simple_urgency
+    from utils.text_normalize import normalize_text
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_MODELS_DIR = PROJECT_DIR / "models" / "trained_models"
+DEFAULT_CONFIGS_DIR = PROJECT_DIR / "models" / "model_configs"     # n_samples/split para el vocabulario del prefiltro
+DEFAULT_SENTIMENT = "02_sentiment_logreg_tfidf.joblib"
+
+# Modelos por proceso del pool (se cargan en _init_worker)
+_SENT: Optional[Tuple[Any, Any]] = None
+_ASPECTS: Dict[str, Tuple[Any, Any]] = {}
+_DETECTOR: Optional[MentionDetector] = None
+
+
+def _init_worker(sentiment_path: str, models_dir: str, with_absa: bool,
+                 configs_dir: str = str(DEFAULT_CONFIGS_DIR), prefilter: bool = True) -> None:
+    global _SENT, _ASPECTS, _DETECTOR
+    _SENT = load_bundle(sentiment_path)
+    _ASPECTS, _DETECTOR = {}, None
+    if with_absa:
+        snap = aspect_registry(models_dir, configs_dir).current()   # mismas entries que el worker ABSA
+        _ASPECTS = {a: (e.model, e.preproc) for a, e in snap.entries.items()}
+        _DETECTOR = MentionDetector.from_snapshot(snap) if prefilter else None
+
+
+def score_chunk(df, text_col: str = "text"):
+    """Añade columnas de predicción a un DataFrame (vectoriza el chunk entero de una vez)."""
+    texts = [normalize_text(t) for t in df[text_col].fillna("").astype(str)]   # misma normalización que la API
+    out = df.copy()
+
+    model, pre = _SENT
+    X = pre.transform(texts) if pre is not None else texts
+    out["sentiment"] = model.predict(X)
+    proba = getattr(model, "predict_proba", None)
+    if proba is not None:
+        out["sentiment_proba"] = proba(X).max(axis=1)
+    out["urgency"] = [simple_urgency(t, s) for t, s in zip(texts, out["sentiment"])]
+
+    if _ASPECTS:
+        import numpy as np
+        mask = _DETECTOR.detect_many(texts) if _DETECTOR is not None else None
+        cols = []
+        for j, (aspect, (amodel, apre)) in enumerate(_ASPECTS.items()):   # mismo orden que _DETECTOR.aspects
+            rows = np.flatnonzero(mask[:, j]) if mask is not None else np.arange(len(texts))
+            labels = np.full(len(texts), NOT_MENTIONED, dtype=object)
+            if len(rows):
+                sub = [texts[i] for i in rows]
+                labels[rows] = amodel.predict(apre.transform(sub) if apre is not None else sub)
+            col = f"absa_{aspect}"
+            out[col] = labels
+            cols.append((aspect, col))
+        labels = [out[c].tolist() for _, c in cols]
+        out["aspects"] = ["|".join(f"{a}:{lab}" for (a, _), lab in zip(cols, row) if lab != NOT_MENTIONED)
+                          for row in zip(*labels)]
+    return out
+
+
+# ---- lectura / escritura por chunks ----
+def _is_parquet(path: Path) -> bool:
+    return path.suffix.lower() in (".parquet", ".pq")
+
+
+def require_pyarrow(*paths: Path) -> None:
+    """Falla con un mensaje claro si algún archivo es Parquet y pyarrow no está instalado."""
+    parquet = [str(p) for p in paths if _is_parquet(p)]
+    if not parquet:
+        return
+    try:
+        import pyarrow  # noqa: F401
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError(f"Leer/escribir Parquet ({', '.join(parquet)}) requiere pyarrow: "
+                                  "pip install pyarrow, o usa .csv") from e
+
+
+def iter_chunks(path: Path, chunksize: int) -> Iterator[Any]:
+    import pandas as pd
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class ChunkWriter:
+    """Escribe chunks a CSV (append) o Parquet (row groups) según la extensión.
+
+    Escribe en un temporal hermano de `path`; close(ok=True) lo mueve a `path`
+    (replace atómico) y close(ok=False) lo borra sin tocar `path`.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        self.parquet = _is_parquet(path)
+        self._writer = None
+        self._first = True
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp.unlink(missing_ok=True)
+
+    def write(self, df) -> None:
+        if self.parquet:
+            import pyarrow as pa, pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.tmp, table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+        else:
+            df.to_csv(self.tmp, mode="a", index=False, header=self._first, encoding="utf-8")
+        self._first = False
+
+    def close(self, ok: bool = True) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if ok and self.tmp.exists():
+            os.replace(self.tmp, self.path)
+        elif ok:
+            self.path.unlink(missing_ok=True)        # entrada vacía: sin salida, como antes
+        else:
+            self.tmp.unlink(missing_ok=True)
+
+
+def run(input_path: Path, output_path: Path, text_col: str = "text", chunksize: int = 10_000,
+        workers: Optional[int] = None, models_dir: Path = DEFAULT_MODELS_DIR,
+        sentiment_model: Optional[Path] = None, with_absa: bool = True,
+        max_inflight: Optional[int] = None, configs_dir: Path = DEFAULT_CONFIGS_DIR,
+        prefilter: bool = True) -> Dict[str, Any]:
+    workers = workers or os.cpu_count() or 1
+    max_inflight = max_inflight or workers * 2
+    sentiment_model = sentiment_model or (models_dir / DEFAULT_SENTIMENT)
+    init_args = (str(sentiment_model), str(models_dir), with_absa, str(configs_dir), prefilter)
+    if Path(output_path).resolve() == Path(input_path).resolve():
+        raise ValueError(f"La salida no puede ser el archivo de entrada: {input_path}")
+    require_pyarrow(input_path, output_path)
+
+    writer = ChunkWriter(output_path)
+    rows = chunks = 0
+    ok = False
+    t0 = perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+            pending: deque = deque()
+            for df in iter_chunks(input_path, chunksize):
+                if text_col not in df.columns:
+                    raise KeyError(f"La columna '{text_col}' no existe en {input_path}")
+                pending.append(pool.submit(score_chunk, df, text_col))
+                # límite de chunks en vuelo -> memoria constante; se escribe en orden
+                while len(pending) >= max_inflight:
+                    out = pending.popleft().result()
+                    writer.write(out); rows += len(out); chunks += 1
+            while pending:
+                out = pending.popleft().result()
+                writer.write(out); rows += len(out); chunks += 1
+        ok = True
+    finally:
+        writer.close(ok)
+    elapsed = perf_counter() - t0
+    return {"rows": rows, "chunks": chunks, "seconds": round(elapsed, 3),
+            "rows_per_s": round(rows / elapsed, 1) if elapsed else 0.0, "output": str(output_path)}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Scoring offline (sentimiento + ABSA + urgencia) sobre CSV/Parquet")
+    ap.add_argument("input", type=Path)
+    ap.add_argument("output", type=Path, help=".csv o .parquet")
+    ap.add_argument("--text-col", default="text")
+    ap.add_argument("--chunksize", type=int, default=10_000)
+    ap.add_argument("--workers", type=int, default=None, help="procesos (default: nº de CPUs)")
+    ap.add_argument("--models-dir", type=Path, default=DEFAULT_MODELS_DIR)
+    ap.add_argument("--sentiment-model", type=Path, default=None)
+    ap.add_argument("--configs-dir", type=Path, default=DEFAULT_CONFIGS_DIR)
+    ap.add_argument("--no-absa", action="store_true", help="sólo sentimiento + urgencia")
+    ap.add_argument("--no-prefilter", action="store_true", help="puntúa los 10 aspectos aunque no se mencionen")
+    args = ap.parse_args(argv)
+
+    print(f"[i] Entrada: {args.input}")
+    stats = run(args.input, args.output, text_col=args.text_col, chunksize=args.chunksize,
+                workers=args.workers, models_dir=args.models_dir,
+                sentiment_model=args.sentiment_model, with_absa=not args.no_absa,
+                configs_dir=args.configs_dir, prefilter=not args.no_prefilter)
+    print(f"[✓] {stats['rows']} filas en {stats['chunks']} chunks, {stats['seconds']} s "
+          f"({stats['rows_per_s']} filas/s) -> {stats['output']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,48 @@
+"""
+config_rutas.py
+
+Compatibilidad con los notebooks (`import config_rutas as cr`): las rutas
+salen de src/utils/settings.py. Ya no se fija /content/drive/... ni se crean
+carpetas al importar; en Colab:
+
+    os.environ["PROJECT_DIR"] = "/content/drive/MyDrive/Proyecto_Analisis_de_Sentimientos_G4"
+    import config_rutas as cr
+    cr.ensure_all()          # crea las carpetas, como hacía antes el import
+"""
 
 from pathlib import Path
+import sys
+
+try:
+    from src.utils.settings import get_settings, ensure_dirs
+except ModuleNotFoundError:
+    sys.path.append(str(Path(__file__).resolve().parents[1]))  # añade .../src al sys.path
+    from utils.settings import get_settings, ensure_dirs
+
+_S = get_settings()
 
-#Ruta base del proyecto 
-PROJECT = Path("/content/drive/MyDrive/Proyecto_Analisis_de_Sentimientos_G4")
+#Ruta base del proyecto
+PROJECT = _S.project_dir
 
-#Carpetas 
-data_dir      = PROJECT / "data"
-raw_dir       = data_dir / "raw"
-processed_dir = data_dir / "processed"
-eval_dir      = data_dir / "evaluation"
+#Carpetas
+data_dir      = _S.data_dir
+raw_dir       = _S.raw_dir
+processed_dir = _S.processed_dir
+eval_dir      = _S.eval_dir
 
-models_root   = PROJECT / "models"
-models_dir    = models_root / "trained_models"
-configs_dir   = models_root / "model_configs"
+models_root   = _S.models_root
+models_dir    = _S.models_dir
+configs_dir   = _S.configs_dir
 
-docs_dir      = PROJECT / "docs"
-images_dir    = docs_dir / "images"
-reports_dir   = docs_dir / "reports"
+docs_dir      = _S.docs_dir
+images_dir    = _S.images_dir
+reports_dir   = _S.reports_dir
 
-notebooks_dir = PROJECT / "notebooks"
-nb_model_dir  = notebooks_dir / "modeling"
+notebooks_dir = _S.notebooks_dir
+nb_model_dir  = _S.nb_model_dir
 
-# Crear si no existen
-for d in [data_dir, raw_dir, processed_dir, eval_dir,
-          models_root, models_dir, configs_dir,
-          docs_dir, images_dir, reports_dir,
-          notebooks_dir, nb_model_dir]:
-    d.mkdir(parents=True, exist_ok=True)
+def ensure_all():
+    ensure_dirs(*_S.dirs())
 
 # Helpers de carpeta, funciones auxiliares
 def get_project_dir():   return PROJECT
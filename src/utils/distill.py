@@ -0,0 +1,332 @@
+"""
+distill.py
+
+Destilación del modelo de sentimiento a un alumno lineal rápido.
+
+Un "profesor" etiqueta un conjunto de reseñas SIN etiqueta con
+probabilidades suaves y un alumno HashingVectorizer -> LogisticRegression se
+entrena sobre ellas. El alumno no tiene vocabulario (el espacio de features es
+fijo, 2**n_bits), así que no hay dict de términos que cargar ni duplicar.
+
+- Profesor:
+  - BERT-tiny: carpeta de HuggingFace (p. ej.
+    models/trained_models/03_sentiment_transformer/final). Requiere torch y
+    transformers, que se importan sólo en este caso.
+  - Cualquier bundle .joblib con predict_proba, p. ej.
+    02_sentiment_logreg_tfidf.joblib.
+  - --soft-labels: un CSV ya etiquetado (text + proba_<clase>, el formato de
+    02_preds_with_proba.csv), para etiquetar en otra máquina (GPU) y entrenar
+    aquí.
+- Etiquetas suaves con temperatura T: softmax(logits / T). Para los bundles
+  sklearn se usa log(p) como logits.
+- La entropía cruzada contra etiquetas suaves se entrena con
+  LogisticRegression repitiendo cada reseña una vez por clase con
+  sample_weight = p_T[clase].
+- Salida:
+  - un Pipeline .joblib con el formato de los modelos 02, que el worker
+    baseline carga con MODEL_PATH;
+  - la config JSON correspondiente en models/model_configs;
+  - un reporte de evaluación en data/evaluation: f1 contra etiquetas reales,
+    acuerdo con el profesor, latencia y tamaño del artefacto.
+
+- Usable como módulo:
+    P, labels = teacher_soft_labels(load_teacher(path), texts, temperature=4.0)
+    student = fit_student(texts, P, labels)
+- Usable como script:
+    python -m src.utils.distill --unlabeled data/processed/03_validation.csv \\
+        --eval data/processed/03_test.csv \\
+        --teacher models/trained_models/03_sentiment_transformer/final
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import argparse, json, os, sys
+
+try:
+    from src.utils.model_loader import load_bundle
+    from src.utils.text_normalize import normalize_text
+except ModuleNotFoundError:
+    sys.path.append(str(Path(__file__).resolve().parents[1]))  # añade .../src al sys.path
+    from utils.model_loader import load_bundle
+    from utils.text_normalize import normalize_text
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+MODELS_DIR = PROJECT_DIR / "models" / "trained_models"
+CONFIGS_DIR = PROJECT_DIR / "models" / "model_configs"
+EVAL_DIR = PROJECT_DIR / "data" / "evaluation"
+DEFAULT_NAME = "05_sentiment_distilled_hashing"
+DEFAULT_TEACHER = MODELS_DIR / "03_sentiment_transformer" / "final"
+
+
+# ---- profesores ----
+class TransformerTeacher:
+    """BERT-tiny (u otro AutoModelForSequenceClassification) -> logits por lote."""
+
+    def __init__(self, model_dir: str | Path, batch_size: int = 64, max_length: int = 256):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+        self._torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+        self.model = AutoModelForSequenceClassification.from_pretrained(str(model_dir)).eval()
+        id2label = self.model.config.id2label
+        self.labels = [id2label[i] for i in range(len(id2label))]
+        self.batch_size, self.max_length = batch_size, max_length
+
+    def logits(self, texts: Sequence[str]):
+        import numpy as np
+        out = []
+        with self._torch.no_grad():
+            for i in range(0, len(texts), self.batch_size):
+                enc = self.tokenizer(list(texts[i:i + self.batch_size]), truncation=True,
+                                     max_length=self.max_length, padding=True, return_tensors="pt")
+                out.append(self.model(**enc).logits.float().numpy())
+        return np.vstack(out) if out else np.zeros((0, len(self.labels)))
+
+
+class SklearnTeacher:
+    """Bundle .joblib con predict_proba; log(p) hace de logits."""
+
+    def __init__(self, path: str | Path):
+        self.model, self.preproc = load_bundle(path)
+        self.labels = [str(c) for c in self.model.classes_]
+
+    def logits(self, texts: Sequence[str]):
+        import numpy as np
+        X = self.preproc.transform(texts) if self.preproc is not None else texts
+        return np.log(np.clip(self.model.predict_proba(X), 1e-12, 1.0))
+
+
+def load_teacher(path: str | Path) -> Any:
+    path = Path(path)
+    return TransformerTeacher(path) if path.is_dir() else SklearnTeacher(path)
+
+
+def soften(logits, temperature: float = 1.0):
+    """softmax(logits / T) por fila."""
+    import numpy as np
+    z = np.asarray(logits, dtype=np.float64) / temperature
+    z -= z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def teacher_soft_labels(teacher: Any, texts: Sequence[str], temperature: float = 1.0) -> Tuple[Any, List[str]]:
+    return soften(teacher.logits(texts), temperature), list(teacher.labels)
+
+
+# ---- alumno ----
+def build_student(n_bits: int = 18, ngram_range: Tuple[int, int] = (1, 2), C: float = 1.0,
+                  max_iter: int = 1000):
+    """HashingVectorizer (sin vocabulario) -> LogisticRegression multinomial."""
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    return Pipeline([
+        ("hash", HashingVectorizer(ngram_range=tuple(ngram_range), n_features=2 ** n_bits,
+                                   alternate_sign=False, norm="l2")),
+        ("clf", LogisticRegression(C=C, max_iter=max_iter, solver="lbfgs")),
+    ])
+
+
+def fit_student(texts: Sequence[str], soft, labels: Sequence[str], **params: Any):
+    """Entropía cruzada contra etiquetas suaves: cada reseña se repite por clase con peso p[clase]."""
+    import numpy as np
+    import scipy.sparse as sp
+    student = build_student(**params)
+    X = student[:-1].fit_transform(list(texts))
+    soft = np.asarray(soft, dtype=np.float64)
+    n, k = soft.shape
+    Xk = sp.vstack([X] * k, format="csr")
+    yk = np.repeat(np.asarray(labels, dtype=object), n)
+    wk = soft.T.reshape(-1)
+    keep = wk > 1e-6                              # filas con peso ~0 no aportan al gradiente
+    student[-1].fit(Xk[keep], yk[keep], sample_weight=wk[keep])
+    return student
+
+
+# ---- datos ----
+def read_texts(paths: Iterable[str | Path], text_col: str = "text") -> List[str]:
+    """Textos normalizados (como en la API), sin vacíos ni repetidos, en orden de aparición."""
+    import pandas as pd
+    seen, out = set(), []
+    for p in paths:
+        p = Path(p)
+        df = pd.read_parquet(p, columns=[text_col]) if p.suffix.lower() in (".parquet", ".pq") \
+            else pd.read_csv(p, usecols=[text_col])
+        for t in df[text_col].dropna().astype(str):
+            t = normalize_text(t)
+            if t and t not in seen:
+                seen.add(t)
+                out.append(t)
+    return out
+
+
+def read_soft_labels(path: str | Path, text_col: str = "text") -> Tuple[List[str], Any, List[str]]:
+    """CSV con text + proba_<clase> (formato de 02_preds_with_proba.csv)."""
+    import pandas as pd
+    df = pd.read_csv(path)
+    cols = [c for c in df.columns if c.startswith("proba_")]
+    if not cols:
+        raise ValueError(f"{path}: faltan columnas proba_<clase>")
+    df = df.dropna(subset=[text_col])
+    texts = [normalize_text(t) for t in df[text_col].astype(str)]
+    return texts, df[cols].to_numpy(dtype="float64"), [c[len("proba_"):] for c in cols]
+
+
+# ---- evaluación ----
+def _latency_ms(predict, texts: Sequence[str], batch: int = 64, repeat: int = 3) -> Dict[str, float]:
+    """ms por reseña: lote de `batch` y de 1 (lo que ve un worker sin y con carga)."""
+    out = {}
+    for name, size in (("batch", batch), ("single", 1)):
+        chunk = list(texts[:max(size, 1)]) if size > 1 else list(texts[:200])
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = perf_counter()
+            if size > 1:
+                predict(chunk)
+            else:
+                for t in chunk:
+                    predict([t])
+            best = min(best, perf_counter() - t0)
+        out[f"{name}_ms_per_doc"] = round(best * 1000 / len(chunk), 4)
+    return out
+
+
+def evaluate(student, texts: Sequence[str], y_true: Sequence[str], teacher: Any = None) -> Dict[str, Any]:
+    from sklearn.metrics import accuracy_score, classification_report, f1_score
+    y_pred = student.predict(texts)
+    rep: Dict[str, Any] = {
+        "n": len(texts),
+        "student": {"accuracy": float(accuracy_score(y_true, y_pred)),
+                    "f1_macro": float(f1_score(y_true, y_pred, average="macro")),
+                    "report": classification_report(y_true, y_pred, output_dict=True),
+                    "latency": _latency_ms(student.predict, texts)},
+    }
+    if teacher is not None:
+        import numpy as np
+        t_pred = np.asarray(teacher.labels, dtype=object)[teacher.logits(texts).argmax(axis=1)]
+        rep["teacher"] = {"accuracy": float(accuracy_score(y_true, t_pred)),
+                          "f1_macro": float(f1_score(y_true, t_pred, average="macro")),
+                          "latency": _latency_ms(teacher.logits, texts)}
+        rep["agreement"] = float((t_pred == y_pred).mean())
+    return rep
+
+
+def artifact_stats(path: Path, baseline: Optional[Path] = None) -> Dict[str, Any]:
+    """Tamaño en disco, tiempo de carga y memoria Python asignada al cargar (tracemalloc)."""
+    import joblib, tracemalloc
+
+    def one(p: Path) -> Dict[str, float]:
+        tracemalloc.start()
+        t0 = perf_counter()
+        joblib.load(p)
+        load_s = perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {"size_mb": round(p.stat().st_size / 2 ** 20, 2), "load_s": round(load_s, 4),
+                "load_peak_mb": round(peak / 2 ** 20, 2)}
+
+    out = {"student": one(path)}
+    if baseline is not None and baseline.exists():
+        out["baseline"] = one(baseline)
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Destila el sentimiento a HashingVectorizer + LogisticRegression")
+    ap.add_argument("--unlabeled", nargs="*", default=[], help="CSV/Parquet con columna text (sin usar la etiqueta)")
+    ap.add_argument("--soft-labels", help="CSV con text + proba_<clase> ya etiquetado por el profesor")
+    ap.add_argument("--teacher", default=str(DEFAULT_TEACHER), help="carpeta HF (BERT-tiny) o bundle .joblib")
+    ap.add_argument("--eval", default=str(PROJECT_DIR / "data" / "processed" / "03_test.csv"),
+                    help="CSV con text,label para el reporte (se excluye del entrenamiento)")
+    ap.add_argument("--text-col", default="text")
+    ap.add_argument("--label-col", default="label")
+    ap.add_argument("--temperature", type=float, default=4.0)
+    ap.add_argument("--n-bits", type=int, default=18)
+    ap.add_argument("--C", type=float, default=16.0)
+    ap.add_argument("--name", default=DEFAULT_NAME)
+    ap.add_argument("--models-dir", type=Path, default=MODELS_DIR)
+    ap.add_argument("--configs-dir", type=Path, default=CONFIGS_DIR)
+    ap.add_argument("--eval-dir", type=Path, default=EVAL_DIR)
+    ap.add_argument("--baseline", type=Path, default=MODELS_DIR / "02_sentiment_logreg_tfidf.joblib",
+                    help="artefacto contra el que se compara tamaño y carga")
+    args = ap.parse_args(argv)
+    if not args.unlabeled and not args.soft_labels:
+        ap.error("indica --unlabeled y/o --soft-labels")
+
+    import joblib, pandas as pd
+    ev = pd.read_csv(args.eval).dropna(subset=[args.text_col, args.label_col])
+    ev_texts = [normalize_text(t) for t in ev[args.text_col].astype(str)]
+    ev_set = set(ev_texts)
+
+    try:
+        teacher = load_teacher(args.teacher)
+    except (ImportError, OSError) as e:          # sin torch/transformers o sin pesos
+        if args.unlabeled:
+            raise
+        teacher = None
+        print(f"[!] profesor no disponible ({e!r}): el reporte no incluye su comparación")
+    texts: List[str] = []
+    parts, labels = [], None
+    if args.soft_labels:
+        st, sp_, labels = read_soft_labels(args.soft_labels, args.text_col)
+        keep = [i for i, t in enumerate(st) if t not in ev_set]
+        texts += [st[i] for i in keep]
+        parts.append(sp_[keep])
+        print(f"[i] soft labels: {len(keep)} reseñas de {args.soft_labels}")
+    if args.unlabeled:
+        ut = [t for t in read_texts(args.unlabeled, args.text_col) if t not in ev_set]
+        t0 = perf_counter()
+        P, tl = teacher_soft_labels(teacher, ut, args.temperature)
+        if labels is not None and tl != labels:
+            raise ValueError(f"clases distintas: soft labels {labels} vs profesor {tl}")
+        labels = tl
+        texts += ut
+        parts.append(P)
+        print(f"[i] profesor {args.teacher}: {len(ut)} reseñas etiquetadas en {perf_counter() - t0:.1f}s (T={args.temperature})")
+
+    import numpy as np
+    soft = np.vstack(parts)
+    t0 = perf_counter()
+    student = fit_student(texts, soft, labels, n_bits=args.n_bits, C=args.C)
+    train_s = perf_counter() - t0
+    print(f"[✓] alumno entrenado con {len(texts)} reseñas en {train_s:.1f}s")
+
+    model_path = args.models_dir / f"{args.name}.joblib"
+    cfg_path = args.configs_dir / f"{args.name}.json"
+    eval_path = args.eval_dir / f"{args.name}_eval.json"
+    for p in (model_path, cfg_path, eval_path):
+        p.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(student, model_path)
+
+    config = {
+        "model": "logreg_hashing_distilled",
+        "hashing": {"ngram_range": [1, 2], "n_features": 2 ** args.n_bits, "alternate_sign": False, "norm": "l2"},
+        "clf": {"C": args.C},
+        "distillation": {"teacher": os.path.relpath(args.teacher, PROJECT_DIR) if teacher is not None else None,
+                         "soft_labels": args.soft_labels, "temperature": args.temperature,
+                         "unlabeled": args.unlabeled, "n_train": len(texts)},
+        "labels": list(labels),
+    }
+    cfg_path.write_text(json.dumps(config, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    report = {"config": config, "train_s": round(train_s, 2),
+              "eval_set": os.path.relpath(args.eval, PROJECT_DIR),
+              **evaluate(student, ev_texts, ev[args.label_col].astype(str).str.lower().tolist(), teacher),
+              "artifact": artifact_stats(model_path, args.baseline)}
+    eval_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    s = report["student"]
+    print(f"[✓] alumno  : acc {s['accuracy']:.4f} | f1_macro {s['f1_macro']:.4f} | "
+          f"{s['latency']['batch_ms_per_doc']:.3f} ms/reseña en lote")
+    if "teacher" in report:
+        t = report["teacher"]
+        print(f"[✓] profesor: acc {t['accuracy']:.4f} | f1_macro {t['f1_macro']:.4f} | "
+              f"{t['latency']['batch_ms_per_doc']:.3f} ms/reseña en lote | acuerdo {report['agreement']:.1%}")
+    print(f"[✓] modelo: {model_path}\n[✓] config: {cfg_path}\n[✓] reporte: {eval_path}")
+
+
+if __name__ == "__main__":
+    main()
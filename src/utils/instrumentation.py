@@ -0,0 +1,379 @@
+"""
+instrumentation.py
+
+Métricas estilo Prometheus (contadores, gauges e histogramas) sin dependencias
+externas, compartidas por la API (api/main.py) y los workers de Docker
+(src/dockers/baseline y src/dockers/absa).
+
+- Usable como módulo:
+    from src.utils.instrumentation import STAGE_SECONDS, Stopwatch, render_prometheus
+    st_predict = STAGE_SECONDS.labels("sentiment", "predict")
+    sw = Stopwatch()
+    ...                       # trabajo a medir
+    sw.lap(st_predict)        # observa el tiempo transcurrido desde el último lap
+
+- En la API el endpoint /metrics devuelve render_prometheus(); en los workers
+  start_metrics_server(port) lo expone en un hilo aparte.
+
+- Benchmark del overhead por mensaje:
+    python -m src.utils.instrumentation
+"""
+
+from __future__ import annotations
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import math
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets por defecto (segundos): de 50 µs a 10 s
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS: Tuple[float, ...] = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _fmt(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+def _fmt_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    """Base común: nombre, ayuda y un hijo por combinación de etiquetas."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> object:
+        """Devuelve (y cachea) el hijo para esos valores de etiqueta.
+
+        En los bucles calientes conviene resolver el hijo una sola vez fuera
+        del bucle y reutilizarlo.
+        """
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name}: se esperaban etiquetas {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key, child) -> List[str]:
+        raise NotImplementedError
+
+
+# ----------------------------------------------------------------------------
+# Counter
+# ----------------------------------------------------------------------------
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt(child.value)}"]
+
+
+# ----------------------------------------------------------------------------
+# Gauge
+# ----------------------------------------------------------------------------
+class _GaugeChild:
+    __slots__ = ("value", "fn")
+
+    def __init__(self):
+        self.value = 0.0
+        self.fn: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self.value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        """El valor se calcula al hacer scrape (coste cero en el camino caliente)."""
+        self.fn = fn
+
+    def get(self) -> float:
+        if self.fn is not None:
+            try:
+                return float(self.fn())
+            except Exception:
+                return math.nan
+        return self.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt(child.get())}"]
+
+
+# ----------------------------------------------------------------------------
+# Histogram
+# ----------------------------------------------------------------------------
+class _HistogramChild:
+    # Sin lock en observe(): cada hilo de trabajo escribe en sus propios hijos
+    # (labels por servicio/etapa) y un lock costaría más que la propia medida.
+    # Bajo el GIL, como mucho se pierde alguna observación con contención alta.
+    __slots__ = ("upper", "counts", "sum")
+
+    def __init__(self, upper: Tuple[float, ...]):
+        self.upper = upper
+        self.counts = [0] * (len(upper) + 1)   # último = +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.upper, value)] += 1
+        self.sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        return list(self.counts), self.sum
+
+
+class _Timer:
+    __slots__ = ("child", "t0")
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self):
+        self.t0 = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(perf_counter() - self.t0)
+        return False
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS, registry: Optional["Registry"] = None):
+        self.buckets: Tuple[float, ...] = tuple(sorted(float(b) for b in buckets if b != math.inf))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def _render_child(self, key, child):
+        counts, total = child.snapshot()
+        lines, acc = [], 0
+        for ub, c in zip(self.buckets + (math.inf,), counts):
+            acc += c
+            le = f'le="{_fmt(ub)}"'
+            lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {acc}")
+        lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt(total)}")
+        lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {acc}")
+        return lines
+
+
+# ----------------------------------------------------------------------------
+# Registry + exposición
+# ----------------------------------------------------------------------------
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica duplicada: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics.values():
+            lines.extend(m.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def render_prometheus(registry: Registry = REGISTRY) -> str:
+    """Texto en formato de exposición de Prometheus (v0.0.4)."""
+    return registry.render()
+
+
+class Stopwatch:
+    """Cronómetro por etapas: cada lap() observa el tiempo desde el lap anterior."""
+
+    __slots__ = ("t",)
+
+    def __init__(self):
+        self.t = perf_counter()
+
+    def lap(self, child: _HistogramChild, n: int = 1) -> float:
+        """Con n > 1 (etapa de un lote) observa n veces el coste amortizado por mensaje."""
+        now = perf_counter()
+        dt = now - self.t
+        if n == 1:
+            child.observe(dt)
+        else:
+            per_msg = dt / n
+            for _ in range(n):
+                child.observe(per_msg)
+        self.t = now
+        return dt
+
+
+def start_metrics_server(port: int, addr: str = "0.0.0.0", registry: Registry = REGISTRY,
+                         ready: Optional[Callable[[], bool]] = None) -> ThreadingHTTPServer:
+    """Sirve GET /metrics (y GET /ready si se pasa `ready`) en un hilo daemon."""
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/ready" and ready is not None:
+                ok = bool(ready())
+                self.send_response(200 if ok else 503); self.end_headers()
+                self.wfile.write(b"ready" if ok else b"not ready")
+                return
+            if path != "/metrics":
+                self.send_response(404); self.end_headers(); return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):   # sin ruido en stdout por cada scrape
+            pass
+
+    srv = ThreadingHTTPServer((addr, port), _Handler)
+    Thread(target=srv.serve_forever, daemon=True, name="metrics-http").start()
+    return srv
+
+
+def observe_consumer_lag(consumer, service: str, timeout: float = 1.0) -> None:
+    """Actualiza CONSUMER_LAG (high watermark - posición) por partición asignada.
+
+    Hace llamadas al broker: invocar de forma espaciada (p.ej. cada 5-10 s),
+    nunca por mensaje.
+    """
+    try:
+        assigned = consumer.assignment()
+        if not assigned:
+            return
+        positions = consumer.position(assigned)
+        for tp in positions:
+            lo, hi = consumer.get_watermark_offsets(tp, timeout=timeout)
+            pos = tp.offset if tp.offset >= 0 else lo
+            CONSUMER_LAG.labels(service, tp.topic, tp.partition).set(max(hi - pos, 0))
+    except Exception:
+        # el lag es informativo: nunca debe tumbar el bucle de consumo
+        pass
+
+
+# ----------------------------------------------------------------------------
+# Métricas comunes (mismos nombres en API y workers)
+# ----------------------------------------------------------------------------
+E2E_SECONDS = Histogram(
+    "ml_e2e_latency_seconds", "Latencia enqueue→resultado observada por la API", ("topic",))
+STAGE_SECONDS = Histogram(
+    "ml_stage_seconds", "Duración por etapa (deserialize, vectorize, predict, serialize, produce)",
+    ("service", "stage"))
+BATCH_SIZE = Histogram(
+    "ml_batch_size", "Mensajes procesados por iteración del consumidor", ("service",), buckets=SIZE_BUCKETS)
+MESSAGES = Counter(
+    "ml_messages_total", "Mensajes procesados por servicio y estado", ("service", "status"))
+CONSUMER_LAG = Gauge(
+    "ml_consumer_lag_messages", "Lag del consumidor por partición", ("service", "topic", "partition"))
+QUEUE_DEPTH = Gauge(
+    "ml_queue_depth", "Profundidad de colas internas (producer, pendientes, waiters)", ("service", "queue"))
+
+
+def bench_overhead(n: int = 200_000, stages: int = 5) -> Dict[str, float]:
+    """Mide el coste de la instrumentación por mensaje (µs), sin trabajo real."""
+    reg = Registry()
+    h = Histogram("bench_seconds", "bench", ("stage",), registry=reg)
+    c = Counter("bench_total", "bench", ("status",), registry=reg)
+    children = [h.labels(f"s{i}") for i in range(stages)]
+    ok = c.labels("ok")
+
+    t0 = perf_counter()
+    for _ in range(n):
+        children[0].observe(0.001)
+    per_observe = (perf_counter() - t0) / n * 1e6
+
+    t0 = perf_counter()
+    for _ in range(n):
+        sw = Stopwatch()
+        for ch in children:
+            sw.lap(ch)
+        ok.inc()
+    per_message = (perf_counter() - t0) / n * 1e6
+    return {"observe_us": per_observe, "per_message_us": per_message, "stages": stages}
+
+
+if __name__ == "__main__":
+    r = bench_overhead()
+    print(f"[i] observe(): {r['observe_us']:.3f} µs")
+    print(f"[i] por mensaje ({r['stages']} etapas + contador): {r['per_message_us']:.3f} µs")
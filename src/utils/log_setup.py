@@ -0,0 +1,167 @@
+"""
+log_setup.py
+
+Logging estructurado y no bloqueante para la API y los workers.
+
+- Los registros se encolan (QueueHandler) y un hilo aparte (QueueListener) los
+  formatea y escribe en stdout: el bucle de consumo nunca espera por stdout.
+- Salida JSON (una línea por evento) o texto, según LOG_FORMAT.
+- Nivel configurable con LOG_LEVEL (o set_level() en caliente).
+- Los eventos por mensaje pasan por un EventSampler (muestreo 1-de-N +
+  límite por segundo) para no inundar los logs del contenedor.
+
+Variables de entorno:
+    LOG_LEVEL        = INFO | DEBUG | WARNING ...   (default INFO)
+    LOG_FORMAT       = json | text                  (default json)
+    LOG_SAMPLE_EVERY = registra 1 de cada N eventos por mensaje (default 100)
+    LOG_MAX_PER_SEC  = tope de eventos por mensaje por segundo  (default 10)
+
+Uso:
+    from src.utils.log_setup import setup_logging, EventSampler
+    log = setup_logging("sentiment")
+    per_msg = EventSampler(log)
+    per_msg.info("processed", cid=cid, prediction=y)   # muestreado
+    log.warning("kafka error", extra={"fields": {"err": str(e)}})
+"""
+
+from __future__ import annotations
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from queue import Queue, Full
+from time import monotonic
+from typing import Any, Dict, Optional
+import atexit, json, logging, os, sys
+
+ROOT_LOGGER = "ml"
+_LISTENER: Optional[QueueListener] = None
+
+_STD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    """record.fields + los extra={...} sueltos (atributos que no son del LogRecord estándar)."""
+    out: Dict[str, Any] = dict(getattr(record, "fields", None) or {})
+    for k, v in record.__dict__.items():
+        if k not in _STD_ATTRS and k != "fields":
+            out[k] = v
+    return out
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro: ts, level, logger, msg + campos extra."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        doc: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        doc.update(_extra_fields(record))
+        if record.exc_info:
+            doc["exc"] = self.formatException(record.exc_info)
+        return json.dumps(doc, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        base = super().format(record)
+        fields = _extra_fields(record)                # mismos campos que JsonFormatter
+        if fields:
+            base += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return base
+
+
+class _DropQueueHandler(QueueHandler):
+    """QueueHandler que nunca bloquea: si la cola está llena, descarta y cuenta."""
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            _DropQueueHandler.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Mismo proceso: el formateo (json.dumps, repr) se hace en el listener,
+        # no en el hilo que registra.
+        return record
+
+
+def setup_logging(service: str, level: Optional[str] = None, fmt: Optional[str] = None,
+                  queue_size: int = 10_000) -> logging.Logger:
+    """Configura (una sola vez) el logger 'ml' y devuelve 'ml.<service>'."""
+    global _LISTENER
+    root = logging.getLogger(ROOT_LOGGER)
+    if _LISTENER is None:
+        fmt = (fmt or os.getenv("LOG_FORMAT", "json")).lower()
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+        q: Queue = Queue(maxsize=queue_size)
+        root.handlers[:] = [_DropQueueHandler(q)]
+        root.propagate = False          # no mezclar con la config de uvicorn
+        _LISTENER = QueueListener(q, stream, respect_handler_level=False)
+        _LISTENER.start()
+        atexit.register(_LISTENER.stop)
+    set_level(level or os.getenv("LOG_LEVEL", "INFO"))
+    return logging.getLogger(f"{ROOT_LOGGER}.{service}")
+
+
+def set_level(level: str) -> None:
+    """Cambia el nivel de todos los loggers 'ml.*' en caliente."""
+    logging.getLogger(ROOT_LOGGER).setLevel(str(level).upper())
+
+
+def dropped_records() -> int:
+    return _DropQueueHandler.dropped
+
+
+class EventSampler:
+    """Muestreo + rate limiting para eventos por mensaje.
+
+    allow() es barato (un contador y, sólo para los muestreados, un token
+    bucket), y los campos del evento no se construyen si se descarta.
+    """
+
+    def __init__(self, logger: logging.Logger, every: Optional[int] = None,
+                 max_per_sec: Optional[float] = None):
+        self.logger = logger
+        self.every = max(int(every if every is not None else os.getenv("LOG_SAMPLE_EVERY", "100")), 1)
+        self.rate = float(max_per_sec if max_per_sec is not None else os.getenv("LOG_MAX_PER_SEC", "10"))
+        self._n = 0
+        self._tokens = self.rate
+        self._last = monotonic()
+        self.suppressed = 0
+
+    def allow(self) -> bool:
+        self._n += 1
+        if self._n % self.every:
+            self.suppressed += 1
+            return False
+        now = monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+        if self._tokens < 1.0:
+            self.suppressed += 1
+            return False
+        self._tokens -= 1.0
+        return True
+
+    def log(self, level: int, msg: str, **fields: Any) -> None:
+        if not self.logger.isEnabledFor(level) or not self.allow():
+            return
+        fields["sampled_every"] = self.every
+        self.logger.log(level, msg, extra={"fields": fields})
+
+    def debug(self, msg: str, **fields: Any) -> None:
+        self.log(logging.DEBUG, msg, **fields)
+
+    def info(self, msg: str, **fields: Any) -> None:
+        self.log(logging.INFO, msg, **fields)
+
+    def error(self, msg: str, **fields: Any) -> None:
+        self.log(logging.ERROR, msg, **fields)
@@ -1,36 +1,38 @@
 from pathlib import Path
 from datetime import datetime, timezone
-import pandas as pd
+import csv
 
 def _utc_iso() -> str:
     """Devuelve timestamp UTC en ISO-8601 con 'Z'."""
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
 
+def _append_row(csv_path: Path, row: dict):
+    """Una fila al CSV (con cabecera si es nuevo); mismo formato que DataFrame.to_csv, sin importar pandas."""
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    header = not csv_path.exists()
+    with open(csv_path, "a", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=list(row), lineterminator="\n")
+        if header:
+            w.writeheader()
+        w.writerow(row)
+
 def append_result(csv_path: Path, text: str, sentiment: str, urgency: str, aspects: str = ""):
     """Agrega 1 fila a results_log.csv con ts (UTC) y normaliza campos."""
-    csv_path.parent.mkdir(parents=True, exist_ok=True)
-    row = {
+    _append_row(csv_path, {
         "ts": _utc_iso(),
         "text": text,
         "sentiment": str(sentiment).lower().strip(),
         "urgency": str(urgency).lower().strip(),
         "aspects": aspects or ""
-    }
-    df = pd.DataFrame([row])
-    header = not csv_path.exists()
-    df.to_csv(csv_path, mode="a", index=False, header=header, encoding="utf-8")
+    })
 
 def append_alert(csv_path: Path, text: str, sentiment: str, urgency: str, reason: str = "", aspects: str = ""):
     """Agrega 1 fila a alerts_log.csv con ts (UTC) y normaliza campos."""
-    csv_path.parent.mkdir(parents=True, exist_ok=True)
-    row = {
+    _append_row(csv_path, {
         "ts": _utc_iso(),
         "text": text,
         "sentiment": str(sentiment).lower().strip(),
         "urgency": str(urgency).lower().strip(),
         "reason": reason,
         "aspects": aspects or ""
-    }
-    df = pd.DataFrame([row])
-    header = not csv_path.exists()
-    df.to_csv(csv_path, mode="a", index=False, header=header, encoding="utf-8")
+    })
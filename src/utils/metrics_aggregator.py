@@ -17,33 +17,22 @@ o, si tu entorno no reconoce el paquete:
 
 from __future__ import annotations
 from pathlib import Path
-import json
-import pandas as pd
-from typing import List, Dict, Any, Optional
+import json, sys
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 
-# --- Import robusto de rutas (funciona dentro/fuera de paquete) ---
 try:
-    # cuando se ejecuta como paquete: python -m src.utils.metrics_aggregator
-    from src.utils.config_rutas import reports_dir as _reports_dir
-    from src.utils.config_rutas import get_project_dir as _get_project_dir
-except Exception:
-    # cuando se ejecuta como script directo
-    import sys
-    THIS = Path(__file__).resolve()
-    sys.path.append(str(THIS.parents[1]))  # añade .../src al sys.path
-    try:
-        from utils.config_rutas import reports_dir as _reports_dir
-        from utils.config_rutas import get_project_dir as _get_project_dir
-    except Exception:
-        # fallback: deducir proyecto por dos niveles arriba de src/
-        _get_project_dir = lambda: Path(__file__).resolve().parents[3]
-        _reports_dir = _get_project_dir() / "docs" / "reports"
+    from src.utils.settings import get_settings, ensure_dirs
+except ModuleNotFoundError:
+    sys.path.append(str(Path(__file__).resolve().parents[1]))  # añade .../src al sys.path
+    from utils.settings import get_settings, ensure_dirs
+
+if TYPE_CHECKING:                    # pandas se importa al usarlo, no al importar el módulo
+    import pandas as pd
 
-# Directorios base
-PROJECT_DIR: Path = Path(_get_project_dir()).resolve()
-EVAL_DIR: Path = (PROJECT_DIR / "data" / "evaluation").resolve()
-REPORTS_DIR: Path = Path(_reports_dir).resolve()
-REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+# Directorios base (EVAL_DIR / REPORTS_DIR); la carpeta de salida se crea al guardar
+PROJECT_DIR: Path = get_settings().project_dir.resolve()
+EVAL_DIR: Path = get_settings().eval_dir.resolve()
+REPORTS_DIR: Path = get_settings().reports_dir.resolve()
 
 
 def _safe_json_read(path: Path) -> Optional[Dict[str, Any]]:
@@ -110,6 +99,7 @@ def get_metrics_summary(eval_dir: Path = EVAL_DIR) -> pd.DataFrame:
 
         rows.append(row)
 
+    import pandas as pd
     df = pd.DataFrame(rows)
     # Ordena columnas: primero identificadores y métricas clave
     key_cols = [c for c in ["run_path", "run_name", "accuracy", "macro_f1", "precision", "recall"] if c in df.columns]
@@ -120,6 +110,7 @@ def get_metrics_summary(eval_dir: Path = EVAL_DIR) -> pd.DataFrame:
 
 def save_metrics_summary(df: pd.DataFrame, out_name: str = "metrics_summary.csv") -> Path:
     """Guarda el DataFrame en docs/reports/<out_name> y devuelve la ruta."""
+    ensure_dirs(REPORTS_DIR)
     out = REPORTS_DIR / out_name
     df.to_csv(out, index=False)
     return out
@@ -135,6 +126,7 @@ def main() -> None:
         out = save_metrics_summary(df)
         print(f"[✓] Resumen generado: {out}")
         # Vista previa corta
+        import pandas as pd
         with pd.option_context("display.max_columns", 20):
             print(df.head(10))
 
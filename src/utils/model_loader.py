@@ -0,0 +1,48 @@
+"""
+model_loader.py
+
+Carga robusta de los artefactos .joblib de los workers. Acepta los tres
+formatos que han convivido en el proyecto:
+  - sklearn Pipeline (tfidf -> clf), que es lo que guardan los notebooks
+  - dict {"model": clf, "preproc": vectorizer?}
+  - estimador suelto
+
+y los normaliza a la tupla (model, preproc) para poder medir por separado la
+vectorización y la predicción.
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import glob, os, re
+
+ASPECT_GLOB = "04_aspect_*_clf.joblib"
+
+
+def split_bundle(obj: Any) -> Tuple[Any, Optional[Any]]:
+    """Devuelve (model, preproc) a partir de un Pipeline, dict o estimador."""
+    steps = getattr(obj, "steps", None)
+    if steps is not None:                       # sklearn Pipeline
+        if len(steps) == 1:
+            return steps[0][1], None
+        return steps[-1][1], obj[:-1]
+    if isinstance(obj, dict):
+        return obj["model"], obj.get("preproc")
+    return obj, None
+
+
+def load_bundle(path: str | Path) -> Tuple[Any, Optional[Any]]:
+    import joblib
+    return split_bundle(joblib.load(path))
+
+
+def aspect_name(path: str | Path) -> str:
+    return re.sub(r"^04_aspect_|_clf\.joblib$", "", os.path.basename(str(path)))
+
+
+def load_aspect_models(models_dir: str | Path) -> Dict[str, Tuple[Any, Optional[Any]]]:
+    """Carga todos los 04_aspect_*_clf.joblib -> {"battery": (model, preproc), ...}"""
+    paths = sorted(glob.glob(os.path.join(str(models_dir), ASPECT_GLOB)))
+    if not paths:
+        raise RuntimeError(f"No hay modelos de aspecto en {models_dir}/{ASPECT_GLOB}")
+    return {aspect_name(p): load_bundle(p) for p in paths}
@@ -0,0 +1,228 @@
+"""
+model_registry.py
+
+Registro de modelos versionado con recarga en caliente para los workers.
+
+- Cada modelo se identifica por su artefacto .joblib y su config en
+  models/model_configs/*.json. La versión es "<config.version>+<sha8>" si la
+  config declara "version", y si no, los primeros 12 hex del sha256 del
+  artefacto (así un artefacto nuevo nunca reutiliza una versión anterior).
+- Un hilo en segundo plano revisa (mtime, tamaño) de artefactos y configs
+  cada `poll_s` segundos; si algo cambia, carga la nueva versión SIN tocar la
+  activa y la deja preparada ("staged").
+- El worker llama a maybe_swap() entre lotes: el cambio es un único
+  reemplazo de referencia, así que los mensajes en vuelo terminan con el
+  snapshot con el que empezaron y ninguno se pierde.
+
+Para publicar un modelo nuevo conviene escribirlo con otro nombre y hacer
+rename (atómico); si la carga o el hook `prepare` (warm-up, estado derivado)
+fallan se reintenta en la siguiente vuelta y se mantiene la versión activa.
+
+Uso:
+    reg = sentiment_registry(MODEL_PATH, CONFIGS_DIR)   # carga inicial síncrona
+    reg.start(poll_s=30)
+    ...
+    reg.maybe_swap()                 # entre lotes
+    snap = reg.current()             # snap.version, snap.entries["sentiment"].model
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Event, Lock, Thread
+from time import perf_counter, time
+from typing import Any, Callable, Dict, Optional, Tuple
+import glob, hashlib, json, logging, os
+
+try:
+    from src.utils.model_loader import load_bundle, aspect_name, ASPECT_GLOB
+except ModuleNotFoundError:
+    from utils.model_loader import load_bundle, aspect_name, ASPECT_GLOB
+
+log = logging.getLogger("ml.registry")
+
+Sources = Dict[str, Tuple[Path, Optional[Path]]]       # nombre -> (artefacto, config)
+
+
+@dataclass(frozen=True)
+class ModelEntry:
+    name: str
+    version: str
+    model: Any
+    preproc: Any
+    artifact: Path
+    config: Dict[str, Any]
+    fingerprint: Tuple
+    loaded_at: float
+    load_s: float = 0.0                # duración de la carga del artefacto
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    entries: Dict[str, ModelEntry]
+    version: str                      # versión combinada (la que se estampa en los eventos)
+    created_at: float = field(default_factory=time)
+    # estado derivado del snapshot (p. ej. el MentionDetector de ABSA): se construye en
+    # `prepare` y vive y muere con él, así el activo y el preparado no compiten por una caché
+    extras: Dict[str, Any] = field(default_factory=dict, compare=False, repr=False)
+
+    def versions(self) -> Dict[str, str]:
+        return {n: e.version for n, e in sorted(self.entries.items())}
+
+
+def _stat(p: Optional[Path]) -> Tuple:
+    try:
+        st = os.stat(p) if p else None
+        return (st.st_mtime_ns, st.st_size) if st else (None, None)
+    except FileNotFoundError:
+        return (None, None)
+
+
+def _sha12(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:12]
+
+
+def _read_config(path: Optional[Path]) -> Dict[str, Any]:
+    if not path or not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+class ModelRegistry:
+    def __init__(self, discover: Callable[[], Sources], loader: Callable[[Path], Tuple[Any, Any]] = load_bundle):
+        self._discover = discover
+        self._loader = loader
+        # hook opcional (p. ej. warm-up) que se ejecuta sobre cada snapshot nuevo
+        # en el hilo de vigilancia, ANTES de dejarlo preparado para el swap
+        self.prepare: Optional[Callable[[Snapshot], Any]] = None
+        self._lock = Lock()
+        self._staged: Optional[Snapshot] = None
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self.swaps = 0
+        self._active = self._build(previous=None)
+        if self._active is None or not self._active.entries:
+            raise RuntimeError("ModelRegistry: no se pudo cargar ningún modelo")
+
+    # --- carga ---
+    def _load_entry(self, name: str, artifact: Path, config_path: Optional[Path], fp: Tuple) -> ModelEntry:
+        cfg = _read_config(config_path)
+        t0 = perf_counter()
+        model, pre = self._loader(artifact)
+        load_s = perf_counter() - t0
+        sha = _sha12(artifact)
+        version = f"{cfg['version']}+{sha[:8]}" if cfg.get("version") else sha
+        return ModelEntry(name, version, model, pre, artifact, cfg, fp, time(), load_s)
+
+    def _build(self, previous: Optional[Snapshot]) -> Optional[Snapshot]:
+        """Devuelve un Snapshot nuevo si algo cambió respecto a `previous` (None si no)."""
+        sources = self._discover()
+        old = previous.entries if previous else {}
+        entries: Dict[str, ModelEntry] = {}
+        changed = set(old) - set(sources)                 # modelos retirados
+        for name, (artifact, config_path) in sources.items():
+            fp = (_stat(artifact), _stat(config_path))
+            prev = old.get(name)
+            if prev is not None and prev.fingerprint == fp:
+                entries[name] = prev
+                continue
+            try:
+                entries[name] = self._load_entry(name, artifact, config_path, fp)
+                changed.add(name)
+            except Exception as e:
+                if prev is None and previous is None:
+                    raise
+                log.warning("no se pudo cargar modelo, se mantiene la versión activa",
+                            extra={"model": name, "err": repr(e)})
+                if prev is not None:
+                    entries[name] = prev
+        if previous is not None and not changed:
+            return None
+        if not entries:
+            return Snapshot({}, "none")
+        combined = hashlib.sha256("|".join(f"{n}={e.version}" for n, e in sorted(entries.items())).encode()).hexdigest()[:12]
+        version = next(iter(entries.values())).version if len(entries) == 1 else combined
+        return Snapshot(entries, version)
+
+    def check(self) -> bool:
+        """Una vuelta de detección/carga; deja el snapshot nuevo en staged."""
+        with self._lock:
+            base = self._staged or self._active
+        snap = self._build(previous=base)
+        if snap is None:
+            return False
+        if self.prepare is not None:
+            try:
+                self.prepare(snap)
+            except Exception as e:
+                # no se deja preparado: la próxima vuelta lo reconstruye y lo reintenta
+                log.warning("falló la preparación del snapshot nuevo, se mantiene la versión activa",
+                            extra={"version": snap.version, "err": repr(e)})
+                return False
+        with self._lock:
+            self._staged = snap
+        log.info("nueva versión de modelos preparada", extra={"version": snap.version, "models": snap.versions()})
+        return True
+
+    # --- API para el worker ---
+    def current(self) -> Snapshot:
+        return self._active
+
+    def maybe_swap(self) -> bool:
+        """Activa la versión preparada (llamar entre lotes). True si hubo cambio."""
+        if self._staged is None:
+            return False
+        with self._lock:
+            snap, self._staged = self._staged, None
+        if snap is None:
+            return False
+        self._active = snap
+        self.swaps += 1
+        return True
+
+    # --- hilo de vigilancia ---
+    def start(self, poll_s: float = 30.0) -> "ModelRegistry":
+        if poll_s <= 0 or self._thread is not None:
+            return self
+
+        def _loop():
+            while not self._stop.wait(poll_s):
+                try:
+                    self.check()
+                except Exception as e:
+                    log.warning("error revisando modelos", extra={"err": repr(e)})
+
+        self._thread = Thread(target=_loop, daemon=True, name="model-registry")
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+# ---- registros de los workers ----
+def sentiment_registry(model_path: str | Path, configs_dir: str | Path, name: str = "sentiment") -> ModelRegistry:
+    """Un modelo: MODEL_PATH + <configs_dir>/<stem>.json"""
+    model_path, configs_dir = Path(model_path), Path(configs_dir)
+    return ModelRegistry(lambda: {name: (model_path, configs_dir / f"{model_path.stem}.json")})
+
+
+def aspect_registry(models_dir: str | Path, configs_dir: str | Path) -> ModelRegistry:
+    """Todos los 04_aspect_*_clf.joblib + 04_aspect_<aspecto>_config.json"""
+    models_dir, configs_dir = Path(models_dir), Path(configs_dir)
+
+    def discover() -> Sources:
+        out: Sources = {}
+        for p in sorted(glob.glob(str(models_dir / ASPECT_GLOB))):
+            a = aspect_name(p)
+            out[a] = (Path(p), configs_dir / f"04_aspect_{a}_config.json")
+        return out
+
+    return ModelRegistry(discover)
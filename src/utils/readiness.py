@@ -0,0 +1,175 @@
+"""
+readiness.py
+
+Warm-up de modelos y señal de "listo" (readiness) para API y workers.
+
+- warm_up(): pasa un lote de reseñas de ejemplo por el vectorizer y el
+  clasificador de cada modelo del snapshot (lote completo y de 1 fila, más la
+  ruta de features precomputadas si el worker la usa), para que la primera
+  petición real no pague imports perezosos, cachés de scipy/NumPy ni la
+  construcción del FeatureAdapter. Devuelve tiempos de carga y warm-up por
+  modelo.
+- Heartbeat: cada worker publica su estado en el tópico de control
+  (ml.control) cada HEARTBEAT_S segundos: servicio, instancia, ready,
+  versión y tiempos por modelo.
+- HeartbeatMonitor: la API lee ml.control y /ready exige un heartbeat
+  reciente con ready=true de cada servicio requerido. Lee con assign() desde
+  el final (sin subscribe() ni commits): cada instancia ve todos los
+  heartbeats y no deja grupos ni offsets huérfanos en el broker.
+
+- Usable como módulo (worker):
+    hb = Heartbeat(p, SERVICE).start()            # ready=False mientras arranca
+    timings = warm_up(registry.current(), ADAPTERS)
+    hb.update(ready=True, models=timings)
+"""
+
+from __future__ import annotations
+from threading import Event, Lock, Thread
+from time import monotonic, perf_counter, time
+from typing import Any, Dict, Iterable, List, Optional
+import json, logging, os, socket
+
+try:
+    from src.utils.instrumentation import Gauge
+    from src.utils.sparse_features import AdapterCache, Featurizer, decode_features, unwrap_vectorizer
+except ModuleNotFoundError:
+    from utils.instrumentation import Gauge
+    from utils.sparse_features import AdapterCache, Featurizer, decode_features, unwrap_vectorizer
+
+log = logging.getLogger("ml.readiness")
+
+CONTROL_TOPIC = os.getenv("TOPIC_CONTROL", "ml.control")
+HEARTBEAT_S = float(os.getenv("HEARTBEAT_S", "5"))
+WARMUP_BATCH = int(os.getenv("WARMUP_BATCH", "32"))
+
+READY = Gauge("ml_ready", "1 si el servicio terminó carga y warm-up", ("service",))
+MODEL_LOAD_SECONDS = Gauge("ml_model_load_seconds", "Duración de la carga del artefacto", ("service", "model"))
+MODEL_WARMUP_SECONDS = Gauge("ml_model_warmup_seconds", "Duración del warm-up del modelo", ("service", "model"))
+
+WARMUP_TEXTS = [
+    "The battery died after two days and support never answered. Terrible!",
+    "Great sound quality, fast shipping and a fair price. Very happy with it.",
+    "The screen is ok but the camera is blurry in low light.",
+    "Broken on arrival, I want a refund as soon as possible.",
+    "Comfortable to wear, the size fits well and the design looks nice.",
+    "Delivery was late and the box was damaged, but the product works.",
+]
+
+
+def warm_up(snapshot: Any, adapters: Optional[AdapterCache] = None,
+            batch: int = WARMUP_BATCH, service: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """Ejecuta vectorize + predict(_proba) sobre un lote de ejemplo por modelo."""
+    texts = (WARMUP_TEXTS * (batch // len(WARMUP_TEXTS) + 1))[:max(batch, 1)]
+    timings: Dict[str, Dict[str, float]] = {}
+    for name, entry in snapshot.entries.items():
+        model, pre = entry.model, entry.preproc
+        t0 = perf_counter()
+        for chunk in (texts[:1], texts):
+            X = pre.transform(chunk) if pre is not None else chunk
+            model.predict(X)
+            if hasattr(model, "predict_proba"):
+                model.predict_proba(X)
+        if adapters is not None:
+            adapter = adapters.get(entry)               # se construye aquí y no en el 1er mensaje
+            vec = unwrap_vectorizer(pre) if adapter is not None else None
+            if vec is not None:
+                fz = Featurizer(vec)
+                model.predict(adapter.transform([decode_features(fz.featurize(t)) for t in texts]))
+        timings[name] = {"load_s": round(getattr(entry, "load_s", 0.0), 4),
+                         "warmup_s": round(perf_counter() - t0, 4)}
+        if service:
+            MODEL_LOAD_SECONDS.labels(service, name).set(timings[name]["load_s"])
+            MODEL_WARMUP_SECONDS.labels(service, name).set(timings[name]["warmup_s"])
+    return timings
+
+
+class Heartbeat:
+    """Publica el estado del worker en el tópico de control (key = servicio)."""
+
+    def __init__(self, producer: Any, service: str, topic: str = CONTROL_TOPIC, every_s: float = HEARTBEAT_S):
+        self.producer, self.topic, self.every_s = producer, topic, every_s
+        self.state: Dict[str, Any] = {"service": service, "instance": f"{socket.gethostname()}:{os.getpid()}",
+                                      "ready": False, "started_at": time(), "models": {}}
+        self._stop = Event()
+        self._ready_gauge = READY.labels(service)
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.state.get("ready"))
+
+    def update(self, **fields: Any) -> None:
+        self.state.update(fields)
+        self._ready_gauge.set(1 if self.ready else 0)
+        self.beat()
+
+    def beat(self) -> None:
+        try:
+            self.producer.produce(self.topic, json.dumps({**self.state, "ts": time()}).encode("utf-8"),
+                                  key=self.state["service"])
+            self.producer.poll(0)
+        except Exception as e:
+            log.warning("no se pudo publicar heartbeat", extra={"err": repr(e)})
+
+    def start(self) -> "Heartbeat":
+        self.beat()
+
+        def _loop():
+            while not self._stop.wait(self.every_s):
+                self.beat()
+
+        Thread(target=_loop, daemon=True, name="heartbeat").start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class HeartbeatMonitor:
+    """Último heartbeat por (servicio, instancia), con la hora LOCAL de recepción."""
+
+    def __init__(self, consumer: Any, topic: str = CONTROL_TOPIC):
+        self.consumer, self.topic = consumer, topic
+        self._latest: Dict[tuple, tuple] = {}
+        self._lock = Lock()
+
+    def observe(self, raw: bytes) -> None:
+        hb = json.loads(raw.decode("utf-8"))
+        with self._lock:
+            self._latest[(hb.get("service"), hb.get("instance"))] = (monotonic(), hb)
+
+    def start(self) -> "HeartbeatMonitor":
+        def _loop():
+            from confluent_kafka import TopicPartition, OFFSET_END
+            # el tópico de control tiene 1 partición (la API lo crea así)
+            self.consumer.assign([TopicPartition(self.topic, 0, OFFSET_END)])
+            while True:
+                msg = self.consumer.poll(1.0)
+                if msg is None or msg.error():
+                    continue
+                try:
+                    self.observe(msg.value())
+                except Exception as e:
+                    log.warning("heartbeat inválido", extra={"err": repr(e)})
+
+        Thread(target=_loop, daemon=True, name="heartbeat-monitor").start()
+        return self
+
+    def services(self, max_age_s: float = 3 * HEARTBEAT_S) -> Dict[str, Dict[str, Any]]:
+        now = monotonic()
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            items = list(self._latest.values())
+        for seen, hb in items:
+            fresh = now - seen <= max_age_s
+            s = out.setdefault(hb.get("service"), {"ready": 0, "instances": 0, "model_version": None})
+            if fresh:
+                s["instances"] += 1
+                if hb.get("ready"):
+                    s["ready"] += 1
+                    s["model_version"] = hb.get("model_version")
+        return out
+
+    def missing(self, required: Iterable[str], max_age_s: float = 3 * HEARTBEAT_S) -> List[str]:
+        """Servicios requeridos sin ninguna instancia lista con heartbeat reciente."""
+        seen = self.services(max_age_s)
+        return [s for s in required if not seen.get(s, {}).get("ready")]
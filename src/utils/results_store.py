@@ -0,0 +1,359 @@
+"""
+results_store.py
+
+Almacén analítico local de resultados: SQLite en modo WAL (un escritor, el
+sink, y lectores concurrentes, el dashboard, sin bloquearse).
+
+- Tabla `results`, una fila por correlation_id:
+    ts, text, sentiment, sentiment_proba, urgency, aspects ("aspecto:label|...",
+    como results_log.csv), model_version, ts_enqueue
+  Tabla `result_aspects` (correlation_id, aspect, label) para filtrar por
+  aspecto. Índices en ts, sentiment, urgency y aspecto.
+- upsert_events(): inserta un lote de eventos (entrada: texto; salida de
+  sentiment: etiqueta; salida de ABSA: labels por aspecto) en UNA
+  transacción. Es idempotente por correlation_id: reprocesar los mismos
+  mensajes (reintentos, rebalanceos, replay desde el offset 0) deja la
+  misma fila. Cada columna conserva el valor no nulo y `ts` es el menor ts
+  visto.
+- La urgencia se calcula con simple_urgency() (la misma regla de la API)
+  cuando la fila ya tiene texto y sentimiento.
+- Lectura: Filters (urgencia, sentimiento, aspecto, rango de ts) se traduce a
+  un WHERE; counts() agrega en SQL y page() pagina por keyset
+  (ts, correlation_id), así el dashboard sólo trae la página visible.
+- Una conexión por store, compartida entre hilos (las sesiones de Streamlit
+  usan el mismo store cacheado): cada método la usa bajo un lock.
+- sync_csv(): importa de forma incremental, desde el último offset leído,
+  sólo las filas que la API añadió al CSV (el store en memoria del
+  dashboard sin RESULTS_DB no se reconstruye en cada append).
+
+- Usable como módulo:
+    store = ResultsStore("data/results.db")
+    store.upsert_events(evts)                       # lote de dicts ya deserializados
+    store.sync_csv("docs/reports/results_log.csv")  # sólo las filas nuevas desde la última llamada
+    f = Filters(sentiments=["negative"], aspects=["battery"], ts_from=t0)
+    store.counts(f, window=5000)                    # {(urgencia, sentimiento): n}, agregado en SQL
+    df, cursor = store.page(f, limit=50)            # una página (keyset por ts, correlation_id)
+    df, cursor = store.page(f, limit=50, after=cursor)
+- Usable como script (carga un results_log.csv existente):
+    python -m src.utils.results_store data/results.db --import-csv docs/reports/results_log.csv
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import argparse, io, sqlite3, sys
+from threading import RLock
+
+try:
+    from src.utils.alert_system import simple_urgency
+    from src.utils.aspects import NOT_MENTIONED
+except ModuleNotFoundError:
+    sys.path.append(str(Path(__file__).resolve().parents[1]))  # añade .../src al sys.path
+    from utils.alert_system import simple_urgency
+    from utils.aspects import NOT_MENTIONED
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    correlation_id  TEXT PRIMARY KEY,
+    ts              REAL,
+    text            TEXT,
+    sentiment       TEXT,
+    sentiment_proba REAL,
+    urgency         TEXT,
+    aspects         TEXT,
+    model_version   TEXT,
+    ts_enqueue      REAL
+);
+CREATE TABLE IF NOT EXISTS result_aspects (
+    correlation_id  TEXT NOT NULL,
+    aspect          TEXT NOT NULL,
+    label           TEXT,
+    PRIMARY KEY (correlation_id, aspect)
+) WITHOUT ROWID;
+DROP INDEX IF EXISTS ix_results_ts;
+CREATE INDEX IF NOT EXISTS ix_results_ts_cid    ON results (ts, correlation_id);
+CREATE INDEX IF NOT EXISTS ix_results_sentiment ON results (sentiment, ts);
+CREATE INDEX IF NOT EXISTS ix_results_urgency   ON results (urgency, ts);
+CREATE INDEX IF NOT EXISTS ix_aspects_aspect    ON result_aspects (aspect, label);
+"""
+
+_COLS = ("ts", "text", "sentiment", "sentiment_proba", "aspects", "model_version", "ts_enqueue")
+_UPSERT = (
+    f"INSERT INTO results (correlation_id, {', '.join(_COLS)}) VALUES ({', '.join('?' * (len(_COLS) + 1))}) "
+    "ON CONFLICT(correlation_id) DO UPDATE SET "
+    "ts = MIN(COALESCE(results.ts, excluded.ts), COALESCE(excluded.ts, results.ts)), "
+    + ", ".join(f"{c} = COALESCE(excluded.{c}, results.{c})" for c in _COLS[1:])
+)
+
+
+def connect(path: str | Path, readonly: bool = False) -> sqlite3.Connection:
+    if readonly:
+        conn = sqlite3.connect(f"file:{Path(path)}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")     # WAL: durable en checkpoint, sin fsync por commit
+        conn.executescript(SCHEMA)
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+def event_row(evt: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any], Optional[Dict[str, str]]]]:
+    """(cid, columnas, labels por aspecto) de un evento de entrada o de salida; None si no aplica."""
+    cid = evt.get("correlation_id")
+    if not cid:
+        return None
+    row: Dict[str, Any] = {}
+    aspects = None
+    payload = evt.get("payload")
+    if payload is not None:                                   # ml.*.in / ml.features: texto
+        row["text"] = payload.get("text") if isinstance(payload, dict) else str(payload)
+        row["ts_enqueue"] = (evt.get("meta") or {}).get("ts_enqueue")
+    res = evt.get("result")
+    if isinstance(res, dict):
+        row["ts"] = evt.get("ts")
+        row["ts_enqueue"] = row.get("ts_enqueue") or evt.get("ts_enqueue")
+        if "prediction" in res:                               # ml.sentiment.out
+            row["sentiment"] = str(res["prediction"])
+            proba = res.get("proba")
+            row["sentiment_proba"] = max(proba) if proba else None
+            row["model_version"] = evt.get("model_version")   # la versión que se muestra es la de sentiment
+        else:                                                 # ml.absa.out
+            aspects = {str(k): str(v) for k, v in res.items() if v != NOT_MENTIONED}   # prefiltro del worker
+            row["aspects"] = "|".join(f"{k}:{v}" for k, v in aspects.items())
+    if not row:
+        return None
+    return str(cid), row, aspects
+
+
+@dataclass(frozen=True)
+class Filters:
+    """Filtros del dashboard, traducidos a SQL (None = sin filtrar; lista vacía = nada)."""
+    urgencies: Optional[Sequence[str]] = None
+    sentiments: Optional[Sequence[str]] = None
+    aspects: Optional[Sequence[str]] = None     # la reseña tiene label para alguno de estos aspectos
+    ts_from: Optional[float] = None             # epoch, inclusivo
+    ts_to: Optional[float] = None               # epoch, exclusivo
+
+    def where(self) -> Tuple[str, List[Any]]:
+        clauses, params = ["sentiment IS NOT NULL", "ts IS NOT NULL"], []
+        for col, vals in (("urgency", self.urgencies), ("sentiment", self.sentiments)):
+            if vals is not None:
+                clauses.append(f"{col} IN ({', '.join('?' * len(vals))})" if vals else "0")
+                params += list(vals)
+        if self.aspects is not None:
+            clauses.append("EXISTS (SELECT 1 FROM result_aspects ra WHERE ra.correlation_id = results.correlation_id "
+                           f"AND ra.aspect IN ({', '.join('?' * len(self.aspects))}))" if self.aspects else "0")
+            params += list(self.aspects)
+        if self.ts_from is not None:
+            clauses.append("ts >= ?"); params.append(self.ts_from)
+        if self.ts_to is not None:
+            clauses.append("ts < ?"); params.append(self.ts_to)
+        return " AND ".join(clauses), params
+
+
+class ResultsStore:
+    def __init__(self, path: str | Path, readonly: bool = False):
+        self.path = Path(path)
+        self.conn = connect(path, readonly)
+        self._lock = RLock()
+        # sync_csv(): (ruta, offset en bytes, filas importadas, cabecera)
+        self._csv: Optional[Tuple[Path, int, int, bytes]] = None
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    # ---- escritura (sink) ----
+    def upsert_events(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Un lote en una transacción; devuelve cuántos correlation_id distintos tocó."""
+        merged: Dict[str, Dict[str, Any]] = {}
+        aspects: Dict[str, Dict[str, str]] = {}
+        for evt in events:
+            r = event_row(evt)
+            if r is None:
+                continue
+            cid, row, asp = r
+            cur = merged.setdefault(cid, {})
+            for k, v in row.items():
+                if v is None:
+                    continue
+                cur[k] = min(cur[k], v) if k == "ts" and k in cur else v
+            if asp:
+                aspects.setdefault(cid, {}).update(asp)
+        if not merged:
+            return 0
+        with self._lock, self.conn:
+            self.conn.executemany(_UPSERT, [(cid, *(r.get(c) for c in _COLS)) for cid, r in merged.items()])
+            if aspects:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO result_aspects (correlation_id, aspect, label) VALUES (?, ?, ?)",
+                    [(cid, a, lab) for cid, asp in aspects.items() for a, lab in asp.items()])
+            self._update_urgency(list(merged))
+        return len(merged)
+
+    def _update_urgency(self, cids: Sequence[str]) -> None:
+        rows = []
+        for i in range(0, len(cids), 500):                    # límite de parámetros de SQLite
+            chunk = cids[i:i + 500]
+            rows += self.conn.execute(
+                f"SELECT correlation_id, text, sentiment, urgency FROM results WHERE correlation_id IN "
+                f"({', '.join('?' * len(chunk))}) AND text IS NOT NULL AND sentiment IS NOT NULL", chunk).fetchall()
+        upd = [(u, cid) for cid, text, sent, old in rows if (u := simple_urgency(text, sent)) != old]
+        if upd:
+            self.conn.executemany("UPDATE results SET urgency = ? WHERE correlation_id = ?", upd)
+
+    # ---- lectura (dashboard) ----
+    def count(self, filters: Optional[Filters] = None) -> int:
+        where, params = (filters or Filters()).where()
+        with self._lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM results WHERE {where}", params).fetchone()[0]
+
+    def count_alerts(self) -> int:
+        """Misma regla que las alertas de la API: negativa con urgencia alta."""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM results WHERE sentiment = 'negative' AND urgency = 'high'").fetchone()[0]
+
+    def counts(self, filters: Optional[Filters] = None, window: Optional[int] = None) -> Dict[Tuple[str, str], int]:
+        """Conteos (urgencia, sentimiento) de las últimas `window` filas filtradas (todas si None)."""
+        where, params = (filters or Filters()).where()
+        src = f"SELECT urgency, sentiment FROM results WHERE {where}"
+        if window is not None:
+            src += " ORDER BY ts DESC, correlation_id DESC LIMIT ?"
+            params = params + [int(window)]
+        with self._lock:
+            rows = self.conn.execute(f"SELECT urgency, sentiment, COUNT(*) FROM ({src}) GROUP BY 1, 2", params)
+            return {(u, s): n for u, s, n in rows}
+
+    def page(self, filters: Optional[Filters] = None, limit: int = 50,
+             after: Optional[Tuple[float, str]] = None) -> Tuple[Any, Optional[Tuple[float, str]]]:
+        """Una página, de la más reciente a la más antigua, por keyset (ts, correlation_id).
+
+        `after` es el cursor devuelto por la página anterior; el costo no
+        depende de cuántas páginas se hayan saltado (no hay OFFSET).
+        Devuelve (DataFrame, cursor de la siguiente página o None).
+        """
+        import pandas as pd
+        where, params = (filters or Filters()).where()
+        if after is not None:
+            where += " AND (ts < ? OR (ts = ? AND correlation_id < ?))"
+            params = params + [after[0], after[0], after[1]]
+        with self._lock:
+            df = pd.read_sql_query(
+                f"SELECT correlation_id, ts, text, sentiment, urgency, aspects FROM results WHERE {where} "
+                f"ORDER BY ts DESC, correlation_id DESC LIMIT ?", self.conn, params=params + [int(limit) + 1])
+        cursor = None
+        if len(df) > limit:
+            df = df.iloc[:limit]
+            cursor = (float(df["ts"].iloc[-1]), str(df["correlation_id"].iloc[-1]))
+        df["ts"] = pd.to_datetime(df["ts"], unit="s", utc=True)
+        return df, cursor
+
+    def fetch(self, filters: Optional[Filters] = None, limit: int = 500):
+        """Últimas `limit` filas que cumplen los filtros, en orden cronológico (como el CSV)."""
+        df, _ = self.page(filters, limit)
+        return df.iloc[::-1].reset_index(drop=True)
+
+    def aspects(self) -> List[str]:
+        with self._lock:
+            return [a for (a,) in self.conn.execute("SELECT DISTINCT aspect FROM result_aspects ORDER BY aspect")]
+
+    def ts_range(self) -> Tuple[Optional[float], Optional[float]]:
+        with self._lock:
+            return tuple(self.conn.execute(
+                "SELECT MIN(ts), MAX(ts) FROM results WHERE sentiment IS NOT NULL").fetchone())
+
+    # ---- importación ----
+    def import_csv(self, path: str | Path, chunksize: int = 50_000) -> int:
+        """Carga un results_log.csv (ts ISO, text, sentiment, urgency, aspects); la clave es el nº de fila."""
+        import pandas as pd
+        return self._insert_csv(pd.read_csv(path, chunksize=chunksize), Path(path).name)
+
+    def sync_csv(self, path: str | Path) -> int:
+        """Importa sólo las filas añadidas a `path` desde la última llamada; devuelve cuántas.
+
+        Lee desde el offset en bytes de la última fila completa (una fila a
+        medio escribir por la API se deja para la siguiente llamada). Si el
+        CSV se truncó o es otro archivo, se borran sus filas y se reimporta.
+        """
+        import pandas as pd
+        path = Path(path)
+        with self._lock:
+            size = path.stat().st_size if path.exists() else 0
+            if self._csv and (self._csv[0] != path or size < self._csv[1]):
+                self._drop_csv(self._csv[0].name)
+                self._csv = None
+            _, offset, n, header = self._csv or (path, 0, 0, b"")
+            if size > offset:
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    tail = f.read(size - offset)
+                end = _last_complete_row(tail)
+                body = tail[:end]
+                if offset == 0 and end:
+                    header_end = tail.find(b"\n") + 1
+                    header, body = tail[:header_end], tail[header_end:end]
+                if body:
+                    n += self._insert_csv([pd.read_csv(io.BytesIO(header + body))], path.name, start=n)
+                offset += end
+            added = n - (self._csv[2] if self._csv else 0)
+            self._csv = (path, offset, n, header)
+            return added
+
+    def _drop_csv(self, name: str) -> None:
+        prefix = f"csv:{name}:%"
+        with self.conn:
+            self.conn.execute("DELETE FROM result_aspects WHERE correlation_id LIKE ?", (prefix,))
+            self.conn.execute("DELETE FROM results WHERE correlation_id LIKE ?", (prefix,))
+
+    def _insert_csv(self, chunks: Iterable[Any], name: str, start: int = 0) -> int:
+        import pandas as pd
+        n = start
+        for chunk in chunks:
+            ts = pd.to_datetime(chunk["ts"], errors="coerce", utc=True, format="ISO8601")   # con y sin "Z"
+            rows = [(f"csv:{name}:{n + i}", None if pd.isna(t) else t.timestamp(), text, sent, urg,
+                     None if pd.isna(asp) else asp)
+                    for i, (t, text, sent, urg, asp) in enumerate(zip(ts, chunk["text"], chunk["sentiment"],
+                                                                      chunk["urgency"], chunk["aspects"]))]
+            asp_rows = [(cid, a, lab or None) for cid, *_, asp in rows if asp
+                        for a, _, lab in (p.partition(":") for p in str(asp).split("|")) if a]
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO results (correlation_id, ts, text, sentiment, urgency, aspects) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", rows)
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO result_aspects (correlation_id, aspect, label) VALUES (?, ?, ?)", asp_rows)
+            n += len(rows)
+        return n - start
+
+
+def _last_complete_row(buf: bytes) -> int:
+    """Fin (exclusivo) de la última fila completa: un salto de línea fuera de comillas."""
+    end = len(buf)
+    while (nl := buf.rfind(b"\n", 0, end)) >= 0:
+        if buf.count(b'"', 0, nl) % 2 == 0:
+            return nl + 1
+        end = nl
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Almacén SQLite (WAL) de resultados")
+    ap.add_argument("db", type=Path)
+    ap.add_argument("--import-csv", type=Path, nargs="*", default=[])
+    args = ap.parse_args(argv)
+    store = ResultsStore(args.db)
+    for p in args.import_csv:
+        t0 = perf_counter()
+        n = store.import_csv(p)
+        print(f"[✓] {p}: {n} filas en {perf_counter() - t0:.2f}s")
+    print(f"[i] {args.db}: {store.count()} resultados, {store.count_alerts()} alertas")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+settings.py
+
+Rutas y configuración compartida del proyecto, resueltas desde variables de
+entorno. Reemplaza a config_rutas.py (que fijaba /content/drive/... y creaba
+una docena de carpetas al importarse).
+
+- Importar este módulo no crea carpetas ni importa pandas, sklearn ni
+  confluent_kafka: sólo os/pathlib. Las carpetas se crean cuando alguien va a
+  escribir (ensure_dirs()).
+- Cada ruta tiene su variable (PROJECT_DIR, DATA_DIR, EVAL_DIR, MODELS_DIR,
+  CONFIGS_DIR, MODEL_PATH, REPORTS_DIR, ...). Sin variables, todo cuelga de la
+  raíz del repo; en Colab basta con PROJECT_DIR=/content/drive/MyDrive/...
+- Las variables se leen en la primera llamada a get_settings() (cacheada);
+  Settings.from_env() lee de nuevo (tests).
+
+- Usable como módulo:
+    from src.utils.settings import get_settings, ensure_dirs
+    S = get_settings()
+    ensure_dirs(S.reports_dir)
+    csv_path = S.reports_dir / "results_log.csv"
+- Usable como script (muestra las rutas resueltas):
+    python -m src.utils.settings
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from pathlib import Path
+from typing import Mapping, Optional
+import os
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+@dataclass(frozen=True)
+class Settings:
+    project_dir: Path
+    data_dir: Path
+    raw_dir: Path
+    processed_dir: Path
+    eval_dir: Path
+    models_root: Path
+    models_dir: Path           # modelos entrenados (*.joblib)
+    configs_dir: Path          # configs JSON de los modelos
+    model_path: Path           # modelo de sentimiento que sirve el worker baseline
+    docs_dir: Path
+    images_dir: Path
+    reports_dir: Path          # results_log.csv / alerts_log.csv
+    notebooks_dir: Path
+    nb_model_dir: Path
+    kafka_brokers: str
+
+    @classmethod
+    def from_env(cls, env: Optional[Mapping[str, str]] = None) -> "Settings":
+        env = os.environ if env is None else env
+
+        def path(var: str, default: Path) -> Path:
+            return Path(env[var]) if env.get(var) else default
+
+        project = path("PROJECT_DIR", REPO_ROOT)
+        data = path("DATA_DIR", project / "data")
+        models_root = path("MODELS_ROOT", project / "models")
+        models = path("MODELS_DIR", models_root / "trained_models")
+        docs = path("DOCS_DIR", project / "docs")
+        notebooks = path("NOTEBOOKS_DIR", project / "notebooks")
+        return cls(
+            project_dir=project,
+            data_dir=data,
+            raw_dir=path("RAW_DIR", data / "raw"),
+            processed_dir=path("PROCESSED_DIR", data / "processed"),
+            eval_dir=path("EVAL_DIR", data / "evaluation"),
+            models_root=models_root,
+            models_dir=models,
+            configs_dir=path("CONFIGS_DIR", models_root / "model_configs"),
+            model_path=path("MODEL_PATH", models / "02_sentiment_logreg_tfidf.joblib"),
+            docs_dir=docs,
+            images_dir=path("IMAGES_DIR", docs / "images"),
+            reports_dir=path("REPORTS_DIR", docs / "reports"),
+            notebooks_dir=notebooks,
+            nb_model_dir=notebooks / "modeling",
+            kafka_brokers=env.get("KAFKA_BROKERS") or "kafka:9092",
+        )
+
+    def dirs(self) -> list:
+        """Todas las carpetas (para crearlas de una vez, p. ej. en un notebook)."""
+        return [getattr(self, f.name) for f in fields(self) if f.name.endswith("_dir") or f.name == "models_root"]
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    return Settings.from_env()
+
+
+def ensure_dirs(*dirs: Path) -> None:
+    for d in dirs:
+        Path(d).mkdir(parents=True, exist_ok=True)
+
+
+def main() -> None:
+    S = get_settings()
+    for f in fields(S):
+        print(f"{f.name:14s} {getattr(S, f.name)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+shadow.py
+
+Modo shadow / A-B: la API replica una muestra de /predict al tópico de
+entrada de un modelo candidato; la salida del candidato se registra pero
+nunca se sirve (ni RESULTS, ni waiters, ni results_log.csv).
+
+- Muestreo determinista por correlation_id (crc32 < rate * 2^32): sin
+  aleatorios ni locks, ~1 µs por petición; las no muestreadas no pagan
+  nada más. Las muestreadas producen con un Producer propio y sin flush(),
+  así el flush() de la petición servida nunca espera al espejo.
+- Cada resultado primario/candidato con el mismo correlation_id forma un
+  par; de los pares salen, de forma incremental (sin guardar los eventos):
+    agreement        fracción de pares con la misma `prediction`
+    confusion        conteos primario->candidato
+    latency_ms       primario y candidato (ts - ts_enqueue de cada uno):
+                     media/desv./min/max (Welford) y p50/p95 por buckets;
+                     delta = candidato - primario
+    throughput       peticiones, espejadas, resultados del candidato por
+                     segundo, pendientes/vencidos y µs por petición que el
+                     muestreo + espejo cuesta en la API
+- summary() devuelve un dict compacto; flush() lo escribe como
+  EVAL_DIR/shadow_<name>/metrics.json, así metrics_aggregator
+  .get_metrics_summary() lo recoge (aplanado) junto a las evaluaciones.
+
+- Usable como módulo:
+    tracker = ShadowTracker("ml.sentiment.shadow.in", rate=0.1, produce=producer.produce,
+                            out_path=eval_dir / "shadow_candidate" / "metrics.json")
+    tracker.mirror(cid, payload, key)      # en /predict, antes de producir la petición servida
+    tracker.record_primary(evt)            # consumer de resultados
+    tracker.record_candidate(evt)          # consumer del tópico de salida del candidato
+    tracker.maybe_flush()
+- Usable como script (resumen de un metrics.json; sin argumentos mide el
+  overhead de mirror() por petición):
+    python -m src.utils.shadow data/evaluation/shadow_candidate/metrics.json
+"""
+
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from time import perf_counter, time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import bisect, json, math, os, sys, zlib
+
+try:
+    from src.utils.instrumentation import Counter, QUEUE_DEPTH
+except ModuleNotFoundError:
+    from utils.instrumentation import Counter, QUEUE_DEPTH
+
+SHADOW_PAIRS = Counter("ml_shadow_pairs_total", "Pares primario/candidato del modo shadow por resultado",
+                       ("service", "result"))
+SHADOW_MIRRORED = Counter("ml_shadow_mirrored_total", "Peticiones replicadas al modelo candidato", ("service",))
+
+# buckets de latencia (ms) para p50/p95; mismos órdenes de magnitud que E2E_SECONDS
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (1, 2, 5, 10, 20, 35, 50, 75, 100, 150, 200, 300, 500,
+                                         750, 1000, 1500, 2500, 5000, 10000)
+
+
+def sample_threshold(rate: float) -> int:
+    """Umbral de crc32 para una fracción `rate` (0 = nada, 1 = todo)."""
+    return int(min(max(rate, 0.0), 1.0) * 2 ** 32)
+
+
+def sampled(cid: str, threshold: int) -> bool:
+    """Misma decisión para el mismo correlation_id en cualquier instancia de la API."""
+    return zlib.crc32(cid.encode()) < threshold
+
+
+class RunningStats:
+    """Media/desviación (Welford), min/max y cuantiles aproximados por buckets."""
+    __slots__ = ("n", "mean", "_m2", "min", "max", "_upper", "_counts")
+
+    def __init__(self, buckets: Optional[Tuple[float, ...]] = None):
+        self.n, self.mean, self._m2 = 0, 0.0, 0.0
+        self.min, self.max = math.inf, -math.inf
+        self._upper = buckets
+        self._counts = [0] * (len(buckets) + 1) if buckets else None
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        d = x - self.mean
+        self.mean += d / self.n
+        self._m2 += d * (x - self.mean)
+        self.min, self.max = min(self.min, x), max(self.max, x)
+        if self._counts is not None:
+            self._counts[bisect.bisect_left(self._upper, x)] += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Interpolación lineal dentro del bucket (acotada por min/max observados)."""
+        if not self.n or self._counts is None:
+            return None
+        rank, acc = q * self.n, 0
+        for i, c in enumerate(self._counts):
+            if c and acc + c >= rank:
+                lo = self._upper[i - 1] if i > 0 else self.min
+                hi = self._upper[i] if i < len(self._upper) else self.max
+                lo, hi = max(lo, self.min), min(hi, self.max)
+                return lo + (hi - lo) * (rank - acc) / c
+            acc += c
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.n:
+            return {"n": 0}
+        out = {"n": self.n, "mean": round(self.mean, 3),
+               "std": round(math.sqrt(self._m2 / (self.n - 1)), 3) if self.n > 1 else 0.0,
+               "min": round(self.min, 3), "max": round(self.max, 3)}
+        if self._counts is not None:
+            out["p50"], out["p95"] = (round(self.quantile(q), 3) for q in (0.5, 0.95))
+        return out
+
+
+def _latency_ms(evt: dict) -> Optional[float]:
+    ts, ts_enqueue = evt.get("ts"), evt.get("ts_enqueue")
+    return max(ts - ts_enqueue, 0.0) * 1000 if ts and ts_enqueue else None
+
+
+def _label(evt: dict) -> str:
+    res = evt.get("result")
+    return str(res.get("prediction") if isinstance(res, dict) else res)
+
+
+class ShadowTracker:
+    def __init__(self, topic_in: str, rate: float, produce: Callable[..., Any], name: str = "candidate",
+                 max_pending: int = 10000, max_age_s: float = 60.0,
+                 out_path: Optional[Path] = None, flush_s: float = 30.0, service: str = "api"):
+        self.topic_in, self.rate, self.name = topic_in, rate, name
+        self._threshold = sample_threshold(rate)
+        self._produce = produce
+        self.max_pending, self.max_age_s = max_pending, max_age_s
+        self.out_path, self.flush_s = out_path, flush_s
+        # cid -> [ts_mirror, evento primario, evento candidato]
+        self._pending: "OrderedDict[str, List[Any]]" = OrderedDict()
+        self._lock = Lock()
+        self.started = self._last_flush = time()
+        # contadores sueltos (+= bajo el GIL, como los Counter de instrumentation)
+        self.requests = self.mirrored = self.errors = 0
+        self.candidate_results = self.orphans = self.expired = 0
+        self.mirror_s = 0.0                          # tiempo total de mirror() en la API
+        self.n_pairs = self.n_agree = 0
+        self.confusion: Dict[str, int] = {}
+        self.versions: Dict[str, Optional[str]] = {"primary": None, "candidate": None}
+        self.latency = {"primary": RunningStats(LATENCY_BUCKETS_MS),
+                        "candidate": RunningStats(LATENCY_BUCKETS_MS),
+                        "delta": RunningStats()}
+        self._pairs = {r: SHADOW_PAIRS.labels(service, r) for r in ("agree", "disagree")}
+        self._mirrored = SHADOW_MIRRORED.labels(service)
+        QUEUE_DEPTH.labels(service, "shadow_pending").set_function(lambda: len(self._pending))
+
+    @classmethod
+    def from_env(cls, produce: Callable[..., Any], eval_dir: Path, service: str = "api") -> Optional["ShadowTracker"]:
+        """None si SHADOW_TOPIC_IN está vacío (modo shadow desactivado)."""
+        env = os.getenv
+        topic = env("SHADOW_TOPIC_IN", "")
+        if not topic:
+            return None
+        name = env("SHADOW_NAME", "candidate")
+        return cls(topic, float(env("SHADOW_RATE", "0.1")), produce, name=name,
+                   max_pending=int(env("SHADOW_MAX_PENDING", "10000")),
+                   max_age_s=float(env("SHADOW_MAX_AGE_S", "60")),
+                   out_path=Path(eval_dir) / f"shadow_{name}" / "metrics.json",
+                   flush_s=float(env("SHADOW_FLUSH_S", "30")), service=service)
+
+    # ---- camino de servicio ----
+    def mirror(self, cid: str, payload: dict, key: Optional[str] = None) -> bool:
+        """Replica la petición al candidato si el cid cae en la muestra. Nunca lanza."""
+        t0 = perf_counter()
+        self.requests += 1
+        if zlib.crc32(cid.encode()) >= self._threshold:     # = not sampled(), sin la llamada extra
+            self.mirror_s += perf_counter() - t0
+            return False
+        evt = {"correlation_id": cid, "payload": payload,
+               "meta": {"source": "shadow", "ts_enqueue": time()}}
+        with self._lock:
+            if not self.mirrored:
+                self.started = time()                # tasas desde el primer espejo, no desde el import
+            self._pending[cid] = [time(), None, None]
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+                self.expired += 1
+        try:
+            self._produce(self.topic_in, json.dumps(evt).encode("utf-8"), key=key)
+            self.mirrored += 1
+            self._mirrored.inc()
+        except Exception:
+            # cola local llena o broker caído: se pierde la muestra, no la petición
+            self.errors += 1
+            with self._lock:
+                self._pending.pop(cid, None)
+        self.mirror_s += perf_counter() - t0
+        return True
+
+    # ---- resultados ----
+    def record_primary(self, evt: dict) -> None:
+        cid = evt.get("correlation_id")
+        if cid not in self._pending:                 # no muestreado: sólo un lookup
+            return
+        self._record(cid, 1, evt)
+
+    def record_candidate(self, evt: dict) -> None:
+        self.candidate_results += 1
+        cid = evt.get("correlation_id")
+        if cid is None or not self._record(cid, 2, evt):
+            self.orphans += 1                        # vencido u originado en otra instancia
+
+    def _record(self, cid: str, side: int, evt: dict) -> bool:
+        with self._lock:
+            slot = self._pending.get(cid)
+            if slot is None:
+                return False
+            slot[side] = evt
+            if slot[1] is None or slot[2] is None:
+                return True
+            del self._pending[cid]
+            self._pair(slot[1], slot[2])
+        return True
+
+    def _pair(self, primary: dict, candidate: dict) -> None:
+        lp, lc = _latency_ms(primary), _latency_ms(candidate)
+        a, b = _label(primary), _label(candidate)
+        self.n_pairs += 1
+        self.n_agree += a == b
+        self._pairs["agree" if a == b else "disagree"].inc()
+        k = f"{a}->{b}"
+        self.confusion[k] = self.confusion.get(k, 0) + 1
+        self.versions["primary"] = primary.get("model_version") or self.versions["primary"]
+        self.versions["candidate"] = candidate.get("model_version") or self.versions["candidate"]
+        if lp is not None:
+            self.latency["primary"].add(lp)
+        if lc is not None:
+            self.latency["candidate"].add(lc)
+        if lp is not None and lc is not None:
+            self.latency["delta"].add(lc - lp)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Descarta pendientes con más de max_age_s (candidato caído o muy atrasado)."""
+        cutoff = (now or time()) - self.max_age_s
+        n = 0
+        with self._lock:
+            while self._pending and next(iter(self._pending.values()))[0] < cutoff:
+                self._pending.popitem(last=False)
+                n += 1
+        self.expired += n
+        return n
+
+    # ---- resumen ----
+    def summary(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = now or time()
+        elapsed = max(now - self.started, 1e-9)
+        return {
+            "run": "shadow",
+            "name": self.name,
+            "topic_in": self.topic_in,
+            "rate": self.rate,
+            "primary_version": self.versions["primary"],
+            "candidate_version": self.versions["candidate"],
+            "started": self.started,
+            "updated": now,
+            "n_pairs": self.n_pairs,
+            "agreement": round(self.n_agree / self.n_pairs, 4) if self.n_pairs else None,
+            "confusion": dict(sorted(self.confusion.items())),
+            "latency_ms": {k: s.summary() for k, s in self.latency.items()},
+            "throughput": {
+                "seconds": round(elapsed, 1),
+                "requests": self.requests,
+                "mirrored": self.mirrored,
+                "mirror_errors": self.errors,
+                "candidate_results": self.candidate_results,
+                "orphans": self.orphans,
+                "pending": len(self._pending),
+                "expired": self.expired,
+                "requests_per_s": round(self.requests / elapsed, 2),
+                "mirrored_per_s": round(self.mirrored / elapsed, 2),
+                "candidate_per_s": round(self.candidate_results / elapsed, 2),
+                "api_overhead_us_per_request": round(self.mirror_s / max(self.requests, 1) * 1e6, 3),
+            },
+        }
+
+    def flush(self, now: Optional[float] = None) -> Optional[Path]:
+        """Escribe summary() en out_path (tmp + rename: el agregador nunca lee un JSON a medias)."""
+        self._last_flush = now or time()
+        if self.out_path is None:
+            return None
+        self.out_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.out_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.summary(now), indent=2, ensure_ascii=False, default=str), encoding="utf-8")
+        os.replace(tmp, self.out_path)
+        return self.out_path
+
+    def maybe_flush(self, now: Optional[float] = None) -> Optional[Path]:
+        """Vence pendientes y escribe el resumen como mucho cada flush_s (llamar desde el consumer)."""
+        now = now or time()
+        if now - self._last_flush < self.flush_s:
+            return None
+        self.expire(now)
+        return self.flush(now)
+
+
+def bench_overhead(n: int = 200_000, rate: float = 0.1) -> Dict[str, float]:
+    """µs por petición de mirror() con un produce vacío (coste del muestreo + serializado del espejo)."""
+    import uuid
+    cids = [str(uuid.uuid4()) for _ in range(n)]
+    out = {}
+    for r in (0.0, rate):
+        tr = ShadowTracker("bench", r, produce=lambda *a, **k: None, max_pending=n)
+        t0 = perf_counter()
+        for cid in cids:
+            tr.mirror(cid, {"text": "x"})
+        out[f"rate_{r:g}_us"] = (perf_counter() - t0) / n * 1e6
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("[i] overhead de mirror() (µs/petición):", {k: round(v, 3) for k, v in bench_overhead().items()})
+        return
+    s = json.loads(Path(argv[0]).read_text(encoding="utf-8"))
+    lat, tp = s["latency_ms"], s["throughput"]
+    print(f"[✓] {s['name']} ({s['candidate_version']}) vs {s['primary_version']} | pares {s['n_pairs']} "
+          f"| agreement {s['agreement']}")
+    for k in ("primary", "candidate", "delta"):
+        print(f"    {k:10s} {lat[k]}")
+    print(f"    espejadas {tp['mirrored']}/{tp['requests']} | pendientes {tp['pending']} | vencidas {tp['expired']} "
+          f"| API {tp['api_overhead_us_per_request']} µs/petición")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+sparse_features.py
+
+Featurización compartida: tokenizar cada reseña UNA vez y reutilizar el
+resultado en el scorer de sentimiento y en los 10 de ABSA.
+
+Todos los TfidfVectorizer del proyecto comparten analizador (word, lowercase,
+ngram_range=(1, 2), token_pattern por defecto) y sólo difieren en el
+vocabulario/idf. Por eso el featurizador emite los términos como hash de 64
+bits + conteo, independiente de cualquier vocabulario, y cada scorer los
+proyecta sobre el suyo con FeatureAdapter (búsqueda vectorizada en numpy),
+reproduciendo exactamente TfidfVectorizer.transform (tf * idf + norma l2).
+
+Los modelos de la familia "hashed" (HashingVectorizer -> TfidfTransformer ->
+clf) no tienen vocabulario: no usan adapter, pero si varios comparten los
+parámetros del HashingVectorizer (los 10 aspectos), la matriz de conteos se
+calcula una vez por lote y cada modelo sólo aplica su idf (`shared`).
+
+Formato del blob (little endian):
+    b"SPF1" | firma del analizador (uint64) | n (uint32) | n x hash (uint64) | n x conteo (uint16)
+
+- Usable como módulo:
+    fz = Featurizer.from_config("models/model_configs/02_sentiment_logreg_tfidf.json")
+    blob = fz.featurize(text)
+    adapter = FeatureAdapter.from_preproc(pre)     # pre = vectorizer del bundle
+    X = adapter.transform([decode_features(blob)]) # csr_matrix igual a pre.transform([text])
+"""
+
+from __future__ import annotations
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import base64, hashlib, json, struct
+
+MAGIC = b"SPF1"
+_HEADER = struct.Struct("<4sQI")
+_ANALYZER_PARAMS = ("analyzer", "lowercase", "ngram_range", "token_pattern", "strip_accents", "stop_words")
+
+
+def term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def analyzer_signature(vectorizer: Any) -> Optional[int]:
+    """Firma estable del analizador (None si usa callables no serializables)."""
+    params = vectorizer.get_params()
+    if any(callable(params.get(k)) for k in ("analyzer", "preprocessor", "tokenizer")):
+        return None
+    sig = {k: params.get(k) for k in _ANALYZER_PARAMS}
+    sig["ngram_range"] = list(sig["ngram_range"])
+    if isinstance(sig["stop_words"], (list, set, frozenset, tuple)):
+        sig["stop_words"] = sorted(sig["stop_words"])
+    raw = json.dumps(sig, sort_keys=True).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "little")
+
+
+def unwrap_vectorizer(pre: Any) -> Optional[Any]:
+    """Devuelve el vectorizer de texto de un preproc (Pipeline de 1 paso o vectorizer suelto)."""
+    steps = getattr(pre, "steps", None)
+    if steps is not None:
+        if len(steps) != 1:
+            return None
+        pre = steps[0][1]
+    return pre if hasattr(pre, "vocabulary_") and hasattr(pre, "build_analyzer") else None
+
+
+def split_hashing(pre: Any) -> Optional[Tuple[str, Any, Optional[Any]]]:
+    """(clave de parámetros, HashingVectorizer, resto del preproc) si el preproc empieza con uno."""
+    steps = getattr(pre, "steps", None)
+    head = steps[0][1] if steps else pre
+    if type(head).__name__ != "HashingVectorizer":
+        return None
+    params = head.get_params()
+    if any(callable(params.get(k)) for k in ("analyzer", "preprocessor", "tokenizer")):
+        return None
+    key = json.dumps({k: (str(v) if k == "dtype" else v) for k, v in params.items()}, sort_keys=True, default=list)
+    rest = pre[1:] if steps and len(steps) > 1 else None
+    return key, head, rest
+
+
+# ---- codificación ----
+def encode_features(signature: int, hashes, counts) -> bytes:
+    import numpy as np
+    hashes = np.asarray(hashes, dtype="<u8")
+    counts = np.minimum(np.asarray(counts), 65535).astype("<u2")
+    return _HEADER.pack(MAGIC, signature, len(hashes)) + hashes.tobytes() + counts.tobytes()
+
+
+def decode_features(blob: bytes) -> Tuple[int, Any, Any]:
+    import numpy as np
+    magic, signature, n = _HEADER.unpack_from(blob, 0)
+    if magic != MAGIC:
+        raise ValueError("blob de features inválido")
+    off = _HEADER.size
+    hashes = np.frombuffer(blob, dtype="<u8", count=n, offset=off)
+    counts = np.frombuffer(blob, dtype="<u2", count=n, offset=off + 8 * n)
+    return signature, hashes, counts
+
+
+def to_b64(blob: bytes) -> str:
+    return base64.b64encode(blob).decode("ascii")
+
+
+def from_b64(s: str) -> bytes:
+    return base64.b64decode(s)
+
+
+# ---- lado productor ----
+class Featurizer:
+    def __init__(self, vectorizer: Any):
+        self.signature = analyzer_signature(vectorizer)
+        if self.signature is None:
+            raise ValueError("El vectorizer usa un analizador no serializable")
+        self._analyze = vectorizer.build_analyzer()
+
+    @classmethod
+    def from_config(cls, config_path: str | Path) -> "Featurizer":
+        """Construye el analizador desde models/model_configs/*.json (sin cargar el .joblib)."""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        cfg = json.loads(Path(config_path).read_text(encoding="utf-8")).get("tfidf", {})
+        return cls(TfidfVectorizer(ngram_range=tuple(cfg.get("ngram_range", (1, 1)))))
+
+    def featurize(self, text: str) -> bytes:
+        import numpy as np
+        counts = Counter(self._analyze(text or ""))
+        hashes = np.fromiter((term_hash(t) for t in counts), dtype=np.uint64, count=len(counts))
+        cnt = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+        return encode_features(self.signature, hashes, cnt)
+
+
+# ---- lado consumidor ----
+class FeatureAdapter:
+    """Proyecta (hashes, conteos) sobre el vocabulario de un TfidfVectorizer/CountVectorizer."""
+
+    def __init__(self, vectorizer: Any):
+        import numpy as np
+        self.signature = analyzer_signature(vectorizer)
+        vocab = vectorizer.vocabulary_
+        h = np.fromiter((term_hash(t) for t in vocab), dtype=np.uint64, count=len(vocab))
+        cols = np.fromiter(vocab.values(), dtype=np.int64, count=len(vocab))
+        order = np.argsort(h)
+        self._keys, self._cols = h[order], cols[order]
+        self.n_features = len(vocab)
+        self.binary = bool(getattr(vectorizer, "binary", False))
+        self.sublinear_tf = bool(getattr(vectorizer, "sublinear_tf", False))
+        self.idf = getattr(vectorizer, "idf_", None) if getattr(vectorizer, "use_idf", False) else None
+        self.norm = getattr(vectorizer, "norm", None)
+
+    @classmethod
+    def from_preproc(cls, pre: Any) -> Optional["FeatureAdapter"]:
+        vec = unwrap_vectorizer(pre)
+        if vec is None or analyzer_signature(vec) is None:
+            return None
+        return cls(vec)
+
+    def accepts(self, signature: int) -> bool:
+        return signature == self.signature
+
+    def transform(self, docs: Iterable[Tuple[int, Any, Any]]):
+        """docs = [(firma, hashes, conteos), ...] -> csr_matrix (n_docs x n_features)."""
+        import numpy as np
+        from scipy.sparse import csr_matrix
+        indptr: List[int] = [0]
+        all_cols, all_vals = [], []
+        for signature, hashes, counts in docs:
+            if signature != self.signature:
+                raise ValueError("firma de analizador distinta a la del vectorizer")
+            pos = np.searchsorted(self._keys, hashes)
+            pos[pos >= len(self._keys)] = 0
+            hit = self._keys[pos] == hashes
+            cols = self._cols[pos[hit]]
+            vals = counts[hit].astype(np.float64)
+            order = np.argsort(cols)
+            cols, vals = cols[order], vals[order]
+            if self.binary:
+                vals[:] = 1.0
+            elif self.sublinear_tf:
+                vals = np.log(vals) + 1.0
+            if self.idf is not None:
+                vals = vals * self.idf[cols]
+            if self.norm == "l2":
+                n = np.sqrt(np.dot(vals, vals))
+                if n > 0: vals = vals / n
+            elif self.norm == "l1":
+                n = np.abs(vals).sum()
+                if n > 0: vals = vals / n
+            all_cols.append(cols); all_vals.append(vals)
+            indptr.append(indptr[-1] + len(cols))
+        data = np.concatenate(all_vals) if all_vals else np.zeros(0)
+        indices = np.concatenate(all_cols) if all_cols else np.zeros(0, dtype=np.int64)
+        return csr_matrix((data, indices, np.asarray(indptr)), shape=(len(indptr) - 1, self.n_features))
+
+
+class AdapterCache:
+    """FeatureAdapter por modelo del registro; se reconstruye cuando cambia la versión."""
+
+    def __init__(self):
+        self._by_name: Dict[str, Tuple[str, Optional[FeatureAdapter]]] = {}
+        self._hashing: Dict[str, Tuple[str, Optional[Tuple[str, Any, Optional[Any]]]]] = {}
+
+    def get(self, entry: Any) -> Optional[FeatureAdapter]:
+        cached = self._by_name.get(entry.name)
+        if cached is None or cached[0] != entry.version:
+            adapter = FeatureAdapter.from_preproc(entry.preproc) if entry.preproc is not None else None
+            cached = self._by_name[entry.name] = (entry.version, adapter)
+        return cached[1]
+
+    def vectorize(self, entry: Any, text: str, features: Optional[Tuple[int, Any, Any]] = None):
+        """Usa las features precomputadas si el analizador coincide; si no, el texto."""
+        return self.vectorize_many(entry, [text], [features])
+
+    def vectorize_many(self, entry: Any, texts: List[str], features: List[Optional[Tuple[int, Any, Any]]],
+                       shared: Optional[Dict[str, Any]] = None, rows: Optional[List[int]] = None):
+        """Lote: features si TODOS los eventos las traen con la firma correcta; si no, texto.
+
+        `shared` (un dict por lote) reutiliza los conteos del HashingVectorizer
+        entre modelos con los mismos parámetros. `rows` limita la salida a esas
+        filas del lote (prefiltro de ABSA); `texts`/`features` siguen siendo
+        el lote completo para que `shared` sirva a todos los modelos.
+        """
+        def pick(xs):
+            return xs if rows is None else [xs[i] for i in rows]
+        feats = pick(features) if features else features
+        if feats and all(f is not None for f in feats):
+            adapter = self.get(entry)
+            if adapter is not None and all(adapter.accepts(f[0]) for f in feats):
+                return adapter.transform(feats)
+        pre = entry.preproc
+        if pre is None:
+            return pick(list(texts))
+        if shared is not None:
+            cached = self._hashing.get(entry.name)
+            if cached is None or cached[0] != entry.version:
+                cached = self._hashing[entry.name] = (entry.version, split_hashing(pre))
+            if cached[1] is not None:
+                key, head, rest = cached[1]
+                X = shared.get(key)
+                if X is None:
+                    X = shared[key] = head.transform(texts)
+                if rows is not None:
+                    X = X[rows]
+                return rest.transform(X) if rest is not None else X
+        return pre.transform(pick(texts))
+
+
+def event_features(evt: Dict[str, Any]) -> Optional[Tuple[int, Any, Any]]:
+    """Features de un evento del tópico intermedio (None si el evento trae sólo texto)."""
+    b64 = evt.get("features")
+    return decode_features(from_b64(b64)) if b64 else None
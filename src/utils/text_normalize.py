@@ -0,0 +1,175 @@
+"""
+text_normalize.py
+
+Etapa única de normalización de texto + detección de casi-duplicados.
+
+- normalize_text(): Unicode NFKC, casefold, espacios colapsados y truncado a
+  TEXT_MAX_CHARS. La API normaliza una vez al recibir la reseña y ese texto es
+  el que viaja en el payload a featurizer/workers y el que usan las reglas de
+  urgencia y aspectos (en vez de .lower() sueltos en cada función).
+- simhash64(): huella de 64 bits sobre palabras + bigramas de palabras. Dos
+  textos con distancia de Hamming <= max_distance se tratan como el mismo.
+  Por defecto max_distance=0 (sólo repeticiones exactas): en reseñas largas
+  cambiar " is " por " is not " deja casi siempre la distancia en <= 3, así
+  que los casi-duplicados pueden invertir el sentimiento.
+- NearDupIndex: ventana deslizante de las últimas `window` huellas con
+  índice por bandas (4 bandas de 16 bits: con distancia <= 3 al menos una
+  banda coincide exacta), así la búsqueda no recorre toda la ventana.
+
+- Usable como módulo:
+    norm = normalize_text(text)
+    first = index.lookup_or_add(cid, norm)   # cid del primer texto casi igual, o None
+- Usable como script (tasa de dedup y throughput sobre un CSV con columna text):
+    python -m src.utils.text_normalize docs/reports/results_log.csv
+"""
+
+from __future__ import annotations
+from collections import deque
+from pathlib import Path
+from threading import Lock
+from time import perf_counter
+from typing import Any, Deque, Dict, Hashable, List, Optional, Tuple
+import argparse, csv, os, re, unicodedata
+
+TEXT_MAX_CHARS = int(os.getenv("TEXT_MAX_CHARS", "5000"))
+_WORD = re.compile(r"\w+")
+
+
+def normalize_text(text: Any, max_chars: int = TEXT_MAX_CHARS) -> str:
+    """NFKC + casefold + espacios colapsados + truncado (0 = sin truncar)."""
+    t = unicodedata.normalize("NFKC", "" if text is None else str(text)).casefold()
+    t = " ".join(t.split())
+    return t[:max_chars] if max_chars and len(t) > max_chars else t
+
+
+def simhash64(norm: str) -> int:
+    """SimHash de 64 bits (palabras + bigramas). 0 si el texto no tiene palabras.
+
+    Usa hash() de Python (con semilla por proceso): las huellas sólo son
+    comparables dentro del mismo proceso, que es donde vive el índice.
+    """
+    import numpy as np
+    words = _WORD.findall(norm)
+    if not words:
+        return 0
+    feats = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    h = np.fromiter(map(hash, feats), dtype=np.int64, count=len(feats)).view(np.uint64)
+    bits = np.unpackbits(h.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")   # (n, 64)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(feats)
+    return int(np.packbits(votes > 0, bitorder="little").view("<u8")[0])
+
+
+class NearDupIndex:
+    def __init__(self, window: int = 10_000, max_distance: int = 0, bands: int = 4):
+        """max_distance=0: sólo repeticiones exactas del texto normalizado (sin SimHash)."""
+        if max_distance >= bands:
+            raise ValueError("max_distance debe ser < bands (si no, el índice por bandas pierde casos)")
+        self.window, self.max_distance = window, max_distance
+        self._shift = 64 // bands
+        self._mask = (1 << self._shift) - 1
+        self._bands = bands
+        self._exact: Dict[str, Hashable] = {}
+        self._buckets: List[Dict[int, List[Hashable]]] = [{} for _ in range(bands)]
+        self._items: Dict[Hashable, Tuple[str, int]] = {}
+        self._order: Deque[Hashable] = deque()
+        self._lock = Lock()
+        self.lookups = self.exact_hits = self.near_hits = 0
+
+    def _band_keys(self, fp: int):
+        for b in range(self._bands):
+            yield b, (fp >> (b * self._shift)) & self._mask
+
+    def _find(self, norm: str, fp: int) -> Optional[Hashable]:
+        key = self._exact.get(norm)
+        if key is not None:
+            self.exact_hits += 1
+            return key
+        if fp == 0:
+            return None
+        for b, band in self._band_keys(fp):
+            for key in self._buckets[b].get(band, ()):
+                if (self._items[key][1] ^ fp).bit_count() <= self.max_distance:
+                    self.near_hits += 1
+                    return key
+        return None
+
+    def _add(self, key: Hashable, norm: str, fp: int) -> None:
+        self._items[key] = (norm, fp)
+        self._exact.setdefault(norm, key)
+        if fp:
+            for b, band in self._band_keys(fp):
+                self._buckets[b].setdefault(band, []).append(key)
+        self._order.append(key)
+        while len(self._order) > self.window:
+            self._evict(self._order.popleft())
+
+    def _evict(self, key: Hashable) -> None:
+        norm, fp = self._items.pop(key)
+        if self._exact.get(norm) == key:
+            del self._exact[norm]
+        if fp:
+            for b, band in self._band_keys(fp):
+                bucket = self._buckets[b].get(band)
+                if bucket is not None:
+                    bucket.remove(key)
+                    if not bucket:
+                        del self._buckets[b][band]
+
+    def lookup_or_add(self, key: Hashable, norm: str, fp: Optional[int] = None) -> Optional[Hashable]:
+        """Key del primer texto casi igual dentro de la ventana; si no hay, registra `key` y devuelve None."""
+        if not norm:
+            return None
+        with self._lock:                        # repetición exacta: sin calcular la huella
+            first = self._exact.get(norm)
+            if first is not None:
+                self.lookups += 1
+                self.exact_hits += 1
+                return first
+        if fp is None:
+            fp = simhash64(norm) if self.max_distance > 0 else 0
+        with self._lock:
+            self.lookups += 1
+            first = self._find(norm, fp)
+            if first is None:
+                self._add(key, norm, fp)
+            return first
+
+    def clear(self) -> None:
+        """Vacía la ventana (p.ej. al cambiar la versión del modelo); conserva los contadores."""
+        with self._lock:
+            self._exact.clear()
+            for b in self._buckets:
+                b.clear()
+            self._items.clear()
+            self._order.clear()
+
+    def stats(self) -> Dict[str, float]:
+        hits = self.exact_hits + self.near_hits
+        return {"lookups": self.lookups, "exact_hits": self.exact_hits, "near_hits": self.near_hits,
+                "dedup_rate": round(hits / self.lookups, 4) if self.lookups else 0.0}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Tasa de casi-duplicados y throughput de normalización + dedup")
+    ap.add_argument("csv", type=Path)
+    ap.add_argument("--text-col", default="text")
+    ap.add_argument("--window", type=int, default=10_000)
+    ap.add_argument("--max-distance", type=int, default=0, help="0 = sólo exactos; 1-3 = casi-duplicados")
+    args = ap.parse_args(argv)
+
+    with open(args.csv, newline="", encoding="utf-8") as f:
+        texts = [row.get(args.text_col) or "" for row in csv.DictReader(f)]
+    index = NearDupIndex(window=args.window, max_distance=args.max_distance)
+    t0 = perf_counter()
+    for i, t in enumerate(texts):
+        index.lookup_or_add(i, normalize_text(t))
+    elapsed = perf_counter() - t0
+    s = index.stats()
+    print(f"[i] {args.csv}: {len(texts)} textos")
+    print(f"[✓] dedup: {s['exact_hits']} exactos + {s['near_hits']} casi-duplicados "
+          f"-> tasa {s['dedup_rate']:.1%} (ventana {args.window}, Hamming <= {args.max_distance})")
+    print(f"[✓] throughput: {len(texts) / elapsed:,.0f} textos/s ({elapsed / max(len(texts), 1) * 1e6:.1f} µs/texto)")
+
+
+if __name__ == "__main__":
+    main()
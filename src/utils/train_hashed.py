@@ -0,0 +1,298 @@
+"""
+train_hashed.py
+
+Reentrena el sentimiento y los 10 aspectos como familia "hashed":
+HashingVectorizer -> TfidfTransformer -> LogisticRegression.
+
+El espacio de features es fijo (2**n_bits) y no hay vocabulario: el artefacto
+sólo guarda idf y coeficientes (arrays numpy), sin el dict de términos que
+domina la carga y la memoria de los 02/04 actuales (y que el worker ABSA
+tiene diez veces).
+
+- Las configs existentes (02_sentiment_logreg_tfidf.json y
+  04_aspect_*_config.json) definen ngram_range, split y etiquetas. El
+  clasificador es el de los notebooks 02/04: LogisticRegression
+  balanced/lbfgs.
+- Los datasets por aspecto se arman con el lexicón del notebook 04
+  (src/utils/aspects.py).
+- Si se pasa --eval, ese CSV es el set de evaluación y se excluye del
+  entrenamiento. Si no, se usa el split de la config (test_size/seed).
+- Salida:
+  - models/trained_models/hashed/{02_sentiment_logreg_hashing,
+    04_aspect_<a>_clf}.joblib
+  - sus configs en models/model_configs/hashed/
+  Los workers cargan la familia con sólo apuntar MODEL_PATH / MODELS_DIR y
+  CONFIGS_DIR ahí.
+- El reporte (data/evaluation/06_hashed_models_eval.json) compara, en el
+  mismo set de evaluación:
+  - accuracy / f1_macro de: el modelo hashed, un TF-IDF reentrenado con los
+    mismos datos (paridad) y el artefacto actual;
+  - tamaño, tiempo y memoria de carga;
+  - latencia por reseña.
+
+- Usable como script:
+    python -m src.utils.train_hashed --data data/raw/amazon_reviews_limpio_balanceado.csv
+    python -m src.utils.train_hashed --data data/processed/03_validation.csv data/processed/02_preds_sentiment.csv \\
+        --eval data/processed/03_test.csv
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse, glob, json, os, re, sys
+
+try:
+    from src.utils.aspects import detect_aspects
+    from src.utils.text_normalize import normalize_text
+    from src.utils.sparse_features import AdapterCache
+except ModuleNotFoundError:
+    sys.path.append(str(Path(__file__).resolve().parents[1]))  # añade .../src al sys.path
+    from utils.aspects import detect_aspects
+    from utils.text_normalize import normalize_text
+    from utils.sparse_features import AdapterCache
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+MODELS_DIR = PROJECT_DIR / "models" / "trained_models"
+CONFIGS_DIR = PROJECT_DIR / "models" / "model_configs"
+EVAL_DIR = PROJECT_DIR / "data" / "evaluation"
+SENTIMENT_CONFIG = "02_sentiment_logreg_tfidf.json"
+SENTIMENT_NAME = "02_sentiment_logreg_hashing"
+MIN_SAMPLES = 60                               # como en el notebook 04
+TEXT_COLS = ("text", "reviewText", "review_text", "review_body", "body", "content", "review")
+LABEL_COLS = ("label", "y_true", "sentiment", "target", "y")
+LABELS = ("negative", "neutral", "positive")
+
+
+def hashed_pipeline(cfg: Dict[str, Any], n_bits: int = 16):
+    """Pipeline hashed a partir de una config 02/04 (usa su ngram_range)."""
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    ngram = tuple(cfg.get("tfidf", {}).get("ngram_range", (1, 2)))
+    return Pipeline([
+        ("hash", HashingVectorizer(ngram_range=ngram, n_features=2 ** n_bits, alternate_sign=False, norm=None)),
+        ("tfidf", TfidfTransformer()),
+        ("clf", LogisticRegression(max_iter=1000, class_weight="balanced", solver="lbfgs")),
+    ])
+
+
+def tfidf_pipeline(cfg: Dict[str, Any]):
+    """El pipeline de los notebooks 02/04, para medir paridad con los mismos datos."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    t = cfg.get("tfidf", {})
+    return Pipeline([
+        ("tfidf", TfidfVectorizer(lowercase=True, ngram_range=tuple(t.get("ngram_range", (1, 2))),
+                                  min_df=t.get("min_df", 1), max_features=t.get("max_features"))),
+        ("clf", LogisticRegression(max_iter=1000, class_weight="balanced", solver="lbfgs")),
+    ])
+
+
+def hashed_config(cfg: Dict[str, Any], n_bits: int, n_train: int) -> Dict[str, Any]:
+    out = {k: v for k, v in cfg.items() if k != "tfidf"}
+    out["model"] = "logreg_hashing_tfidf"
+    out["hashing"] = {"ngram_range": list(cfg.get("tfidf", {}).get("ngram_range", (1, 2))),
+                      "n_features": 2 ** n_bits, "alternate_sign": False}
+    out["n_samples"] = n_train
+    return out
+
+
+# ---- datos ----
+def read_labeled(paths: Sequence[str | Path]) -> List[Tuple[str, str]]:
+    """(texto normalizado, etiqueta) sin repetidos; columnas detectadas como en los notebooks."""
+    import pandas as pd
+    seen, out = set(), []
+    for p in paths:
+        df = pd.read_csv(p)
+        tc = next((c for c in TEXT_COLS if c in df.columns), None)
+        lc = next((c for c in LABEL_COLS if c in df.columns), None)
+        if tc is None or lc is None:
+            raise ValueError(f"{p}: no se detectó columna de texto/etiqueta en {list(df.columns)}")
+        for t, y in zip(df[tc], df[lc]):
+            if pd.isna(t) or pd.isna(y):
+                continue
+            t, y = normalize_text(t), str(y).lower().strip()
+            if t and y in LABELS and t not in seen:
+                seen.add(t)
+                out.append((t, y))
+    return out
+
+
+def split_data(rows: List[Tuple[str, str]], eval_rows: Optional[List[Tuple[str, str]]], cfg: Dict[str, Any]):
+    """(train, eval): el CSV de --eval si lo hay; si no, el split de la config."""
+    if eval_rows is not None:
+        ev = {t for t, _ in eval_rows}
+        return [r for r in rows if r[0] not in ev], eval_rows
+    from sklearn.model_selection import train_test_split
+    s = cfg.get("split", {})
+    y = [lab for _, lab in rows]
+    tr, te = train_test_split(rows, test_size=s.get("test_size", 0.2), random_state=s.get("seed", 42),
+                              stratify=y if s.get("stratify", True) else None)
+    return tr, te
+
+
+# ---- medición ----
+def _scores(model, texts: Sequence[str], y: Sequence[str]) -> Dict[str, float]:
+    from sklearn.metrics import accuracy_score, f1_score
+    pred = model.predict(list(texts))
+    return {"accuracy": round(float(accuracy_score(y, pred)), 4),
+            "f1_macro": round(float(f1_score(y, pred, average="macro")), 4)}
+
+
+def _load_stats(paths: Sequence[Path]) -> Dict[str, Any]:
+    """Carga de un conjunto de artefactos: tamaño, tiempo y memoria Python retenida (tracemalloc)."""
+    import joblib, tracemalloc
+    joblib.load(paths[0])                      # imports de sklearn fuera de la medición
+    tracemalloc.start()
+    t0 = perf_counter()
+    models = [joblib.load(p) for p in paths]
+    load_s = perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"models": models, "n": len(paths),
+            "size_mb": round(sum(p.stat().st_size for p in paths) / 2 ** 20, 2),
+            "load_s": round(load_s, 3), "retained_mb": round(current / 2 ** 20, 2),
+            "load_peak_mb": round(peak / 2 ** 20, 2)}
+
+
+def _latency(pipelines: Dict[str, Any], texts: Sequence[str], batch: int = 64, repeat: int = 3) -> Dict[str, float]:
+    """ms por reseña para el conjunto de modelos, en lote y de a 1, por la ruta de los workers."""
+    from types import SimpleNamespace
+    from sklearn.pipeline import Pipeline
+    entries = []
+    for name, pipe in pipelines.items():
+        steps = pipe.steps
+        pre = Pipeline(steps[:-1]) if len(steps) > 2 else steps[0][1]
+        entries.append(SimpleNamespace(name=name, version="eval", model=steps[-1][1], preproc=pre))
+    cache = AdapterCache()
+
+    def run(chunk):
+        shared: Dict[str, Any] = {}
+        nones = [None] * len(chunk)
+        for e in entries:
+            e.model.predict(cache.vectorize_many(e, chunk, nones, shared))
+
+    out = {}
+    for name, chunk, calls in (("batch", list(texts[:batch]), 1), ("single", list(texts[:100]), None)):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = perf_counter()
+            if calls:
+                run(chunk)
+            else:
+                for t in chunk:
+                    run([t])
+            best = min(best, perf_counter() - t0)
+        out[f"{name}_ms_per_doc"] = round(best * 1000 / len(chunk), 4)
+    return out
+
+
+def _family_stats(paths: Sequence[Path], texts: Sequence[str]) -> Dict[str, Any]:
+    st = _load_stats(paths)
+    models = st.pop("models")
+    st["latency"] = _latency({p.stem: m for p, m in zip(paths, models)}, texts)
+    return st
+
+
+def aspect_configs(configs_dir: Path) -> Dict[str, Tuple[Path, Dict[str, Any]]]:
+    out = {}
+    for p in sorted(glob.glob(str(configs_dir / "04_aspect_*_config.json"))):
+        a = re.sub(r"^04_aspect_|_config\.json$", "", os.path.basename(p))
+        out[a] = (Path(p), json.loads(Path(p).read_text(encoding="utf-8")))
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Reentrena sentimiento + aspectos con HashingVectorizer + TfidfTransformer")
+    ap.add_argument("--data", nargs="+", required=True, help="CSV etiquetados (text + label/sentiment/y_true)")
+    ap.add_argument("--eval", help="CSV de evaluación (si no, split de cada config)")
+    ap.add_argument("--n-bits", type=int, default=16)
+    ap.add_argument("--configs-dir", type=Path, default=CONFIGS_DIR)
+    ap.add_argument("--models-dir", type=Path, default=MODELS_DIR, help="donde están los artefactos actuales")
+    ap.add_argument("--out-models", type=Path, default=MODELS_DIR / "hashed")
+    ap.add_argument("--out-configs", type=Path, default=CONFIGS_DIR / "hashed")
+    ap.add_argument("--report", type=Path, default=EVAL_DIR / "06_hashed_models_eval.json")
+    ap.add_argument("--no-reference", action="store_true", help="no reentrenar el TF-IDF de referencia")
+    args = ap.parse_args(argv)
+
+    import joblib
+    rows = read_labeled(args.data)
+    eval_rows = read_labeled([args.eval]) if args.eval else None
+    print(f"[i] {len(rows)} reseñas etiquetadas" + (f", evaluación en {args.eval} ({len(eval_rows)})" if args.eval else ""))
+    args.out_models.mkdir(parents=True, exist_ok=True)
+    args.out_configs.mkdir(parents=True, exist_ok=True)
+    args.report.parent.mkdir(parents=True, exist_ok=True)
+
+    jobs = [("sentiment", SENTIMENT_NAME, SENTIMENT_CONFIG,
+             json.loads((args.configs_dir / SENTIMENT_CONFIG).read_text(encoding="utf-8")),
+             args.models_dir / "02_sentiment_logreg_tfidf.joblib", None)]
+    for a, (cfg_path, cfg) in aspect_configs(args.configs_dir).items():
+        jobs.append((a, f"04_aspect_{a}_clf", f"04_aspect_{a}_config.json", cfg,
+                     args.models_dir / f"04_aspect_{a}_clf.joblib", a))
+
+    report: Dict[str, Any] = {"n_bits": args.n_bits, "data": [os.path.relpath(p, PROJECT_DIR) for p in args.data],
+                              "eval_set": args.eval, "models": {}}
+    new_paths: Dict[str, Path] = {}
+    for name, out_name, cfg_name, cfg, current, aspect in jobs:
+        if aspect is None:
+            data, ev = rows, eval_rows
+        else:
+            data = [r for r in rows if aspect in detect_aspects(r[0])]
+            ev = [r for r in eval_rows if aspect in detect_aspects(r[0])] if eval_rows is not None else None
+        train, test = split_data(data, ev, cfg)
+        if len(train) < MIN_SAMPLES or len({y for _, y in train}) < 2:
+            report["models"][name] = {"status": "skipped", "reason": "few_samples_or_single_class", "n": len(train)}
+            print(f"[!] {name}: omitido ({len(train)} ejemplos)")
+            continue
+        X, y = [t for t, _ in train], [lab for _, lab in train]
+        Xt, yt = [t for t, _ in test], [lab for _, lab in test]
+
+        t0 = perf_counter()
+        pipe = hashed_pipeline(cfg, args.n_bits).fit(X, y)
+        train_s = perf_counter() - t0
+        out_path = args.out_models / f"{out_name}.joblib"
+        joblib.dump(pipe, out_path)
+        cfg_out = args.out_configs / (f"{SENTIMENT_NAME}.json" if aspect is None else cfg_name)
+        cfg_out.write_text(json.dumps(hashed_config(cfg, args.n_bits, len(train)), ensure_ascii=False, indent=2),
+                           encoding="utf-8")
+        new_paths[name] = out_path
+
+        entry = {"status": "trained", "n_train": len(train), "n_eval": len(test), "train_s": round(train_s, 2),
+                 "hashed": _scores(pipe, Xt, yt)}
+        if not args.no_reference:
+            entry["tfidf_same_data"] = _scores(tfidf_pipeline(cfg).fit(X, y), Xt, yt)
+        if current.exists():
+            entry["current_artifact"] = _scores(joblib.load(current), Xt, yt)
+        report["models"][name] = entry
+        ref = entry.get("tfidf_same_data", {}).get("f1_macro")
+        print(f"[✓] {name:14s} n={len(train):5d} | f1 hashed {entry['hashed']['f1_macro']:.4f}"
+              + (f" | tfidf mismos datos {ref:.4f}" if ref is not None else "")
+              + (f" | artefacto actual {entry['current_artifact']['f1_macro']:.4f}" if "current_artifact" in entry else ""))
+
+    bench_texts = [t for t, _ in (eval_rows or rows)][:200]
+    current_sent = args.models_dir / "02_sentiment_logreg_tfidf.joblib"
+    current_aspects = sorted(Path(p) for p in glob.glob(str(args.models_dir / "04_aspect_*_clf.joblib")))
+    new_aspects = [p for n, p in sorted(new_paths.items()) if n != "sentiment"]
+    report["resources"] = {}
+    for fam, sent, asp in (("current", current_sent, current_aspects),
+                           ("hashed", new_paths.get("sentiment"), new_aspects)):
+        r = {}
+        if sent is not None and sent.exists():
+            r["sentiment"] = _family_stats([sent], bench_texts)
+        if asp:
+            r["absa"] = _family_stats(asp, bench_texts)
+        report["resources"][fam] = r
+    args.report.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    for fam, r in report["resources"].items():
+        for svc, s in r.items():
+            print(f"[✓] {fam:8s} {svc:9s}: {s['n']:2d} modelos | {s['size_mb']:6.2f} MB disco | carga {s['load_s']:.3f}s | "
+                  f"{s['retained_mb']:.1f} MB retenidos | {s['latency']['batch_ms_per_doc']:.3f} ms/reseña en lote, "
+                  f"{s['latency']['single_ms_per_doc']:.3f} de a 1")
+    print(f"[✓] modelos: {args.out_models}\n[✓] configs: {args.out_configs}\n[✓] reporte: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
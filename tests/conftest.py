@@ -0,0 +1,12 @@
+import pytest
+
+from src.utils.settings import Settings
+
+
+@pytest.fixture
+def tmp_settings(tmp_path, monkeypatch):
+    """Settings con PROJECT_DIR en un directorio temporal (vacío: nada se crea al resolver rutas)."""
+    monkeypatch.setenv("PROJECT_DIR", str(tmp_path))
+    for var in ("DATA_DIR", "EVAL_DIR", "MODELS_DIR", "CONFIGS_DIR", "MODEL_PATH", "REPORTS_DIR"):
+        monkeypatch.delenv(var, raising=False)
+    return Settings.from_env()
@@ -0,0 +1,33 @@
+from time import perf_counter
+
+import pytest
+
+from src.utils.admission import AdmissionController, Rejected
+
+
+def test_rechazo_rapido_con_cola_llena_y_timeout_de_cola():
+    adm = AdmissionController(initial=2, min_limit=1, max_limit=4, max_queue=0, queue_timeout_s=0.05)
+    t0, t1 = adm.acquire(), adm.acquire()
+    with pytest.raises(Rejected) as e:
+        adm.acquire()
+    assert e.value.status == 429 and e.value.retry_after >= 1
+
+    adm.max_queue = 1
+    start = perf_counter()
+    with pytest.raises(Rejected) as e:
+        adm.acquire()
+    assert e.value.status == 503 and perf_counter() - start < 0.5
+    adm.release(t0); adm.release(t1)
+    assert adm.inflight == 0 and adm.queued == 0
+
+
+def test_aimd_sube_con_latencia_baja_y_baja_con_sobrecarga():
+    adm = AdmissionController(initial=4, min_limit=2, max_limit=8, target_s=1.0)
+    for _ in range(20):
+        adm.release(adm.acquire())
+    assert adm.limit > 6
+    before = adm.limit
+    adm.release(adm.acquire(), overloaded=True)
+    assert adm.limit == pytest.approx(before * 0.9)
+    adm.release(adm.acquire(), overloaded=True)       # misma "ronda": no vuelve a bajar
+    assert adm.limit == pytest.approx(before * 0.9)
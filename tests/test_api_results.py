@@ -0,0 +1,125 @@
+from threading import Event
+
+import pytest
+
+api = pytest.importorskip("api.main")
+
+
+@pytest.fixture
+def clean_api(tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "RESULTS_CSV", tmp_path / "results_log.csv")
+    monkeypatch.setattr(api, "ALERTS_CSV", tmp_path / "alerts_log.csv")
+    for d in (api.RESULTS, api.WAITERS, api.PENDING_TEXT, api.RESULT_TOPIC, api.SHARED):
+        d.clear()
+    if api.DEDUP is not None:
+        api.DEDUP.clear()
+    return api
+
+
+def test_con_featurizador_absa_no_resuelve_predict_ni_se_acumula(clean_api):
+    cid, waiter = "c1", Event()
+    api.PENDING_TEXT[cid] = "the battery died"
+    api.WAITERS[cid] = waiter
+    absa = {"correlation_id": cid, "result": {"battery": "negative", "price": "not_mentioned"}}
+    sent = {"correlation_id": cid, "result": {"prediction": "negative"}}
+
+    assert api.handle_result(api.TOPIC_ABSA_OUT, absa) is False     # llega primero: se ignora
+    assert not waiter.is_set() and cid not in api.RESULTS and cid in api.PENDING_TEXT
+    assert api.handle_result(api.TOPIC_SENT_OUT, sent) is True
+    assert waiter.is_set() and api.RESULTS.pop(cid) == sent
+    assert "negative" in api.RESULTS_CSV.read_text(encoding="utf-8")
+
+    # resultado tardío (el waiter ya venció): ni RESULTS ni texto pendiente
+    assert api.handle_result(api.TOPIC_SENT_OUT, {**sent, "correlation_id": "c2"}) is False
+    assert not api.RESULTS and not api.PENDING_TEXT
+
+
+def test_peticion_que_espera_la_salida_de_absa(clean_api):
+    cid, waiter = "c3", Event()
+    api.WAITERS[cid] = waiter
+    api.RESULT_TOPIC[cid] = api.TOPIC_ABSA_OUT
+    assert api.handle_result(api.TOPIC_SENT_OUT, {"correlation_id": cid, "result": {"prediction": "x"}}) is False
+    assert api.handle_result(api.TOPIC_ABSA_OUT, {"correlation_id": cid, "result": {"battery": "positive"}})
+    assert waiter.is_set() and api.RESULTS[cid]["result"] == {"battery": "positive"}
+
+
+def test_topico_de_features_se_crea_con_los_demas():
+    assert api.TOPIC_FEATURES in api.TOPICS
+
+
+def test_cambio_de_version_del_modelo_vacia_la_cache_de_duplicados(clean_api, monkeypatch):
+    if api.DEDUP is None:
+        pytest.skip("DEDUP_WINDOW=0")
+    assert api.DEDUP.max_distance == 0                                # por defecto sólo exactos
+    monkeypatch.setattr(api, "_DEDUP_VERSION", None)
+    monkeypatch.setattr(api, "_DEDUP_LOADED_AT", 0.0)
+    monkeypatch.setattr(api, "_DEDUP_SEEN", set())
+    res = lambda cid, v: {"correlation_id": cid, "model_version": v, "result": {"prediction": "positive"}}
+    api.handle_result(api.TOPIC_SENT_OUT, res("r0", "v1"))
+    assert api.DEDUP.lookup_or_add("a", "same text") is None
+    api._shared_register("a")
+    api.handle_result(api.TOPIC_SENT_OUT, res("r1", "v1"))
+    assert api.DEDUP.lookup_or_add("b", "same text") == "a"          # misma versión: se reutiliza
+    api.handle_result(api.TOPIC_SENT_OUT, res("r2", "v2"))            # recarga en caliente
+    assert not api.SHARED and api.DEDUP.lookup_or_add("c", "same text") is None
+    api._shared_register("c")
+    api.handle_result(api.TOPIC_SENT_OUT, res("r3", "v1"))            # rolling reload: otro worker sigue en v1
+    assert api.DEDUP.lookup_or_add("e", "same text") == "c"          # ...y no vacía la caché otra vez
+
+    monkeypatch.setattr(api, "_DEDUP_SINCE", 0.0)                     # TTL vencido
+    api._dedup_check()
+    assert api.DEDUP.lookup_or_add("d", "same text") is None
+
+
+def test_respuesta_por_duplicado_se_publica_para_el_sink(clean_api, monkeypatch):
+    import json
+    from src.utils.results_store import ResultsStore
+
+    sent = []
+
+    class FakeProducer:
+        def produce(self, topic, value, key=None):
+            sent.append((topic, json.loads(value)))
+
+        def poll(self, timeout):
+            return 0
+
+    monkeypatch.setattr(api, "get_producer", lambda: FakeProducer())
+    first = {"correlation_id": "a", "result": {"prediction": "negative"}, "model_version": "v1",
+             "ts": 1.0, "ts_enqueue": 0.5}
+    out = api._from_first("b", "a", first, "Broken!", {"text": "broken!"})
+    assert out["correlation_id"] == "b" and out["dedup_of"] == "a"
+
+    (topic, evt), = sent
+    assert topic == api.TOPIC_SENT_OUT and evt["meta"]["dedup_of"] == "a" and "ts_enqueue" not in evt
+    assert api.handle_result(topic, evt) is False                     # la API ya lo registró
+    assert api.RESULTS_CSV.read_text(encoding="utf-8").count("negative") == 1
+
+    store = ResultsStore(":memory:")
+    store.upsert_events([evt])
+    assert store.conn.execute("SELECT correlation_id, text, sentiment, model_version FROM results").fetchall() == \
+        [("b", "broken!", "negative", "v1")]
+
+
+def test_rolling_reload_sólo_invalida_con_una_versión_más_nueva(clean_api, monkeypatch):
+    if api.DEDUP is None:
+        pytest.skip("DEDUP_WINDOW=0")
+    monkeypatch.setattr(api, "_DEDUP_VERSION", None)
+    monkeypatch.setattr(api, "_DEDUP_LOADED_AT", 0.0)
+    monkeypatch.setattr(api, "_DEDUP_SEEN", set())
+    res = lambda cid, v, at: {"correlation_id": cid, "model_version": v, "model_loaded_at": at,
+                              "result": {"prediction": "positive"}}
+    api.handle_result(api.TOPIC_SENT_OUT, res("r0", "v2", 200.0))
+    first, shared = api._dedup_lookup("a", "same text")
+    assert first is None
+    for cid, v, at in [("r1", "v1", 100.0), ("r2", "v2", 205.0), ("r3", "v1", 100.0)]:
+        api.handle_result(api.TOPIC_SENT_OUT, res(cid, v, at))         # alternan: ninguno es más nuevo
+    assert api._dedup_lookup("b", "same text") == ("a", shared)
+
+    api._shared_result(shared, res("a", "v1", 100.0))                  # resultado del modelo anterior:
+    assert shared.evt is None                                          # no se reutiliza
+    api._shared_result(shared, res("a", "v2", 200.0))
+    assert shared.evt["model_version"] == "v2"
+
+    api.handle_result(api.TOPIC_SENT_OUT, res("r4", "v1", 300.0))      # rollback a v1 (recargado después)
+    assert api._dedup_lookup("c", "same text")[0] is None
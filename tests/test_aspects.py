@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from src.utils.aspects import MentionDetector, aspect_vocabulary, detect_aspects
+
+
+def _entry(docs):
+    vec = TfidfVectorizer(ngram_range=(1, 2)).fit(docs)
+    return SimpleNamespace(preproc=vec, config={"n_samples": len(docs), "split": {"test_size": 0.0}})
+
+
+def test_vocabulario_por_aspecto_desde_el_idf():
+    entries = {
+        "battery": _entry(["the batteries died", "batteries last", "phone is ok", "the phone batteries"]),
+        "screen":  _entry(["touchscreen is nice", "the phone touchscreen", "phone is ok", "nice phone"]),
+        "price":   _entry(["phone is ok", "the phone", "nice phone deal", "ok deal"]),
+    }
+    vocab = aspect_vocabulary(entries, min_lift=3.0, min_rate=0.5)
+    assert "batteries" in vocab["battery"] and "touchscreen" in vocab["screen"]
+    assert "phone" not in vocab["battery"]            # común a todos los aspectos
+
+
+def test_detector_lexicon_o_vocabulario_y_siempre_si_no_hay_como_descartar():
+    det = MentionDetector(["battery", "screen", "mystery"], {"battery": ["batteries"]})
+    texts = ["Two new batteries", "The screen cracked", "Nothing relevant"]
+    mask = det.detect_many(texts)
+    assert mask[:, 0].tolist() == [True, False, False]            # "batteries" no contiene "battery"
+    assert mask[:, 1].tolist() == [False, True, False]            # lexicón
+    assert mask[:, 2].all()                                       # sin lexicón ni vocabulario
+    assert detect_aspects(texts[0]) == []
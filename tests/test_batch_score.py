@@ -0,0 +1,96 @@
+import joblib
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+
+from src.utils import batch_score
+from src.utils.batch_score import run
+
+DOCS = ["great phone love it", "terrible broken phone", "it is ok", "battery died fast",
+        "screen is great", "awful screen", "love the battery", "ok price"]
+LABELS = ["positive", "negative", "neutral", "negative", "positive", "negative", "positive", "neutral"]
+
+
+@pytest.fixture
+def models_dir(tmp_path):
+    d = tmp_path / "models"
+    d.mkdir()
+    fit = lambda y: make_pipeline(TfidfVectorizer(), LogisticRegression(max_iter=200)).fit(DOCS, y)
+    joblib.dump(fit(LABELS), d / "02_sentiment_logreg_tfidf.joblib")
+    for aspect in ("battery", "screen"):
+        joblib.dump(fit(LABELS), d / f"04_aspect_{aspect}_clf.joblib")
+    return d
+
+
+@pytest.mark.parametrize("workers,chunksize", [(1, 100), (2, 3)])
+def test_scoring_por_chunks_en_orden(tmp_path, models_dir, workers, chunksize):
+    src = tmp_path / "in.csv"
+    pd.DataFrame({"id": range(len(DOCS) * 2), "text": DOCS * 2}).to_csv(src, index=False)
+    out = tmp_path / "out.csv"
+    stats = run(src, out, chunksize=chunksize, workers=workers, models_dir=models_dir, max_inflight=2,
+                configs_dir=models_dir)
+
+    df = pd.read_csv(out)
+    assert stats["rows"] == len(df) == 16
+    assert stats["chunks"] == -(-16 // chunksize)
+    assert df["id"].tolist() == list(range(16))                 # se escribe en el orden de entrada
+    for col in ("sentiment", "sentiment_proba", "urgency", "aspects", "absa_battery", "absa_screen"):
+        assert col in df.columns
+    assert set(df["sentiment"]) <= set(LABELS)
+    # prefiltro como en el worker ABSA: "ok price" no menciona batería ni pantalla
+    row = df[df["text"] == "ok price"].iloc[0]
+    assert row["absa_battery"] == row["absa_screen"] == "not_mentioned" and pd.isna(row["aspects"])
+    row = df[df["text"] == "battery died fast"].iloc[0]
+    assert row["absa_battery"] in LABELS and row["aspects"] == f"battery:{row['absa_battery']}"
+
+
+def test_sin_prefiltro_puntua_todos_los_aspectos(tmp_path, models_dir):
+    src = tmp_path / "in.csv"
+    pd.DataFrame({"text": DOCS}).to_csv(src, index=False)
+    out = tmp_path / "out.csv"
+    run(src, out, workers=1, models_dir=models_dir, configs_dir=models_dir, prefilter=False)
+    df = pd.read_csv(out)
+    assert df["absa_battery"].isin(LABELS).all() and df["aspects"].str.count(":").eq(2).all()
+
+
+def test_sin_absa_y_columna_de_texto_inexistente(tmp_path, models_dir):
+    src = tmp_path / "in.csv"
+    pd.DataFrame({"review": DOCS}).to_csv(src, index=False)
+    out = tmp_path / "out.csv"
+    run(src, out, text_col="review", workers=1, models_dir=models_dir, with_absa=False)
+    assert not any(c.startswith("absa_") for c in pd.read_csv(out).columns)
+    with pytest.raises(KeyError):
+        run(src, out, workers=1, models_dir=models_dir, configs_dir=models_dir)
+
+
+def test_parquet_sin_pyarrow_falla_con_mensaje_claro(tmp_path, models_dir, monkeypatch):
+    import builtins
+    real_import = builtins.__import__
+
+    def no_pyarrow(name, *args, **kwargs):
+        if name.split(".")[0] == "pyarrow":
+            raise ModuleNotFoundError("No module named 'pyarrow'")
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_pyarrow)
+    with pytest.raises(ModuleNotFoundError, match="pip install pyarrow"):
+        batch_score.require_pyarrow(tmp_path / "in.csv", tmp_path / "out.parquet")
+    batch_score.require_pyarrow(tmp_path / "in.csv", tmp_path / "out.csv")      # CSV: no hace falta
+
+
+def test_salida_igual_a_la_entrada_o_fallo_no_pierden_datos(tmp_path, models_dir):
+    src = tmp_path / "in.csv"
+    pd.DataFrame({"text": DOCS}).to_csv(src, index=False)
+    before = src.read_bytes()
+    with pytest.raises(ValueError):
+        run(src, tmp_path / "." / "in.csv", workers=1, models_dir=models_dir, with_absa=False)
+    assert src.read_bytes() == before
+
+    out = tmp_path / "out.csv"
+    out.write_text("resultado anterior\n")
+    with pytest.raises(KeyError):                               # falla a mitad: el destino no se toca
+        run(src, out, text_col="review", workers=1, models_dir=models_dir, with_absa=False)
+    assert out.read_text() == "resultado anterior\n"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["in.csv", "models", "out.csv"]
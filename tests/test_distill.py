@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.utils.distill import fit_student, soften
+from src.utils.sparse_features import AdapterCache
+
+
+def test_soften_temperatura():
+    P = soften([[2.0, 0.0, -2.0]], temperature=1.0)
+    P4 = soften([[2.0, 0.0, -2.0]], temperature=4.0)
+    assert np.allclose(P.sum(axis=1), 1) and P4[0, 0] < P[0, 0]      # T alta -> más suave
+    assert P4.argmax() == P.argmax() == 0
+
+
+def test_alumno_hashing_aprende_etiquetas_suaves_y_usa_el_texto():
+    texts = ["great product love it", "terrible broken refund", "it is ok nothing special",
+             "love the great sound", "broken on arrival terrible", "ok price ok quality"] * 5
+    soft = np.array([[0.05, 0.15, 0.8], [0.85, 0.1, 0.05], [0.2, 0.6, 0.2],
+                     [0.1, 0.1, 0.8], [0.8, 0.15, 0.05], [0.15, 0.7, 0.15]] * 5)
+    student = fit_student(texts, soft, ["negative", "neutral", "positive"], n_bits=12, C=10.0)
+    assert list(student.predict(["great love", "terrible broken", "ok nothing special"])) == \
+        ["positive", "negative", "neutral"]
+    assert not hasattr(student[0], "vocabulary_")                        # sin vocabulario que cargar
+    entry = SimpleNamespace(name="sentiment", version="v1", model=student[-1], preproc=student[:-1])
+    X = AdapterCache().vectorize_many(entry, ["great love"], [(1, None, None)])   # sin adapter -> texto
+    assert X.shape == (1, 2 ** 12)
@@ -0,0 +1,33 @@
+from benchmarks.inmemory_kafka import InMemoryBroker, Producer, Consumer, AdminClient, NewTopic
+
+
+def test_produce_consume_y_offsets_por_grupo():
+    b = InMemoryBroker()
+    p = Producer({"broker": b})
+    for i in range(3):
+        p.produce("t.in", f"m{i}".encode(), key=str(i))
+    c = Consumer({"broker": b, "group.id": "g", "auto.offset.reset": "earliest"})
+    c.subscribe(["t.in"])
+    got = [c.poll(0.1).value() for _ in range(3)]
+    assert got == [b"m0", b"m1", b"m2"]
+    assert c.poll(0) is None
+    # otro consumidor del mismo grupo tras cerrar el primero no re-lee
+    c.close()
+    c2 = Consumer({"broker": b, "group.id": "g", "auto.offset.reset": "earliest"})
+    c2.subscribe(["t.in"])
+    assert c2.poll(0) is None
+
+
+def test_particiones_por_key_y_reparto_en_grupo():
+    b = InMemoryBroker()
+    AdminClient({"broker": b}).create_topics([NewTopic("t", num_partitions=4)])
+    p = Producer({"broker": b})
+    for _ in range(5):
+        p.produce("t", b"x", key="producto-1")
+    assert sum(len(log) > 0 for log in b.topics["t"]) == 1   # misma key -> misma partición
+
+    c1 = Consumer({"broker": b, "group.id": "g"}); c1.subscribe(["t"])
+    c2 = Consumer({"broker": b, "group.id": "g"}); c2.subscribe(["t"])
+    parts1 = {tp.partition for tp in c1.assignment()}
+    parts2 = {tp.partition for tp in c2.assignment()}
+    assert parts1 | parts2 == {0, 1, 2, 3} and not parts1 & parts2
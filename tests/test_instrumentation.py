@@ -0,0 +1,35 @@
+from src.utils.instrumentation import Registry, Histogram, Counter, Gauge, Stopwatch, bench_overhead
+
+
+def test_histogram_buckets_y_render():
+    reg = Registry()
+    h = Histogram("lat_seconds", "latencia", ("stage",), buckets=(0.1, 1.0), registry=reg)
+    child = h.labels("predict")
+    for v in (0.05, 0.5, 5.0):
+        child.observe(v)
+    out = reg.render()
+    assert '# TYPE lat_seconds histogram' in out
+    assert 'lat_seconds_bucket{stage="predict",le="0.1"} 1' in out
+    assert 'lat_seconds_bucket{stage="predict",le="1"} 2' in out
+    assert 'lat_seconds_bucket{stage="predict",le="+Inf"} 3' in out
+    assert 'lat_seconds_count{stage="predict"} 3' in out
+
+
+def test_counter_gauge_y_stopwatch():
+    reg = Registry()
+    c = Counter("msgs_total", "mensajes", ("status",), registry=reg)
+    g = Gauge("depth", "profundidad", ("queue",), registry=reg)
+    h = Histogram("st_seconds", "etapa", registry=reg)
+    c.labels("ok").inc(); c.labels("ok").inc()
+    g.labels("pending").set_function(lambda: 7)
+    Stopwatch().lap(h.labels())
+    out = reg.render()
+    assert 'msgs_total{status="ok"} 2' in out
+    assert 'depth{queue="pending"} 7' in out
+    assert "st_seconds_count 1" in out
+
+
+def test_overhead_por_mensaje():
+    # 5 etapas + 1 contador: debe quedarse en unos pocos µs (margen amplio para CI)
+    r = bench_overhead(n=20_000)
+    assert r["per_message_us"] < 25
@@ -0,0 +1,39 @@
+from benchmarks.inmemory_kafka import InMemoryBroker, Producer, Consumer, AdminClient, NewTopic
+from src.utils.kafka_utils import parse_partitions, partition_batches, poll_batch, routing_key
+
+
+def test_routing_key_y_particiones_configurables():
+    assert routing_key({"text": "x", "product_id": "B00X"}, "cid-1") == "B00X"
+    assert routing_key({"text": "x", "customer_id": 7}, "cid-1") == "7"
+    assert routing_key({"text": "x", "product_id": ""}, "cid-1") == "cid-1"
+    assert routing_key("texto plano", "cid-1") == "cid-1"
+    topics = ["ml.sentiment.in", "ml.absa.in"]
+    assert parse_partitions("6", topics) == {"ml.sentiment.in": 6, "ml.absa.in": 6}
+    assert parse_partitions("3,ml.absa.in=12", topics) == {"ml.sentiment.in": 3, "ml.absa.in": 12}
+    assert parse_partitions("", topics) == {"ml.sentiment.in": 1, "ml.absa.in": 1}
+
+
+def test_lotes_por_particion_conservan_orden_por_key():
+    b = InMemoryBroker()
+    AdminClient({"broker": b}).create_topics([NewTopic("t", num_partitions=3)])
+    p = Producer({"broker": b})
+    keys = [f"p{i % 5}" for i in range(60)]
+    for i, k in enumerate(keys):
+        p.produce("t", str(i).encode(), key=k)
+    c = Consumer({"broker": b, "group.id": "g", "auto.offset.reset": "earliest"})
+    c.subscribe(["t"])
+
+    seen = {}
+    while True:
+        batch = poll_batch(c, 16, 0.05)
+        if not batch:
+            break
+        for part in partition_batches(batch):
+            assert len({m.partition() for m in part}) == 1
+            offsets = [m.offset() for m in part]
+            assert offsets == sorted(offsets)
+            for m in part:
+                seen.setdefault(m.key(), []).append(int(m.value()))
+    assert sum(map(len, seen.values())) == 60
+    for vals in seen.values():
+        assert vals == sorted(vals)             # orden de envío por key
@@ -0,0 +1,29 @@
+import json, logging
+
+from src.utils.log_setup import EventSampler, JsonFormatter, TextFormatter
+
+
+def test_json_formatter_incluye_campos():
+    rec = logging.LogRecord("ml.api", logging.INFO, __file__, 1, "stored", None, None)
+    rec.fields = {"cid": "abc"}
+    rec.topic = "ml.sentiment.out"
+    doc = json.loads(JsonFormatter().format(rec))
+    assert doc["msg"] == "stored" and doc["level"] == "info"
+    assert doc["cid"] == "abc" and doc["topic"] == "ml.sentiment.out"
+
+
+def test_text_formatter_incluye_extra_sueltos():
+    log = logging.getLogger("ml.test.text")
+    rec = log.makeRecord("ml.api", logging.INFO, __file__, 1, "modelo actualizado", None, None,
+                         extra={"model_version": "v2", "fields": {"cid": "abc"}})
+    line = TextFormatter().format(rec)
+    assert line.endswith("modelo actualizado cid=abc model_version=v2")
+
+
+def test_sampler_1_de_n_y_tope_por_segundo():
+    log = logging.getLogger("ml.test.sampler")
+    s = EventSampler(log, every=10, max_per_sec=3)
+    allowed = sum(s.allow() for _ in range(1000))
+    # 100 candidatos (1 de cada 10) pero el token bucket sólo deja pasar ~3
+    assert 1 <= allowed <= 4
+    assert s.suppressed == 1000 - allowed
@@ -0,0 +1,82 @@
+import os
+
+from src.utils.model_registry import ModelRegistry
+
+
+def _loader(path):
+    # "modelo" = contenido del archivo; sin preproc
+    return path.read_text(), None
+
+
+def test_recarga_preparada_y_swap_entre_lotes(tmp_path):
+    art = tmp_path / "02_sentiment_logreg_tfidf.joblib"
+    cfg = tmp_path / "02_sentiment_logreg_tfidf.json"
+    art.write_text("v1")
+    cfg.write_text('{"version": "1.0"}')
+    reg = ModelRegistry(lambda: {"sentiment": (art, cfg)}, loader=_loader)
+    v1 = reg.current().version
+    assert v1.startswith("1.0+") and reg.current().entries["sentiment"].model == "v1"
+
+    assert reg.check() is False            # sin cambios
+    art.write_text("v2-nuevo")
+    os.utime(art, ns=(1, 1))               # fuerza cambio de mtime
+    assert reg.check() is True
+    # la versión activa no cambia hasta maybe_swap()
+    assert reg.current().entries["sentiment"].model == "v1"
+    assert reg.maybe_swap() is True
+    assert reg.current().entries["sentiment"].model == "v2-nuevo"
+    assert reg.current().version != v1
+    assert reg.maybe_swap() is False
+
+
+def test_fallo_de_carga_mantiene_version_activa(tmp_path):
+    art = tmp_path / "m.joblib"
+    art.write_text("ok")
+    calls = {"n": 0}
+
+    def flaky(path):
+        calls["n"] += 1
+        if calls["n"] > 1:
+            raise EOFError("archivo a medio copiar")
+        return path.read_text(), None
+
+    reg = ModelRegistry(lambda: {"sentiment": (art, None)}, loader=flaky)
+    art.write_text("roto")
+    os.utime(art, ns=(2, 2))
+    assert reg.check() is False
+    assert reg.current().entries["sentiment"].model == "ok"
+
+
+def test_estado_derivado_vive_en_cada_snapshot(tmp_path):
+    art = tmp_path / "04_aspect_battery_clf.joblib"
+    art.write_text("v1")
+    reg = ModelRegistry(lambda: {"battery": (art, None)}, loader=_loader)
+    reg.prepare = lambda snap: snap.extras.setdefault("detector", snap.entries["battery"].model)
+    reg.prepare(reg.current())
+    art.write_text("v2-nuevo")
+    os.utime(art, ns=(1, 1))
+    assert reg.check() is True
+    # el preparado tiene el suyo y el activo conserva el de su versión hasta el swap
+    assert reg.current().extras["detector"] == "v1"
+    assert reg.maybe_swap() and reg.current().extras["detector"] == "v2-nuevo"
+
+
+def test_fallo_de_prepare_mantiene_version_activa(tmp_path):
+    art = tmp_path / "04_aspect_battery_clf.joblib"
+    art.write_text("v1")
+    reg = ModelRegistry(lambda: {"battery": (art, None)}, loader=_loader)
+    fail = {"on": True}
+
+    def prepare(snap):
+        if fail["on"]:
+            raise RuntimeError("warm-up falló")
+        snap.extras["detector"] = snap.entries["battery"].model
+
+    reg.prepare = prepare
+    art.write_text("v2-nuevo")
+    os.utime(art, ns=(1, 1))
+    assert reg.check() is False and reg.maybe_swap() is False
+    assert reg.current().entries["battery"].model == "v1"
+    fail["on"] = False                     # la siguiente vuelta lo reintenta
+    assert reg.check() is True and reg.maybe_swap()
+    assert reg.current().extras["detector"] == "v2-nuevo"
@@ -0,0 +1,57 @@
+import sys
+from time import monotonic, sleep
+from types import SimpleNamespace
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from benchmarks.inmemory_kafka import OFFSET_END, InMemoryBroker, Producer, Consumer, TopicPartition
+from src.utils.readiness import WARMUP_TEXTS, Heartbeat, HeartbeatMonitor, warm_up
+from src.utils.sparse_features import AdapterCache
+
+
+def test_warm_up_reporta_tiempos_y_construye_adapters():
+    vec = TfidfVectorizer(ngram_range=(1, 2)).fit(WARMUP_TEXTS)
+    clf = LogisticRegression().fit(vec.transform(WARMUP_TEXTS), [0, 1, 0, 0, 1, 1])
+    entry = SimpleNamespace(name="sentiment", version="v1", model=clf, preproc=vec, load_s=0.25)
+    cache = AdapterCache()
+    timings = warm_up(SimpleNamespace(entries={"sentiment": entry}), cache, batch=8)
+    assert timings["sentiment"]["load_s"] == 0.25 and timings["sentiment"]["warmup_s"] > 0
+    assert cache._by_name["sentiment"][1] is not None      # el adapter ya no se construye en el 1er mensaje
+
+
+def test_heartbeats_en_topico_de_control():
+    b = InMemoryBroker()
+    mon = HeartbeatMonitor(Consumer({"broker": b, "group.id": "api-control", "auto.offset.reset": "earliest"}),
+                           topic="ctl")
+    hb = Heartbeat(Producer({"broker": b}), "sentiment", topic="ctl", every_s=60)
+    hb.beat()
+    for part in b.topics["ctl"]:
+        for m in part:
+            mon.observe(m.value())
+    assert mon.missing(["sentiment", "absa"]) == ["sentiment", "absa"]     # aún no está listo
+
+    hb.update(ready=True, model_version="1.0+abc")
+    mon.observe(b.topics["ctl"][0][-1].value())
+    assert mon.missing(["sentiment", "absa"]) == ["absa"]
+    assert mon.services()["sentiment"]["model_version"] == "1.0+abc"
+    assert mon.missing(["sentiment"], max_age_s=-1) == ["sentiment"]       # heartbeat viejo
+
+
+def test_monitor_lee_desde_el_final_sin_grupo_ni_commits(monkeypatch):
+    b = InMemoryBroker()
+    monkeypatch.setitem(sys.modules, "confluent_kafka",
+                        SimpleNamespace(TopicPartition=TopicPartition, OFFSET_END=OFFSET_END))
+    hb = Heartbeat(Producer({"broker": b}), "sentiment", topic="ctl", every_s=60)
+    hb.update(ready=True, model_version="viejo")                 # anterior al arranque: no se lee
+    mon = HeartbeatMonitor(Consumer({"broker": b, "group.id": "api-control"}), topic="ctl").start()
+    deadline = monotonic() + 2
+    while not mon.consumer.assignment() and monotonic() < deadline:
+        sleep(0.01)
+    assert mon.missing(["sentiment"]) == ["sentiment"]
+
+    hb.update(model_version="nuevo")
+    while mon.missing(["sentiment"]) and monotonic() < deadline:
+        sleep(0.01)
+    assert mon.services()["sentiment"]["model_version"] == "nuevo"
+    assert not b.members.get("api-control") and not any(g == "api-control" for g, _, _ in b.committed)
@@ -0,0 +1,77 @@
+from src.utils.results_store import Filters, ResultsStore
+
+EVTS = [
+    {"correlation_id": "a", "payload": {"text": "Arrived broken, I want a refund"}, "meta": {"ts_enqueue": 10.0}},
+    {"correlation_id": "a", "result": {"prediction": "negative", "proba": [0.8, 0.1, 0.1]}, "ts": 11.0,
+     "model_version": "v1"},
+    {"correlation_id": "a", "result": {"battery": "negative", "price": "neutral"}, "ts": 12.0},
+    {"correlation_id": "b", "result": {"prediction": "positive", "proba": [0.1, 0.1, 0.8]}, "ts": 13.0},
+]
+
+
+def test_upsert_une_por_cid_calcula_urgencia_y_es_idempotente(tmp_path):
+    store = ResultsStore(tmp_path / "r.db")
+    assert store.upsert_events(EVTS[:2]) == 1
+    assert store.upsert_events(EVTS[2:]) == 2
+    for _ in range(2):                                   # replay del tópico: mismas filas
+        store.upsert_events(EVTS[::-1])
+    rows = store.conn.execute("SELECT correlation_id, ts, sentiment, urgency, aspects, model_version "
+                              "FROM results ORDER BY correlation_id").fetchall()
+    assert rows == [("a", 11.0, "negative", "high", "battery:negative|price:neutral", "v1"),
+                    ("b", 13.0, "positive", None, None, None)]
+    assert store.conn.execute("SELECT COUNT(*) FROM result_aspects").fetchone()[0] == 2
+
+    ro = ResultsStore(tmp_path / "r.db", readonly=True)
+    assert ro.count() == 2 and ro.count_alerts() == 1
+    assert ro.count(Filters(urgencies=["high"])) == 1 and ro.count(Filters(sentiments=[])) == 0
+    assert ro.count(Filters(aspects=["battery"])) == 1 and ro.aspects() == ["battery", "price"]
+    df = ro.fetch(Filters(sentiments=["negative", "positive"]), limit=1)
+    assert df["text"].tolist() == [None] and df["sentiment"].tolist() == ["positive"]   # el más reciente
+
+
+def test_page_keyset_y_counts_en_sql(tmp_path):
+    store = ResultsStore(tmp_path / "r.db")
+    evts = []
+    for i in range(25):                                  # ts repetidos: el desempate es correlation_id
+        cid = f"c{i:02d}"
+        evts += [{"correlation_id": cid, "payload": {"text": "ok"}},
+                 {"correlation_id": cid, "result": {"prediction": "negative" if i % 5 == 0 else "positive"},
+                  "ts": float(i // 2)},
+                 {"correlation_id": cid, "result": {"battery" if i % 2 else "price": "neutral"}, "ts": float(i // 2)}]
+    store.upsert_events(evts)
+
+    seen, cursor = [], None
+    while True:
+        df, cursor = store.page(Filters(), limit=7, after=cursor)
+        seen += df["correlation_id"].tolist()
+        if cursor is None:
+            break
+    assert seen == [f"c{i:02d}" for i in range(24, -1, -1)]    # sin huecos ni repetidos
+
+    f = Filters(aspects=["battery"], ts_from=2.0, ts_to=10.0)
+    df, cursor = store.page(f, limit=100)
+    assert cursor is None and df["correlation_id"].tolist() == ["c19", "c17", "c15", "c13", "c11", "c09", "c07", "c05"]
+    assert store.count(f) == 8
+    assert store.counts(f) == {("low", "positive"): 6, ("low", "negative"): 2}
+    assert sum(store.counts(Filters(), window=10).values()) == 10
+
+
+def test_sync_csv_importa_solo_las_filas_nuevas(tmp_path):
+    from src.utils.loggers import append_result
+    csv = tmp_path / "results_log.csv"
+    store = ResultsStore(":memory:")
+    assert store.sync_csv(csv) == 0                        # todavía no existe
+    append_result(csv, "Arrived broken,\nrefund please", "negative", "high", "battery:negative")
+    append_result(csv, "great", "positive", "low")
+    assert store.sync_csv(csv) == 2 and store.count() == 2 and store.count_alerts() == 1
+
+    with open(csv, "ab") as f:                             # fila a medio escribir: se deja para después
+        f.write(b'2024-01-01T00:00:00Z,"half\n')
+    assert store.sync_csv(csv) == 0
+    with open(csv, "ab") as f:
+        f.write(b'written",neutral,low,\n')
+    assert store.sync_csv(csv) == 1 and store.count() == 3
+    assert store.aspects() == ["battery"]
+
+    csv.write_text("ts,text,sentiment,urgency,aspects\n2024-01-01T00:00:00Z,x,positive,low,\n")   # rotado
+    assert store.sync_csv(csv) == 1 and store.count() == 1 and store.aspects() == []
@@ -0,0 +1,22 @@
+import json, os, subprocess, sys
+from pathlib import Path
+
+from src.utils.settings import REPO_ROOT, Settings
+
+
+def test_rutas_desde_el_entorno_sin_crear_nada(tmp_settings, tmp_path):
+    assert tmp_settings.reports_dir == tmp_path / "docs" / "reports"
+    assert tmp_settings.model_path == tmp_path / "models" / "trained_models" / "02_sentiment_logreg_tfidf.joblib"
+    s = Settings.from_env({"PROJECT_DIR": str(tmp_path), "MODELS_DIR": "/app/models", "REPORTS_DIR": "/x"})
+    assert s.model_path == Path("/app/models/02_sentiment_logreg_tfidf.joblib") and s.reports_dir == Path("/x")
+    assert s.eval_dir == tmp_path / "data" / "evaluation"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_importar_la_api_no_carga_dependencias_pesadas(tmp_path):
+    code = ("import sys, json, api.main; "
+            "print(json.dumps(sorted(m for m in ('pandas', 'sklearn', 'confluent_kafka', 'numpy') if m in sys.modules)))")
+    env = {**os.environ, "PROJECT_DIR": str(tmp_path)}
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == []
+    assert list(tmp_path.iterdir()) == []          # ni reports/ ni carpetas de config_rutas
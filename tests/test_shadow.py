@@ -0,0 +1,72 @@
+import json
+import uuid
+
+import pytest
+
+from src.utils.metrics_aggregator import get_metrics_summary
+from src.utils.shadow import RunningStats, ShadowTracker, sample_threshold, sampled
+
+
+def _evt(cid, pred, ts_enqueue, latency_s, version):
+    return {"correlation_id": cid, "result": {"prediction": pred}, "ts_enqueue": ts_enqueue,
+            "ts": ts_enqueue + latency_s, "model_version": version}
+
+
+def test_muestreo_determinista_y_proporcional():
+    cids = [str(uuid.uuid4()) for _ in range(20000)]
+    th = sample_threshold(0.1)
+    picked = [c for c in cids if sampled(c, th)]
+    assert 0.08 < len(picked) / len(cids) < 0.12
+    assert picked == [c for c in cids if sampled(c, th)]          # misma decisión en cualquier instancia
+    assert not any(sampled(c, sample_threshold(0.0)) for c in cids)
+    assert all(sampled(c, sample_threshold(1.0)) for c in cids)
+
+
+def test_pares_agreement_latencias_y_metrics_json(tmp_path):
+    sent = []
+    out = tmp_path / "shadow_cand" / "metrics.json"
+    tr = ShadowTracker("shadow.in", rate=1.0, produce=lambda t, v, key=None: sent.append((t, v, key)),
+                       name="cand", out_path=out)
+    preds = [("positive", "positive"), ("negative", "negative"), ("neutral", "negative"), ("positive", "positive")]
+    for i, (a, b) in enumerate(preds):
+        cid = f"c{i}"
+        assert tr.mirror(cid, {"text": "x"}, key=cid)
+        tr.record_candidate(_evt(cid, b, 100.0, 0.010, "v2"))     # el candidato puede llegar antes
+        tr.record_primary(_evt(cid, a, 100.0, 0.030, "v1"))
+    tr.record_primary(_evt("no-muestreado", "positive", 100.0, 0.01, "v1"))
+    tr.record_candidate(_evt("desconocido", "positive", 100.0, 0.01, "v2"))
+
+    assert len(sent) == 4 and json.loads(sent[0][1])["meta"]["source"] == "shadow"
+    s = tr.summary()
+    assert s["n_pairs"] == 4 and s["agreement"] == 0.75
+    assert s["confusion"]["neutral->negative"] == 1
+    assert s["latency_ms"]["delta"]["mean"] == pytest.approx(-20.0)
+    assert s["primary_version"] == "v1" and s["candidate_version"] == "v2"
+    assert s["throughput"]["pending"] == 0 and s["throughput"]["orphans"] == 1
+
+    tr.flush()
+    df = get_metrics_summary(tmp_path)
+    row = df.set_index("run_name").loc["shadow_cand"]
+    assert row["agreement"] == 0.75 and row["latency_ms.candidate.p50"] == pytest.approx(10.0)
+
+
+def test_pendientes_acotados_y_vencidos():
+    tr = ShadowTracker("shadow.in", rate=1.0, produce=lambda *a, **k: None, max_pending=3, max_age_s=5)
+    for i in range(5):
+        tr.mirror(f"c{i}", {"text": "x"})
+    assert tr.summary()["throughput"]["pending"] == 3 and tr.expired == 2
+    assert tr.expire(now=tr.started + 60) == 3
+
+    def broken(*a, **k):
+        raise BufferError("cola local llena")
+    tr = ShadowTracker("shadow.in", rate=1.0, produce=broken)
+    assert tr.mirror("c", {"text": "x"}) and tr.errors == 1 and tr.summary()["throughput"]["pending"] == 0
+
+
+def test_running_stats_cuantiles():
+    st = RunningStats((10, 20, 50, 100))
+    for x in range(1, 101):
+        st.add(float(x))
+    s = st.summary()
+    assert s["mean"] == pytest.approx(50.5) and s["min"] == 1 and s["max"] == 100
+    assert 45 <= s["p50"] <= 55 and 90 <= s["p95"] <= 100
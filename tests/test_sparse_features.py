@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.pipeline import Pipeline
+
+from src.utils.sparse_features import (AdapterCache, FeatureAdapter, Featurizer,
+                                       decode_features, encode_features, event_features, to_b64)
+
+DOCS = [
+    "The battery lasts two days, great battery!",
+    "Screen cracked after a week, terrible support",
+    "Camera is ok but the price is too high",
+    "Fast shipping and the sound quality is amazing",
+]
+
+
+def _fit(**kw):
+    return TfidfVectorizer(ngram_range=(1, 2), **kw).fit(DOCS)
+
+
+def test_blob_ida_y_vuelta():
+    blob = encode_features(123, [1, 2 ** 63 + 5], [3, 70000])
+    sig, h, c = decode_features(blob)
+    assert sig == 123 and h.tolist() == [1, 2 ** 63 + 5] and c.tolist() == [3, 65535]
+
+
+def test_adapter_igual_a_transform():
+    texts = DOCS + ["battery battery price, unseen words here", ""]
+    for kw in ({}, {"sublinear_tf": True}, {"binary": True, "norm": "l1"}):
+        vec = _fit(**kw)
+        fz, ad = Featurizer(vec), FeatureAdapter.from_preproc(Pipeline([("tfidf", vec)]))
+        X = ad.transform([decode_features(fz.featurize(t)) for t in texts])
+        assert np.allclose(X.toarray(), vec.transform(texts).toarray())
+
+
+def test_cache_usa_texto_si_el_analizador_no_coincide():
+    vec = _fit()
+    entry = SimpleNamespace(name="sentiment", version="v1", preproc=vec)
+    otro = Featurizer(TfidfVectorizer(ngram_range=(1, 1)))     # otra firma
+    feats = event_features({"features": to_b64(otro.featurize("great battery"))})
+    X = AdapterCache().vectorize(entry, "terrible support", feats)
+    assert np.allclose(X.toarray(), vec.transform(["terrible support"]).toarray())
+    assert event_features({"payload": {"text": "x"}}) is None
+
+
+def test_familia_hashed_comparte_conteos_entre_modelos():
+    from src.utils.train_hashed import hashed_pipeline
+    y = ["positive", "negative", "neutral", "positive"]
+    a = hashed_pipeline({"tfidf": {"ngram_range": [1, 2]}}, n_bits=10).fit(DOCS, y)
+    b = hashed_pipeline({"tfidf": {"ngram_range": [1, 2]}}, n_bits=10).fit(DOCS[::-1], y)
+    entries = [SimpleNamespace(name=n, version="v1", model=p[-1], preproc=p[:-1]) for n, p in (("a", a), ("b", b))]
+    cache, shared = AdapterCache(), {}
+    for e, p in zip(entries, (a, b)):
+        X = cache.vectorize_many(e, DOCS, [None] * len(DOCS), shared)
+        assert np.allclose(X.toarray(), p[:-1].transform(DOCS).toarray())
+    assert len(shared) == 1                      # mismo HashingVectorizer -> un solo conteo por lote
+    assert cache.get(entries[0]) is None         # sin vocabulario: sin adapter
+    X = cache.vectorize_many(entries[1], DOCS, [None] * len(DOCS), shared, rows=[3, 1])   # prefiltro ABSA
+    assert np.allclose(X.toarray(), b[:-1].transform([DOCS[3], DOCS[1]]).toarray())
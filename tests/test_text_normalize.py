@@ -0,0 +1,33 @@
+from src.utils.text_normalize import NearDupIndex, normalize_text, simhash64
+
+
+def test_normalize_nfkc_casefold_espacios_y_truncado():
+    assert normalize_text("  ＧＲＥＡＴ\tStraße \n ﬁne ") == "great strasse fine"
+    assert normalize_text(None) == ""
+    assert normalize_text("a  b c d", max_chars=3) == "a b"
+
+
+def test_casi_duplicados_en_ventana_deslizante():
+    idx = NearDupIndex(window=3, max_distance=3)
+    a = normalize_text("The battery died after two days, terrible!")
+    b = normalize_text("the battery died after two days.  Terrible!!")
+    assert simhash64(a) == simhash64(b)
+    assert idx.lookup_or_add("c1", a) is None
+    assert idx.lookup_or_add("c2", b) == "c1"                      # casi igual -> el primero
+    assert idx.lookup_or_add("c3", normalize_text("Fast shipping, great price")) is None
+    assert idx.lookup_or_add("c4", a) == "c1"                      # exacto
+    for i in range(3):                                             # c1 sale de la ventana
+        idx.lookup_or_add(f"x{i}", f"review number {i} with other words entirely {i * 7}")
+    assert idx.lookup_or_add("c5", a) is None
+    s = idx.stats()
+    assert s["exact_hits"] == 1 and s["near_hits"] == 1
+    idx.clear()
+    assert idx.lookup_or_add("c6", b) is None and idx.stats()["lookups"] == s["lookups"] + 1
+
+
+def test_por_defecto_solo_exactos():
+    idx = NearDupIndex(window=10)
+    a = normalize_text("The battery died after two days, terrible!")
+    assert idx.lookup_or_add("c1", a) is None
+    assert idx.lookup_or_add("c2", normalize_text("the battery died after two days.  Terrible!!")) is None
+    assert idx.lookup_or_add("c3", a) == "c1"